@@ -20,3 +20,11 @@ class AccountsConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        """Register organization scopes for this app's models."""
+        from core.scoping import org_scopes
+
+        from .models import CustomUser
+
+        org_scopes.register(CustomUser, 'user_org_roles__organization')
@@ -1,3 +1,210 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.views import TYPEAHEAD_LIMIT, DashboardView
+from core.testing import Budget, ViewBudgetMixin
+from organizations.models import (
+    Department,
+    Organization,
+    Role,
+    UserOrganizationRole,
+)
+from tasks.models import Task, TaskOutput, TaskOutputField
+
+
+User = get_user_model()
+
+
+def legacy_task_statistics(user):
+    """Count dashboard statistics the way the per-query version did."""
+    assigned_tasks = Task.objects.filter(assigned_users=user)
+    completed_task_ids = TaskOutput.objects.filter(
+        user=user
+    ).values_list('output_field__task', flat=True).distinct()
+    return {
+        'assigned_count': assigned_tasks.count(),
+        'viewer_count': Task.objects.filter(viewers=user).count(),
+        'total_accessible': Task.objects.filter(
+            Q(assigned_users=user) | Q(viewers=user)
+        ).distinct().count(),
+        'completed_count': assigned_tasks.filter(
+            id__in=completed_task_ids
+        ).count(),
+        'pending_count': assigned_tasks.exclude(
+            id__in=completed_task_ids
+        ).count(),
+    }
+
+
+class DashboardStatisticsTests(TestCase):
+    """Dashboard task statistics computed in one aggregate query."""
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='org')
+        cls.user = User.objects.create_user('user', password='pw')
+        other = User.objects.create_user('other', password='pw')
+        tasks = [
+            Task.objects.create(
+                name=f'task {index}', organization=organization
+            )
+            for index in range(6)
+        ]
+        for task in tasks[:4]:
+            task.assigned_users.add(cls.user)
+        for task in tasks[3:]:
+            task.viewers.add(cls.user)
+        tasks[5].assigned_users.add(other)
+
+        def submit(task, user, count=1):
+            for index in range(count):
+                field = TaskOutputField.objects.create(
+                    task=task, name=f'field {index}', field_type='text'
+                )
+                TaskOutput.objects.create(
+                    output_field=field, user=user, value_text='done'
+                )
+
+        # Several outputs on one task still complete it once
+        submit(tasks[0], cls.user, count=2)
+        # Assigned and viewer at the same time
+        submit(tasks[3], cls.user)
+        # Outputs of other users and on viewed-only tasks do not count
+        submit(tasks[1], other)
+        submit(tasks[5], cls.user)
+
+    def test_statistics_match_the_per_query_counts(self):
+        for user in User.objects.all():
+            with self.subTest(user=user.username):
+                self.assertEqual(
+                    DashboardView().get_task_statistics(user),
+                    legacy_task_statistics(user),
+                )
+
+    def test_statistics_take_one_query(self):
+        with self.assertNumQueries(1):
+            stats = DashboardView().get_task_statistics(self.user)
+        self.assertEqual(stats, {
+            'assigned_count': 4,
+            'viewer_count': 3,
+            'total_accessible': 6,
+            'completed_count': 2,
+            'pending_count': 2,
+        })
+
+
+class TypeaheadTests(TestCase):
+    """Organization scoping of the dashboard filter typeaheads."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org_a = Organization.objects.create(name='a')
+        cls.org_b = Organization.objects.create(name='b')
+        role = Role.objects.create(name='member')
+        User.objects.create_user('admin', password='pw', is_superuser=True)
+        for organization in (cls.org_a, cls.org_b):
+            UserOrganizationRole.objects.create(
+                user=User.objects.create_user(
+                    f'member-{organization.name}', password='pw'
+                ),
+                organization=organization,
+                role=role,
+            )
+        Department.objects.create(organization=cls.org_a, name='dept a')
+        Department.objects.create(organization=cls.org_b, name='dept b')
+
+    def search(self, name, username='member-a', **params):
+        self.client.force_login(User.objects.get(username=username))
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return [result['text'] for result in response.json()['results']]
+
+    def test_members_only_see_their_organizations(self):
+        self.assertEqual(
+            self.search('accounts:user_typeahead', q='member'), ['member-a']
+        )
+        self.assertEqual(
+            self.search('accounts:department_typeahead', q='dept'),
+            ['dept a'],
+        )
+
+    def test_members_cannot_pick_other_organizations(self):
+        names = ['accounts:user_typeahead', 'accounts:department_typeahead']
+        for name in names:
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.search(name, organization=self.org_b.pk), []
+                )
+                self.assertTrue(self.search(name, organization=self.org_a.pk))
+
+    def test_superusers_search_everywhere_or_one_organization(self):
+        self.assertEqual(
+            self.search(
+                'accounts:department_typeahead', username='admin', q='dept'
+            ),
+            ['dept a', 'dept b'],
+        )
+        self.assertEqual(
+            self.search(
+                'accounts:user_typeahead',
+                username='admin',
+                q='member',
+                organization=self.org_b.pk,
+            ),
+            ['member-b'],
+        )
+
+    def test_invalid_organizations_are_ignored(self):
+        self.assertEqual(
+            self.search(
+                'accounts:user_typeahead', q='member', organization='a'
+            ),
+            ['member-a'],
+        )
+
+    def test_results_are_limited(self):
+        Department.objects.bulk_create(
+            Department(organization=self.org_a, name=f'dept {index:02}')
+            for index in range(TYPEAHEAD_LIMIT + 5)
+        )
+        results = self.search('accounts:department_typeahead', q='dept')
+        self.assertEqual(len(results), TYPEAHEAD_LIMIT)
+        self.assertEqual(results, sorted(results))
+
+
+class AccountViewBudgetTests(ViewBudgetMixin, TestCase):
+    """Query and latency budgets of every view in accounts.urls."""
+
+    urlconf = 'accounts.urls'
+
+    def get_budgets(self):
+        member = [self.member.pk]
+        return [
+            Budget('accounts:login', queries=0, user=None),
+            Budget('accounts:register', queries=0, user=None),
+            Budget(
+                'accounts:logout', queries=4, user='member', method='post',
+                status=302
+            ),
+            Budget('accounts:dashboard', queries=14, latency_ms=150),
+            Budget(
+                'accounts:dashboard', queries=15, latency_ms=150,
+                user='member'
+            ),
+            Budget(
+                'accounts:user_typeahead', queries=4, user='member',
+                data={'q': 'User'}
+            ),
+            Budget(
+                'accounts:department_typeahead', queries=4, user='member',
+                data={'q': 'Department'}
+            ),
+            Budget('accounts:user_list', queries=5),
+            Budget('accounts:user_list', queries=7, user='member'),
+            Budget('accounts:user_add', queries=3),
+            Budget('accounts:user_detail', member, queries=4),
+            Budget('accounts:user_edit', member, queries=4),
+            Budget('accounts:user_delete', member, queries=4),
+        ]
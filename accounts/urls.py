@@ -1,7 +1,8 @@
 """Accounts URL configuration.
 
 This module defines URL patterns for user authentication, registration,
-dashboard, and user management CRUD operations.
+dashboard with its filter typeahead endpoints, and user management CRUD
+operations.
 """
 
 from django.urls import path
@@ -16,6 +17,8 @@ from accounts.views import (
     UserLogoutView,
     UserRegisterView,
     UserUpdateView,
+    department_typeahead,
+    user_typeahead,
 )
 
 
@@ -28,6 +31,16 @@ urlpatterns = [
     path('register/', UserRegisterView.as_view(), name='register'),
     path('logout/', UserLogoutView.as_view(), name='logout'),
     path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path(
+        'dashboard/users/search/',
+        user_typeahead,
+        name='user_typeahead'
+    ),
+    path(
+        'dashboard/departments/search/',
+        department_typeahead,
+        name='department_typeahead'
+    ),
 
     # User CRUD
     path('users/', UserListView.as_view(), name='user_list'),
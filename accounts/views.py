@@ -6,10 +6,13 @@ operations, and the main dashboard with role-based filtering.
 
 from django import forms
 from django.contrib.auth import get_user_model, login
+from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.views import LoginView, LogoutView
-from django.db.models import Q
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.urls import reverse_lazy
 from django.views.generic import (
@@ -20,17 +23,32 @@ from django.views.generic import (
     TemplateView,
     UpdateView,
 )
+from django.views.decorators.http import require_http_methods
 from django.views.generic.edit import FormView
 
-from core.mixins import OrganizationFilterMixin, RolePermissionMixin
-from organizations.models import Department, Organization, UserOrganizationRole
-from tasks.models import Task, TaskOutput
+from core.access import get_access_context
+from core.dashboard_cache import get_dashboard_context
+from core.mixins import (
+    CursorPaginationMixin,
+    OrganizationFilterMixin,
+    RelatedListMixin,
+    RolePermissionMixin,
+)
+from core.pagination import keyset_paginate
+from core.scoping import org_scopes
+from organizations.models import Department, Organization
+from tasks.models import Task, TaskAccess, UserTaskStats
 
 from .models import CustomUser
 
 
 User = get_user_model()
 
+# Matches the task_org_created_idx ordering; id breaks created_at ties
+TASK_PAGE_KEYS = ('-created_at', '-id')
+
+TYPEAHEAD_LIMIT = 20
+
 
 class UserLoginView(LoginView):
     """Handle user login with custom template."""
@@ -99,6 +117,8 @@ class UserListView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedListMixin,
+    CursorPaginationMixin,
     ListView
 ):
     """Display list of users filtered by user's organizations.
@@ -110,28 +130,10 @@ class UserListView(
     template_name = 'accounts/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['username', 'email', 'phone_number', 'is_active']
+    estimate_count = True
     required_permission = 'accounts.view_customuser'
 
-    def get_queryset(self):
-        """Filter users based on current user's organization access.
-
-        Returns:
-            QuerySet of CustomUser objects accessible to current user.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-
-        return queryset.filter(
-            user_org_roles__organization__in=user_orgs
-        ).distinct()
-
     def get_context_data(self, **kwargs):
         """Add table configuration and permissions to context.
 
@@ -150,9 +152,6 @@ class UserListView(
             'table_headers': [
                 'Username', 'Email', 'Phone Number', 'Active'
             ],
-            'list_attrs': [
-                'username', 'email', 'phone_number', 'is_active'
-            ],
             'can_add': 'accounts.add_customuser',
             'can_edit': 'accounts.change_customuser',
             'can_delete': 'accounts.delete_customuser',
@@ -184,31 +183,12 @@ class UserDetailView(
     context_object_name = 'object'
     required_permission = 'accounts.view_customuser'
 
-    def get_queryset(self):
-        """Filter users based on current user's organization access.
-
-        Returns:
-            QuerySet of CustomUser objects accessible to current user.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-
-        return queryset.filter(
-            user_org_roles__organization__in=user_orgs
-        ).distinct()
-
     def get_context_data(self, **kwargs):
-        """Add navigation URLs and permissions to context.
+        """Add navigation URLs, permissions and role assignments to context.
 
         Returns:
-            Dictionary with page_title, navigation URLs, and permissions.
+            Dictionary with page_title, navigation URLs, permissions and
+            the user's role assignments.
         """
         context = super().get_context_data(**kwargs)
 
@@ -217,6 +197,10 @@ class UserDetailView(
             'edit_url': 'accounts:user_edit',
             'list_url': 'accounts:user_list',
             'can_edit': 'accounts.change_customuser',
+            # Loaded up front so each assignment costs no extra queries
+            'user_roles': self.object.user_org_roles.select_related(
+                'organization', 'department', 'role'
+            ).prefetch_related('role__permissions'),
         })
         return context
 
@@ -283,26 +267,6 @@ class UserUpdateView(
     action = "Edit"
     required_permission = 'accounts.change_customuser'
 
-    def get_queryset(self):
-        """Filter users based on current user's organization access.
-
-        Returns:
-            QuerySet of CustomUser objects accessible to current user.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-
-        return queryset.filter(
-            user_org_roles__organization__in=user_orgs
-        ).distinct()
-
 
 class UserDeleteView(
     LoginRequiredMixin,
@@ -323,38 +287,22 @@ class UserDeleteView(
     action = "Delete"
     required_permission = 'accounts.delete_customuser'
 
-    def get_queryset(self):
-        """Filter users based on current user's organization access.
-
-        Returns:
-            QuerySet of CustomUser objects accessible to current user.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-
-        return queryset.filter(
-            user_org_roles__organization__in=user_orgs
-        ).distinct()
-
 
 class DashboardView(LoginRequiredMixin, TemplateView):
     """Main dashboard view with statistics and task overview.
 
     Displays filtered data based on user's organization access with
     filtering options for organizations, departments, and users.
-    Shows only tasks where user is assigned or viewer.
+    Shows only tasks where user is assigned or viewer. The task table is
+    keyset paginated and the user and department filters load their
+    options from the typeahead endpoints, so render cost does not grow
+    with the number of tasks, users or departments.
     """
 
     template_name = 'dashboard.html'
     login_url = '/login/'
     redirect_field_name = 'next'
+    tasks_per_page = 20
 
     def get_user_organizations(self, user):
         """Get organizations accessible by the user.
@@ -368,44 +316,42 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         if user.is_superuser:
             return Organization.objects.all()
 
-        user_org_ids = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-        return Organization.objects.filter(id__in=user_org_ids)
+        return org_scopes.scope(
+            Organization.objects.all(),
+            get_access_context(self.request).org_ids
+        )
 
-    def get_user_departments(self, user, organizations):
+    def get_user_departments(self, user):
         """Get departments accessible by the user.
 
         Args:
             user: Current user instance.
-            organizations: QuerySet of user's organizations.
 
         Returns:
             Tuple of (all_departments, user_specific_departments).
         """
         if user.is_superuser:
             all_depts = Department.objects.all()
-            return all_depts, all_depts
+            return all_depts, all_depts.select_related('organization')
 
-        user_org_ids = organizations.values_list('id', flat=True)
-        all_depts = Department.objects.filter(
-            organization__id__in=user_org_ids
+        access = get_access_context(self.request)
+        all_depts = org_scopes.scope(
+            Department.objects.all(), access.org_ids
         )
 
-        user_dept_ids = user.user_org_roles.filter(
-            department__isnull=False
-        ).values_list('department', flat=True).distinct()
+        user_dept_ids = access.department_ids
 
-        user_depts = Department.objects.filter(id__in=user_dept_ids)
+        user_depts = Department.objects.filter(
+            id__in=user_dept_ids
+        ).select_related('organization')
 
         return all_depts, user_depts
 
-    def get_accessible_users(self, user, organizations):
+    def get_accessible_users(self, user):
         """Get users accessible by the current user.
 
         Args:
             user: Current user instance.
-            organizations: QuerySet of user's organizations.
 
         Returns:
             QuerySet of User objects within accessible organizations.
@@ -413,19 +359,17 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         if user.is_superuser:
             return User.objects.all()
 
-        user_org_ids = organizations.values_list('id', flat=True)
-        return User.objects.filter(
-            user_org_roles__organization__id__in=user_org_ids
-        ).distinct()
+        return org_scopes.scope(
+            User.objects.all(), get_access_context(self.request).org_ids
+        )
 
-    def get_accessible_tasks(self, user, organizations):
+    def get_accessible_tasks(self, user):
         """Get tasks accessible by the user.
 
         Only shows tasks where user is assigned user, viewer, or superuser.
 
         Args:
             user: Current user instance.
-            organizations: QuerySet of user's organizations.
 
         Returns:
             QuerySet of Task objects user has explicit access to.
@@ -433,12 +377,10 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         if user.is_superuser:
             return Task.objects.all()
 
-        user_org_ids = organizations.values_list('id', flat=True)
-
-        return Task.objects.filter(
-            Q(organization__id__in=user_org_ids) &
-            (Q(assigned_users=user) | Q(viewers=user))
-        ).distinct()
+        tasks = org_scopes.scope(
+            Task.objects.all(), get_access_context(self.request).org_ids
+        )
+        return tasks.visible_to(user)
 
     def apply_filters(self, tasks, departments, org_id, dept_id, user_id):
         """Apply URL parameter filters to querysets.
@@ -461,69 +403,69 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             tasks = tasks.filter(departments__id=dept_id)
 
         if user_id:
-            tasks = tasks.filter(
-                Q(assigned_users__id=user_id) |
-                Q(viewers__id=user_id)
-            ).distinct()
+            tasks = tasks.visible_to(user_id)
 
         return tasks, departments
 
     def get_task_statistics(self, user):
         """Get task statistics for the current user.
 
+        Reads the user's UserTaskStats rollup rows, one per organization,
+        which the task signals keep current.
+
         Args:
             user: Current user instance.
 
         Returns:
             Dictionary with task counts and completion statistics.
         """
-        assigned_tasks = Task.objects.filter(assigned_users=user)
-        viewer_tasks = Task.objects.filter(viewers=user)
-
-        all_accessible = Task.objects.filter(
-            Q(assigned_users=user) | Q(viewers=user)
-        ).distinct()
+        stats = UserTaskStats.objects.filter(user=user).aggregate(
+            assigned_count=Coalesce(Sum('assigned_count'), 0),
+            viewer_count=Coalesce(Sum('viewer_count'), 0),
+            total_accessible=Coalesce(Sum('accessible_count'), 0),
+            completed_count=Coalesce(Sum('completed_count'), 0),
+        )
+        stats['pending_count'] = (
+            stats['assigned_count'] - stats['completed_count']
+        )
+        return stats
 
-        completed_task_ids = TaskOutput.objects.filter(
-            user=user
-        ).values_list('output_field__task', flat=True).distinct()
+    def get_context_data(self, **kwargs):
+        """Add dashboard statistics and filtered data to context.
 
-        completed_count = assigned_tasks.filter(
-            id__in=completed_task_ids
-        ).count()
+        The data is served from the versioned dashboard cache and only
+        rebuilt when one of the user's organizations or the user's own
+        memberships changed since it was stored.
 
-        pending_count = assigned_tasks.exclude(
-            id__in=completed_task_ids
-        ).count()
+        Returns:
+            Dictionary with organizations, departments, users, tasks,
+            and statistics filtered by user's access level.
+        """
+        context = super().get_context_data(**kwargs)
+        context.update(
+            get_dashboard_context(self.request, self.build_dashboard_data)
+        )
+        return context
 
-        return {
-            'assigned_count': assigned_tasks.count(),
-            'viewer_count': viewer_tasks.count(),
-            'total_accessible': all_accessible.count(),
-            'completed_count': completed_count,
-            'pending_count': pending_count,
-        }
+    def build_dashboard_data(self):
+        """Compute the cacheable dashboard data.
 
-    def get_context_data(self, **kwargs):
-        """Add dashboard statistics and filtered data to context.
+        Querysets are evaluated here so the result can be pickled.
 
         Returns:
             Dictionary with organizations, departments, users, tasks,
             and statistics filtered by user's access level.
         """
-        context = super().get_context_data(**kwargs)
         user = self.request.user
 
         org_id = self.request.GET.get('organization')
         dept_id = self.request.GET.get('department')
         user_id = self.request.GET.get('user')
 
-        organizations = self.get_user_organizations(user)
-        all_departments, user_departments = self.get_user_departments(
-            user, organizations
-        )
-        users = self.get_accessible_users(user, organizations)
-        tasks = self.get_accessible_tasks(user, organizations)
+        organizations = list(self.get_user_organizations(user))
+        all_departments, user_departments = self.get_user_departments(user)
+        users = self.get_accessible_users(user)
+        tasks = self.get_accessible_tasks(user)
 
         tasks, all_departments = self.apply_filters(
             tasks, all_departments, org_id, dept_id, user_id
@@ -531,8 +473,17 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
         task_stats = self.get_task_statistics(user)
 
-        context.update({
-            'total_organizations': organizations.count(),
+        task_page = keyset_paginate(
+            tasks.select_related('organization').prefetch_related(
+                'departments'
+            ),
+            TASK_PAGE_KEYS,
+            self.request.GET.get('cursor'),
+            self.tasks_per_page,
+        )
+
+        return {
+            'total_organizations': len(organizations),
             'total_departments': all_departments.count(),
             'total_users': users.count(),
             'total_tasks': tasks.count(),
@@ -541,22 +492,113 @@ class DashboardView(LoginRequiredMixin, TemplateView):
             'completed_tasks_count': task_stats['completed_count'],
             'pending_tasks_count': task_stats['pending_count'],
             'total_accessible_tasks': task_stats['total_accessible'],
-            'my_assigned_tasks': Task.objects.filter(
-                assigned_users=user
-            ).distinct().order_by('-created_at')[:5],
-            'my_viewer_tasks': Task.objects.filter(
-                viewers=user
-            ).distinct().order_by('-created_at')[:5],
-            'recent_tasks': tasks.order_by('-created_at')[:10],
+            'my_assigned_tasks': list(Task.objects.visible_to(
+                user, TaskAccess.LEVEL_ASSIGNED
+            ).select_related('organization').order_by('-created_at')[:5]),
+            'my_viewer_tasks': list(Task.objects.visible_to(
+                user, TaskAccess.LEVEL_VIEWER
+            ).select_related('organization').order_by('-created_at')[:5]),
+            'recent_tasks': list(tasks.select_related(
+                'organization'
+            ).order_by('-created_at')[:10]),
             'organizations': organizations,
-            'departments': all_departments,
-            'users': users,
-            'tasks': tasks,
+            'tasks': task_page.object_list,
+            'task_page': task_page,
             'user_organizations': organizations,
-            'user_departments': user_departments,
+            'user_departments': list(user_departments),
             'selected_org': int(org_id) if org_id else None,
             'selected_dept': int(dept_id) if dept_id else None,
             'selected_user': int(user_id) if user_id else None,
-        })
+            'selected_dept_obj': (
+                all_departments.filter(id=dept_id).first()
+                if dept_id else None
+            ),
+            'selected_user_obj': (
+                users.filter(id=user_id).first() if user_id else None
+            ),
+        }
 
-        return context
+
+def _typeahead_org_ids(request):
+    """Resolve the organizations a typeahead search may cover.
+
+    Args:
+        request: HTTP request with optional 'organization' parameter.
+
+    Returns:
+        Collection of organization IDs, or None for no restriction.
+    """
+    org_id = request.GET.get('organization')
+    org_id = int(org_id) if org_id and org_id.isdigit() else None
+
+    if request.user.is_superuser:
+        return [org_id] if org_id else None
+
+    org_ids = get_access_context(request).org_ids
+    if org_id:
+        return [org_id] if org_id in org_ids else []
+    return org_ids
+
+
+@login_required
+@require_http_methods(['GET'])
+def user_typeahead(request):
+    """Search users for the dashboard user filter.
+
+    Args:
+        request: HTTP request with 'q' and optional 'organization'.
+
+    Returns:
+        JsonResponse with up to TYPEAHEAD_LIMIT matches in the form
+            {'results': [{'id': 1, 'text': 'john'}]}
+    """
+    term = request.GET.get('q', '').strip()
+    users = User.objects.all()
+
+    org_ids = _typeahead_org_ids(request)
+    if org_ids is not None:
+        users = org_scopes.scope(users, org_ids)
+
+    if term:
+        users = users.filter(
+            Q(username__icontains=term)
+            | Q(first_name__icontains=term)
+            | Q(last_name__icontains=term)
+        )
+
+    results = users.order_by('username').values('id', 'username')[
+        :TYPEAHEAD_LIMIT
+    ]
+    return JsonResponse({'results': [
+        {'id': row['id'], 'text': row['username']} for row in results
+    ]})
+
+
+@login_required
+@require_http_methods(['GET'])
+def department_typeahead(request):
+    """Search departments for the dashboard department filter.
+
+    Args:
+        request: HTTP request with 'q' and optional 'organization'.
+
+    Returns:
+        JsonResponse with up to TYPEAHEAD_LIMIT matches in the form
+            {'results': [{'id': 1, 'text': 'IT'}]}
+    """
+    term = request.GET.get('q', '').strip()
+    departments = Department.objects.all()
+
+    org_ids = _typeahead_org_ids(request)
+    if org_ids is not None:
+        departments = org_scopes.scope(departments, org_ids)
+
+    if term:
+        departments = departments.filter(name__icontains=term)
+
+    results = departments.order_by('name').values('id', 'name')[
+        :TYPEAHEAD_LIMIT
+    ]
+    return JsonResponse({'results': [
+        {'id': row['id'], 'text': row['name']} for row in results
+    ]})
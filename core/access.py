@@ -0,0 +1,101 @@
+"""Request-scoped organization access context.
+
+This module provides a lazily evaluated snapshot of the organizations,
+departments and roles a user belongs to. The snapshot is loaded with a
+single query the first time any of its attributes is read and is then
+shared by every mixin, view and helper that filters by membership
+during the same request.
+"""
+
+from django.utils.functional import cached_property
+
+
+class AccessContext:
+    """Organization membership of a user for the current request.
+
+    Attributes:
+        user: User the context was built for.
+    """
+
+    def __init__(self, user):
+        """Initialize context without touching the database.
+
+        Args:
+            user: User instance (may be a lazy request.user).
+        """
+        self.user = user
+
+    @cached_property
+    def _memberships(self):
+        """Load the user's role assignments in a single query.
+
+        Returns:
+            List of (organization_id, department_id, role_id) tuples.
+        """
+        if not self.user.is_authenticated:
+            return []
+
+        return list(
+            self.user.user_org_roles.values_list(
+                'organization_id', 'department_id', 'role_id'
+            )
+        )
+
+    @cached_property
+    def org_ids(self):
+        """Organizations the user holds any role in.
+
+        Returns:
+            Frozenset of organization IDs.
+        """
+        return frozenset(row[0] for row in self._memberships)
+
+    @cached_property
+    def department_ids(self):
+        """Departments the user is explicitly assigned to.
+
+        Returns:
+            Frozenset of department IDs.
+        """
+        return frozenset(
+            row[1] for row in self._memberships if row[1] is not None
+        )
+
+    @cached_property
+    def role_ids(self):
+        """Roles the user holds in any organization.
+
+        Returns:
+            Frozenset of role IDs.
+        """
+        return frozenset(row[2] for row in self._memberships)
+
+    def has_org(self, org_id):
+        """Check whether the user belongs to an organization.
+
+        Args:
+            org_id: Organization ID to check.
+
+        Returns:
+            Boolean indicating membership.
+        """
+        return org_id in self.org_ids
+
+
+def get_access_context(request):
+    """Get the access context attached to a request.
+
+    Falls back to building and attaching one when the request did not
+    pass through AccessContextMiddleware (e.g. RequestFactory requests).
+
+    Args:
+        request: HTTP request object.
+
+    Returns:
+        AccessContext for request.user.
+    """
+    access = getattr(request, 'access', None)
+    if access is None:
+        access = AccessContext(request.user)
+        request.access = access
+    return access
@@ -20,3 +20,7 @@ class CoreConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        """Connect the tenant scope restoring signal handler."""
+        from . import tenancy  # noqa: F401
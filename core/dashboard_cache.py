@@ -0,0 +1,206 @@
+"""Versioned caching of per-user dashboard data.
+
+The dashboard context is stored in the Django cache under a key built
+from the user, the filter parameters and a set of generation counters:
+one for the user and one for each organization the user belongs to
+(superusers, who see every organization, use a global counter instead).
+Signal handlers bump the counters of the organizations and users a
+change touches, so a task edit in one organization leaves the cached
+dashboards of other tenants intact. A counter evicted from the cache is
+seeded again from the clock rather than restarting at a value an old
+entry may still be keyed under.
+
+Hits and misses are counted in the cache as well, so the ratio covers
+every process sharing the cache backend.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .access import get_access_context
+
+
+# Bump to invalidate every cached dashboard after a format change
+DASHBOARD_CACHE_VERSION = 1
+
+_KEY_PREFIX = f'dashboard:v{DASHBOARD_CACHE_VERSION}'
+
+_ALL_ORGANIZATIONS = 'all'
+
+# Query parameters that select a different dashboard
+FILTER_PARAMS = ('organization', 'department', 'user', 'cursor')
+
+HITS_KEY = f'{_KEY_PREFIX}:hits'
+MISSES_KEY = f'{_KEY_PREFIX}:misses'
+
+
+def _org_generation_key(org_id):
+    """Build the cache key holding an organization's generation counter.
+
+    Args:
+        org_id: Organization primary key, or 'all' for the global counter.
+
+    Returns:
+        String cache key.
+    """
+    return f'{_KEY_PREFIX}:org_gen:{org_id}'
+
+
+def _user_generation_key(user_id):
+    """Build the cache key holding a user's generation counter.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        String cache key.
+    """
+    return f'{_KEY_PREFIX}:user_gen:{user_id}'
+
+
+def _incr(key):
+    """Increment a counter, creating it if missing.
+
+    Args:
+        key: Cache key of the counter.
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _bump_generation(key):
+    """Increment a generation counter, seeding it if missing.
+
+    Args:
+        key: Cache key of the counter.
+    """
+    if cache.add(key, time.time_ns(), None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def _generations(keys):
+    """Read generation counters in one call, seeding missing ones.
+
+    Args:
+        keys: List of counter cache keys.
+
+    Returns:
+        List of generations in the order of keys.
+    """
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        seed = time.time_ns()
+        for key in missing:
+            # add() leaves a seed written concurrently in place
+            cache.add(key, seed, None)
+        found.update(cache.get_many(missing))
+    return [found.get(key) for key in keys]
+
+
+def _cache_key(request):
+    """Build the versioned cache key of a request's dashboard.
+
+    Reads every relevant generation counter in one get_many call, plus
+    one more for counters that had to be seeded.
+
+    Args:
+        request: HTTP request of an authenticated user.
+
+    Returns:
+        String cache key.
+    """
+    user = request.user
+    if user.is_superuser:
+        scopes = [_ALL_ORGANIZATIONS]
+    else:
+        scopes = sorted(get_access_context(request).org_ids)
+
+    keys = [_user_generation_key(user.pk)] + [
+        _org_generation_key(scope) for scope in scopes
+    ]
+    generations = _generations(keys)
+    filters = [request.GET.get(name, '') for name in FILTER_PARAMS]
+
+    digest = hashlib.sha1(
+        repr((scopes, generations, filters)).encode()
+    ).hexdigest()
+    return f'{_KEY_PREFIX}:ctx:{user.pk}:{digest}'
+
+
+def get_dashboard_context(request, build):
+    """Return the cached dashboard data of a request, building on a miss.
+
+    Args:
+        request: HTTP request of an authenticated user.
+        build: Callable returning a picklable dict of context data.
+
+    Returns:
+        Dictionary of dashboard context data.
+    """
+    key = _cache_key(request)
+    data = cache.get(key)
+    if data is not None:
+        _incr(HITS_KEY)
+        return data
+
+    _incr(MISSES_KEY)
+    data = build()
+    cache.set(key, data, settings.DASHBOARD_CACHE_TIMEOUT)
+    return data
+
+
+def invalidate_organization_dashboards(org_ids):
+    """Expire cached dashboards showing data of the given organizations.
+
+    Args:
+        org_ids: Iterable of organization primary keys.
+    """
+    org_ids = set(org_ids)
+    if not org_ids:
+        return
+    for org_id in org_ids:
+        _bump_generation(_org_generation_key(org_id))
+    _bump_generation(_org_generation_key(_ALL_ORGANIZATIONS))
+
+
+def invalidate_user_dashboards(user_ids):
+    """Expire the cached dashboards of the given users.
+
+    Args:
+        user_ids: Iterable of user primary keys.
+    """
+    for user_id in set(user_ids):
+        _bump_generation(_user_generation_key(user_id))
+
+
+def get_cache_stats():
+    """Read the shared hit and miss counters.
+
+    Returns:
+        Dictionary with hits, misses and hit_ratio (None before any
+        lookup).
+    """
+    found = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = found.get(HITS_KEY, 0)
+    misses = found.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else None,
+    }
+
+
+def reset_cache_stats():
+    """Reset the shared hit and miss counters to zero."""
+    cache.delete_many([HITS_KEY, MISSES_KEY])
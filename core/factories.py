@@ -0,0 +1,444 @@
+"""Bulk generation of realistic tenant data.
+
+Organizations are built one at a time with every row of a model
+inserted in batches, so a tenant costs a fixed number of round trips
+whatever its size and memory stays bounded by the largest tenant.
+Models are written with bulk_create, which bypasses signals, so the
+denormalized TaskAccess grants are inserted alongside the M2M rows and
+the UserTaskStats rollup is rebuilt at the end.
+
+Rows nothing else points at (M2M and access rows, role assignments,
+outputs and chat messages) are streamed with COPY on PostgreSQL, which
+is several times faster than multi-row INSERTs at millions of rows.
+PostgreSQL refuses COPY into tables with row-level security, so INSERTs
+are used when TENANT_RLS_ENABLED is set.
+
+All random choices come from a seeded generator, so the same seed and
+scale always produce the same dataset.
+"""
+
+import datetime
+import io
+import random
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.utils import timezone
+
+from core.tenancy import rls_enabled
+from organizations.models import (
+    Department,
+    Organization,
+    Role,
+    UserOrganizationRole,
+)
+from task_chat.models import TaskChatMessage
+from tasks.models import (
+    Task,
+    TaskAccess,
+    TaskOutput,
+    TaskOutputField,
+    UserTaskStats,
+)
+
+
+User = get_user_model()
+
+# Rows per tenant at each named scale
+SCALE_PRESETS = {
+    'small': {
+        'organizations': 3,
+        'departments': 2,
+        'users': 8,
+        'tasks': 12,
+        'fields': 2,
+        'assignees': 2,
+        'viewers': 2,
+        'messages': 3,
+    },
+    'medium': {
+        'organizations': 10,
+        'departments': 4,
+        'users': 50,
+        'tasks': 200,
+        'fields': 2,
+        'assignees': 3,
+        'viewers': 2,
+        'messages': 5,
+    },
+    # 50 orgs, 5k users, 100k tasks, 1M outputs
+    'realistic': {
+        'organizations': 50,
+        'departments': 5,
+        'users': 100,
+        'tasks': 2000,
+        'fields': 2,
+        'assignees': 5,
+        'viewers': 3,
+        'messages': 2,
+    },
+}
+
+# Permissions granted by each generated role
+ROLE_PERMISSIONS = {
+    'Manager': [
+        f'{app_label}.{action}_{model}'
+        for app_label, model in [
+            ('tasks', 'task'),
+            ('tasks', 'taskoutputfield'),
+            ('organizations', 'department'),
+            ('organizations', 'userorganizationrole'),
+        ]
+        for action in ('view', 'add', 'change', 'delete')
+    ] + [
+        'organizations.view_organization',
+        'organizations.view_role',
+        'accounts.view_customuser',
+    ],
+    'Member': [
+        'tasks.view_task',
+        'tasks.view_taskoutputfield',
+        'organizations.view_department',
+    ],
+    'Observer': ['tasks.view_task'],
+}
+
+DEFAULT_PASSWORD = 'password'
+
+# Characters escaped in COPY text format
+_COPY_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    '\t': '\\t',
+    '\n': '\\n',
+    '\r': '\\r',
+})
+
+
+def _copy_value(value):
+    """
+    Render one column value in PostgreSQL COPY text format.
+
+    Args:
+        value: Database-ready Python value
+
+    Returns:
+        str: Escaped field, \\N for NULL
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return str(value).translate(_COPY_ESCAPES)
+
+
+class BulkTenantFactory:
+    """
+    Create organizations full of users, tasks, outputs and chat messages.
+
+    Names are prefixed with the seed so datasets of different seeds can
+    share a database.
+
+    Attributes:
+        seed: Seed of the random generator
+        prefix: Prefix of generated organization, role and user names
+        batch_size: Rows per INSERT statement
+        use_copy: Whether leaf rows are loaded with COPY
+    """
+
+    def __init__(self, seed=0, batch_size=1000, password=DEFAULT_PASSWORD,
+                 use_copy=None):
+        self.seed = seed
+        self.prefix = f'load{seed}'
+        self.batch_size = batch_size
+        if use_copy is None:
+            use_copy = connection.vendor == 'postgresql' and not rls_enabled()
+        self.use_copy = use_copy
+        self.random = random.Random(seed)
+        # Hashing once keeps user creation from being CPU bound
+        self.password_hash = make_password(password)
+        self.now = timezone.now()
+
+    def create(self, organizations, departments, users, tasks, fields,
+               assignees, viewers, messages, progress=None):
+        """
+        Create tenants and refresh the derived tables.
+
+        Args:
+            organizations: Number of organizations
+            departments: Departments per organization
+            users: Members per organization
+            tasks: Tasks per organization
+            fields: Output fields per task
+            assignees: Assigned users per task, each submitting every field
+            viewers: Viewers per task
+            messages: Chat messages per task
+            progress: Optional callable(done, totals) run after each tenant
+
+        Returns:
+            dict: Number of rows created per model label
+        """
+        totals = Counter()
+        roles = self._create_roles(totals)
+        for index in range(organizations):
+            self._create_tenant(
+                index, roles, totals,
+                departments=departments,
+                users=users,
+                tasks=tasks,
+                fields=fields,
+                assignees=min(assignees, users),
+                viewers=min(viewers, max(users - assignees, 0)),
+                messages=messages,
+            )
+            if progress is not None:
+                progress(index + 1, totals)
+
+        totals[UserTaskStats._meta.label] = UserTaskStats.objects.rebuild()
+        return dict(totals)
+
+    def _insert(self, model, objs, totals):
+        """
+        Insert rows in batches, setting primary keys on the instances.
+
+        Args:
+            model: Model class
+            objs: List of unsaved instances
+            totals: Counter of created rows per model label
+
+        Returns:
+            list: The saved instances
+        """
+        created = model.objects.bulk_create(objs, batch_size=self.batch_size)
+        totals[model._meta.label] += len(created)
+        return created
+
+    def _load(self, model, objs, totals):
+        """
+        Insert rows whose primary keys are not needed afterwards.
+
+        Args:
+            model: Model class
+            objs: List of unsaved instances
+            totals: Counter of created rows per model label
+        """
+        if not self.use_copy:
+            self._insert(model, objs, totals)
+            return
+        if objs:
+            self._copy(model, objs)
+        totals[model._meta.label] += len(objs)
+
+    def _copy(self, model, objs):
+        """
+        Stream rows into a table with COPY FROM STDIN.
+
+        Values go through the same pre_save and get_db_prep_save steps
+        as an INSERT, so auto_now_add and foreign keys are filled in.
+
+        Args:
+            model: Model class
+            objs: List of unsaved instances
+        """
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        buffer = io.StringIO()
+        for obj in objs:
+            buffer.write('\t'.join(
+                _copy_value(field.get_db_prep_save(
+                    field.pre_save(obj, add=True), connection
+                ))
+                for field in fields
+            ))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        quote = connection.ops.quote_name
+        sql = 'COPY {} ({}) FROM STDIN'.format(
+            quote(model._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+        )
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, 'copy_expert'):
+                # psycopg2
+                cursor.cursor.copy_expert(sql, buffer)
+            else:
+                # psycopg 3
+                with cursor.cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    def _create_roles(self, totals):
+        """
+        Create the shared roles of this seed with their permissions.
+
+        Args:
+            totals: Counter of created rows per model label
+
+        Returns:
+            list: Role instances
+        """
+        roles = self._insert(Role, [
+            Role(name=f'{self.prefix} {name}', description=f'{name} role')
+            for name in ROLE_PERMISSIONS
+        ], totals)
+
+        permission_ids = {
+            f'{app_label}.{codename}': pk
+            for pk, app_label, codename in Permission.objects.values_list(
+                'pk', 'content_type__app_label', 'codename'
+            )
+        }
+        through = Role.permissions.through
+        self._load(through, [
+            through(role_id=role.pk, permission_id=permission_ids[name])
+            for role, names in zip(roles, ROLE_PERMISSIONS.values())
+            for name in names
+        ], totals)
+        return roles
+
+    def _through(self, field, task, related_id):
+        """
+        Build one row of a Task M2M through table.
+
+        Args:
+            field: ManyToManyField of Task
+            task: Saved Task instance
+            related_id: Primary key of the related object
+
+        Returns:
+            Model: Unsaved through model instance
+        """
+        return field.remote_field.through(**{
+            f'{field.m2m_field_name()}_id': task.pk,
+            f'{field.m2m_reverse_field_name()}_id': related_id,
+        })
+
+    def _create_tenant(self, index, roles, totals, departments, users,
+                       tasks, fields, assignees, viewers, messages):
+        """
+        Create one organization and everything that belongs to it.
+
+        Args:
+            index: Sequence number of the organization
+            roles: Role instances to assign
+            totals: Counter of created rows per model label
+            departments: Departments in the organization
+            users: Members of the organization
+            tasks: Tasks in the organization
+            fields: Output fields per task
+            assignees: Assigned users per task
+            viewers: Viewers per task
+            messages: Chat messages per task
+        """
+        rng = self.random
+        tag = f'{self.prefix}_o{index}'
+
+        organization, = self._insert(Organization, [Organization(
+            name=f'{self.prefix} Organization {index}',
+            description=f'Generated tenant {index}',
+        )], totals)
+
+        depts = self._insert(Department, [
+            Department(organization=organization, name=f'Department {n}')
+            for n in range(departments)
+        ], totals)
+
+        members = self._insert(User, [
+            User(
+                username=f'{tag}_u{n}',
+                email=f'{tag}_u{n}@example.com',
+                first_name=f'User{n}',
+                last_name=f'Org{index}',
+                password=self.password_hash,
+            )
+            for n in range(users)
+        ], totals)
+
+        self._load(UserOrganizationRole, [
+            UserOrganizationRole(
+                user=member,
+                organization=organization,
+                department=rng.choice(depts) if depts else None,
+                role=rng.choice(roles),
+            )
+            for member in members
+        ], totals)
+
+        task_list = self._insert(Task, [
+            Task(
+                name=f'Task {n} of {organization.name}',
+                description=f'Generated task {n}',
+                organization=organization,
+                due_date=self.now + datetime.timedelta(
+                    days=rng.randint(-30, 90)
+                ),
+            )
+            for n in range(tasks)
+        ], totals)
+
+        member_ids = [member.pk for member in members]
+        department_rows, assigned_rows, viewer_rows, grants = [], [], [], []
+        submitters = {}
+        for task in task_list:
+            if depts:
+                department_rows.append(self._through(
+                    Task.departments.field, task, rng.choice(depts).pk
+                ))
+            picked = rng.sample(member_ids, assignees + viewers)
+            submitters[task.pk] = picked[:assignees]
+            for user_id in picked[:assignees]:
+                assigned_rows.append(self._through(
+                    Task.assigned_users.field, task, user_id
+                ))
+                grants.append(TaskAccess(
+                    task=task, user_id=user_id, organization=organization,
+                    level=TaskAccess.LEVEL_ASSIGNED,
+                ))
+            for user_id in picked[assignees:]:
+                viewer_rows.append(self._through(
+                    Task.viewers.field, task, user_id
+                ))
+                grants.append(TaskAccess(
+                    task=task, user_id=user_id, organization=organization,
+                    level=TaskAccess.LEVEL_VIEWER,
+                ))
+
+        self._load(Task.departments.through, department_rows, totals)
+        self._load(Task.assigned_users.through, assigned_rows, totals)
+        self._load(Task.viewers.through, viewer_rows, totals)
+        self._load(TaskAccess, grants, totals)
+
+        output_fields = self._insert(TaskOutputField, [
+            TaskOutputField(
+                task=task, name=f'Field {n}', field_type='text',
+                required=n == 0,
+            )
+            for task in task_list
+            for n in range(fields)
+        ], totals)
+
+        self._load(TaskOutput, [
+            TaskOutput(
+                output_field=field,
+                user_id=user_id,
+                value_text=f'Answer {rng.randint(1, 10 ** 6)}',
+            )
+            for field in output_fields
+            for user_id in submitters[field.task_id]
+        ], totals)
+
+        self._load(TaskChatMessage, [
+            TaskChatMessage(
+                task=task,
+                user_id=rng.choice(member_ids),
+                message=f'Message {n} about {task.name}',
+            )
+            for task in task_list
+            for n in range(messages)
+        ] if member_ids else [], totals)
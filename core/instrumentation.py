@@ -0,0 +1,124 @@
+"""Per-request SQL and timing instrumentation.
+
+QueryRecorder is installed as a database execute wrapper for the span
+of one request and records every statement with its duration. Statements
+are grouped by fingerprint, the SQL with literals and placeholder lists
+normalized away, so the repeated lookups of an N+1 loop collapse into
+one fingerprint with a high count.
+
+The summary is exposed to clients as a Server-Timing header and written
+to the log as one structured record per request; slow requests are
+sampled with their full query list.
+"""
+
+import hashlib
+import re
+import time
+from collections import Counter
+
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?')
+_VALUE_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Reduce a statement to its shape, independent of the values used.
+
+    Args:
+        sql: SQL text as sent to the database
+
+    Returns:
+        str: Normalized SQL
+    """
+    sql = _STRING_LITERAL.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _VALUE_LIST.sub('(...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql):
+    """
+    Build a short stable identifier of a statement's shape.
+
+    Args:
+        sql: SQL text as sent to the database
+
+    Returns:
+        str: 12 character hex digest of the normalized SQL
+    """
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper collecting the statements of one request.
+
+    Attributes:
+        queries: List of (sql, duration_ms) tuples in execution order
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, (time.perf_counter() - start) * 1000)
+            )
+
+    @property
+    def count(self):
+        """Number of statements executed."""
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        """Summed statement time in milliseconds."""
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """
+        Group repeated statement shapes.
+
+        Returns:
+            list: (fingerprint, count, normalized_sql) tuples for shapes
+            executed more than once, most frequent first
+        """
+        shapes = {}
+        counts = Counter()
+        for sql, _ in self.queries:
+            key = fingerprint(sql)
+            counts[key] += 1
+            shapes.setdefault(key, sql)
+        return [
+            (key, count, normalize_sql(shapes[key]))
+            for key, count in counts.most_common()
+            if count > 1
+        ]
+
+
+def server_timing(recorder, total_ms):
+    """
+    Format request timings as a Server-Timing header value.
+
+    Args:
+        recorder: QueryRecorder of the request
+        total_ms: Wall time of the request in milliseconds
+
+    Returns:
+        str: Header value with db, app and total metrics
+    """
+    db_ms = recorder.total_ms
+    return (
+        f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+        f'app;dur={max(total_ms - db_ms, 0):.1f}, '
+        f'total;dur={total_ms:.1f}'
+    )
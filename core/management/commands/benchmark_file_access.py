@@ -0,0 +1,133 @@
+"""Django management command to benchmark protected file access checks."""
+import logging
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.tenancy import tenant_scope
+from core.views import annotate_file_access, has_file_access
+from tasks.models import TaskOutput
+
+
+# Configure logger for this module
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def legacy_has_file_access(user, task_output):
+    """Reproduce the original access check for comparison.
+
+    Loads the output's field, task and organization lazily and
+    materializes every assigned user and viewer of the task.
+
+    Args:
+        user: User instance.
+        task_output: TaskOutput instance.
+
+    Returns:
+        Boolean indicating whether user has access.
+    """
+    if user.is_superuser:
+        return True
+
+    task = task_output.output_field.task
+
+    if task_output.user == user:
+        return True
+
+    user_orgs = user.user_org_roles.values_list(
+        'organization', flat=True
+    ).distinct()
+
+    if task.organization.id not in user_orgs:
+        return False
+
+    return user in task.assigned_users.all() or user in task.viewers.all()
+
+
+class Command(BaseCommand):
+    """Management command comparing the legacy and current file checks.
+
+    Both paths load the TaskOutput and decide access for the given
+    user, mirroring what serve_protected_file does before streaming.
+    Reports queries per check and mean latency for each path.
+    """
+
+    help = 'Compare query count and latency of protected file access checks'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        Args:
+            parser: ArgumentParser instance.
+        """
+        parser.add_argument(
+            '--output',
+            type=int,
+            required=True,
+            help='TaskOutput ID to check'
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Username requesting the file'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Number of checks per path (default: 200)'
+        )
+
+    @tenant_scope(unrestricted=True)
+    def handle(self, *args, **options):
+        """Execute the management command.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist')
+
+        output_id = options['output']
+        if not TaskOutput.objects.filter(id=output_id).exists():
+            raise CommandError(f'TaskOutput {output_id} does not exist')
+
+        def legacy():
+            output = TaskOutput.objects.get(id=output_id)
+            return legacy_has_file_access(user, output)
+
+        def current():
+            output = annotate_file_access(
+                TaskOutput.objects.select_related('output_field__task'),
+                user
+            ).get(id=output_id)
+            return has_file_access(user, output)
+
+        for label, check in [('legacy', legacy), ('current', current)]:
+            with CaptureQueriesContext(connection) as queries:
+                granted = check()
+
+            start = time.perf_counter()
+            for _ in range(options['iterations']):
+                check()
+            mean_ms = (
+                (time.perf_counter() - start) * 1000 / options['iterations']
+            )
+
+            message = (
+                f'{label}: access={granted} queries={len(queries)} '
+                f'mean={mean_ms:.3f} ms'
+            )
+            self.stdout.write(message)
+            logger.info(message)
@@ -0,0 +1,99 @@
+"""Django management command to explain organization-scoped list queries."""
+import logging
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.access import AccessContext
+from core.scoping import org_scopes
+from core.tenancy import tenant_scope
+from organizations.models import Department
+from tasks.models import Task
+
+
+# Configure logger for this module
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Management command to benchmark the organization scope registry.
+
+    Prints the SQL, query plan, matching row count and best first-page
+    time for the task, department and user list querysets as scoped for
+    a given user. Intended to be run against a database loaded with
+    100k+ rows to verify the planner uses the indexed EXISTS/join paths.
+    """
+
+    help = 'Explain and time organization-scoped list queries'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        Args:
+            parser: ArgumentParser instance.
+        """
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Username whose organization memberships are used'
+        )
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Run EXPLAIN ANALYZE (PostgreSQL only)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Number of timed first-page evaluations (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the management command.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["user"]}" does not exist')
+
+        org_ids = AccessContext(user).org_ids
+        self.stdout.write(
+            f'Scoping to {len(org_ids)} organization(s) of "{user.username}"'
+        )
+
+        querysets = [
+            ('Task list', Task.objects.all()),
+            ('Department list', Department.objects.all()),
+            ('User list', User.objects.all()),
+        ]
+
+        for label, queryset in querysets:
+            # Row-level security mode scopes the session like a request
+            with tenant_scope(org_ids, unrestricted=user.is_superuser):
+                result = org_scopes.benchmark(
+                    queryset,
+                    org_ids,
+                    analyze=options['analyze'],
+                    repeat=options['repeat'],
+                )
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(result['sql'])
+            self.stdout.write(result['plan'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{result["count"]} rows, first page best of '
+                f'{options["repeat"]}: {result["best_ms"]:.2f} ms'
+            ))
+            logger.info(
+                '%s: %s rows, %.2f ms', label, result['count'],
+                result['best_ms']
+            )
@@ -0,0 +1,383 @@
+"""Django management command to measure chat message throughput."""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.instrumentation import QueryRecorder
+from core.tenancy import tenant_scope
+from task_chat.consumers import ChatConsumer
+from task_chat.models import TaskChatMessage
+from task_chat.persistence import get_write_buffer
+from task_chat.replay import get_room_histories
+from task_chat.routing import websocket_urlpatterns
+from tasks.models import TaskAccess
+
+
+# Configure logger for this module
+logger = logging.getLogger(__name__)
+
+
+class _CapturingLayer:
+    """Channel layer stand-in keeping group events for --fanout."""
+
+    def __init__(self):
+        self.events = []
+
+    async def group_send(self, group, message):
+        self.events.append(message)
+
+
+class Command(BaseCommand):
+    """Management command to benchmark ChatConsumer under many sockets.
+
+    Opens --sockets WebSocket connections spread over --rooms tasks,
+    each as a user with access to its task, and has every socket (or
+    the first --senders) send --messages messages concurrently. The run
+    ends once every socket has received the broadcast of every message
+    in its room and the write buffer is flushed. Reports messages per
+    second, CPU time per message, SQL statements and the time to
+    persist everything.
+
+    With --fanout the channel layer and transport are left out: one
+    room of --sockets consumers is built in-process, each message is
+    passed to the sender's receive() and the resulting group event to
+    every member's chat_message(), and the CPU time of the consumer
+    code per message is reported.
+
+    Needs tasks with assigned users or viewers, e.g. from seed_load.
+    Uses an in-memory channel layer unless --channel-layer is given, so
+    only the consumer and the database are measured. Messages written
+    by the run are deleted afterwards unless --keep is given.
+    """
+
+    help = 'Measure chat throughput with many concurrent WebSockets'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        Args:
+            parser: ArgumentParser instance.
+        """
+        parser.add_argument(
+            '--sockets',
+            type=int,
+            default=200,
+            help='Concurrent connections (default: 200)'
+        )
+        parser.add_argument(
+            '--rooms',
+            type=int,
+            default=20,
+            help='Tasks the connections are spread over (default: 20)'
+        )
+        parser.add_argument(
+            '--messages',
+            type=int,
+            default=10,
+            help='Messages sent by each connection (default: 10)'
+        )
+        parser.add_argument(
+            '--senders',
+            type=int,
+            help='Connections that send messages (default: all)'
+        )
+        parser.add_argument(
+            '--mode',
+            choices=['durable', 'fast'],
+            help='CHAT_PERSIST_MODE for the run (default: setting)'
+        )
+        parser.add_argument(
+            '--flush-size',
+            type=int,
+            help='CHAT_FLUSH_SIZE for the run; 1 writes every message '
+                 'on its own (default: setting)'
+        )
+        parser.add_argument(
+            '--flush-interval',
+            type=float,
+            help='CHAT_FLUSH_INTERVAL for the run (default: setting)'
+        )
+        parser.add_argument(
+            '--fanout',
+            action='store_true',
+            help='Measure consumer CPU per message in one room of '
+                 '--sockets members, without channel layer or transport'
+        )
+        parser.add_argument(
+            '--channel-layer',
+            action='store_true',
+            help='Use the configured channel layer instead of memory'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Seconds to wait for any one broadcast (default: 30)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the messages written by the run'
+        )
+
+    @tenant_scope(unrestricted=True)
+    def handle(self, *args, **options):
+        """Execute the management command.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+
+        Raises:
+            CommandError: If there are not enough tasks with members.
+        """
+        if options['senders'] is None:
+            options['senders'] = options['sockets']
+        for name in ('sockets', 'rooms', 'messages', 'senders'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be positive')
+        if options['senders'] > options['sockets']:
+            raise CommandError('--senders must not exceed --sockets')
+
+        members = self._room_members(options['rooms'])
+        if len(members) < options['rooms']:
+            raise CommandError(
+                f'Found {len(members)} task(s) with members, '
+                f'{options["rooms"]} needed; run seed_load first'
+            )
+
+        overrides = {
+            name: options[option]
+            for name, option in [
+                ('CHAT_PERSIST_MODE', 'mode'),
+                ('CHAT_FLUSH_SIZE', 'flush_size'),
+                ('CHAT_FLUSH_INTERVAL', 'flush_interval'),
+            ]
+            if options[option] is not None
+        }
+        if not options['channel_layer']:
+            overrides['CHANNEL_LAYERS'] = {'default': {
+                'BACKEND': 'channels.layers.InMemoryChannelLayer',
+                'CONFIG': {'capacity': 10 ** 6},
+            }}
+
+        marker = f'bench-{uuid.uuid4().hex[:8]}'
+        if options['fanout']:
+            with override_settings(**overrides):
+                task_id, users = members[0]
+                cpu = async_to_sync(self._fanout)(
+                    task_id, users, marker, options
+                )
+            message = (
+                f'{cpu * 1000 / options["messages"]:.3f} ms CPU per message '
+                f'in a room of {options["sockets"]}'
+            )
+            self.stdout.write(self.style.SUCCESS(message))
+            logger.info(message)
+            TaskChatMessage.objects.filter(message__startswith=marker).delete()
+            return
+
+        recorder = QueryRecorder()
+        with override_settings(**overrides):
+            self.stdout.write(
+                f'{options["sockets"]} sockets in {options["rooms"]} rooms, '
+                f'{options["messages"]} messages each, '
+                f'{settings.CHAT_PERSIST_MODE} mode, flush size '
+                f'{settings.CHAT_FLUSH_SIZE}, interval '
+                f'{settings.CHAT_FLUSH_INTERVAL}s'
+            )
+            # Thread-sensitive database calls run on this thread
+            with connection.execute_wrapper(recorder):
+                result = async_to_sync(self._run)(members, marker, options)
+
+        saved = TaskChatMessage.objects.filter(
+            message__startswith=marker
+        ).count()
+        sent = options['senders'] * options['messages']
+        self.stdout.write(
+            f'  delivered: {result["delivered"]}/{result["expected"]} frames'
+        )
+        self.stdout.write(f'  persisted: {saved}/{sent} messages')
+        self.stdout.write(
+            f'  SQL: {recorder.count} statements, '
+            f'{recorder.total_ms:.0f} ms'
+        )
+        self.stdout.write(
+            f'  CPU: {result["cpu_s"] * 1000 / sent:.2f} ms per message, '
+            f'{result["cpu_s"] * 10 ** 6 / result["expected"]:.1f} us '
+            f'per delivered frame'
+        )
+        self.stdout.write(
+            f'  broadcast: {result["broadcast_s"]:.2f}s, '
+            f'persisted after {result["persisted_s"]:.2f}s'
+        )
+        message = (
+            f'{sent / result["persisted_s"]:.0f} messages/s '
+            f'({options["sockets"]} sockets)'
+        )
+        self.stdout.write(self.style.SUCCESS(message))
+        logger.info(message)
+
+        if not options['keep']:
+            TaskChatMessage.objects.filter(message__startswith=marker).delete()
+
+    def _room_members(self, rooms):
+        """Find the first tasks with members and their users.
+
+        Args:
+            rooms: Number of tasks needed.
+
+        Returns:
+            List of (task_id, users) tuples.
+        """
+        members = defaultdict(list)
+        grants = TaskAccess.objects.select_related('user').order_by(
+            'task_id', 'user_id'
+        )
+        for grant in grants.iterator():
+            if grant.task_id not in members and len(members) == rooms:
+                break
+            members[grant.task_id].append(grant.user)
+        return list(members.items())
+
+    async def _fanout(self, task_id, users, marker, options):
+        """Send messages through the handlers of one in-process room.
+
+        Args:
+            task_id: Task of the room.
+            users: Users the members connect as.
+            marker: Prefix of every message sent.
+            options: Command options.
+
+        Returns:
+            CPU seconds spent in the consumers for all messages.
+        """
+        layer = _CapturingLayer()
+        frames = []
+
+        async def deliver(message):
+            frames.append(message)
+
+        room = []
+        for seat in range(options['sockets']):
+            consumer = ChatConsumer()
+            consumer.scope = {
+                'user': users[seat % len(users)],
+                'url_route': {'kwargs': {'task_id': task_id}},
+            }
+            consumer.channel_layer = layer
+            consumer.channel_name = f'bench.{seat}'
+            consumer.base_send = deliver
+            consumer.task_id = task_id
+            consumer.room_group_name = f'chat_{task_id}'
+            consumer.history = get_room_histories().join(task_id)
+            consumer.accepted = True
+            consumer.access_checked_at = time.monotonic()
+            room.append(consumer)
+
+        cpu = time.process_time()
+        for n in range(options['messages']):
+            await room[0].receive(json.dumps({'message': f'{marker} {n}'}))
+            event = layer.events.pop()
+            for consumer in room:
+                await consumer.chat_message(event)
+        cpu = time.process_time() - cpu
+
+        await get_write_buffer().flush()
+        if len(frames) != options['sockets'] * options['messages']:
+            raise CommandError(f'Delivered {len(frames)} frames')
+        return cpu
+
+    async def _run(self, members, marker, options):
+        """Connect, exchange the messages and wait for persistence.
+
+        Args:
+            members: (task_id, users) tuples, one per room.
+            marker: Prefix of every message sent.
+            options: Command options.
+
+        Returns:
+            Dictionary with delivered and expected frame counts, the
+            broadcast and persistence durations and the CPU time of
+            the exchange in seconds.
+        """
+        application = URLRouter(websocket_urlpatterns)
+        sockets = []
+        room_sizes = defaultdict(int)
+        room_senders = defaultdict(int)
+        for index in range(options['sockets']):
+            task_id, users = members[index % len(members)]
+            communicator = WebsocketCommunicator(
+                application, f'/ws/chat/{task_id}/'
+            )
+            seat = index // len(members)
+            communicator.scope['user'] = users[seat % len(users)]
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise CommandError(f'Connection to task {task_id} refused')
+            sockets.append((task_id, communicator))
+            room_sizes[task_id] += 1
+            if index < options['senders']:
+                room_senders[task_id] += 1
+
+        async def send(number, communicator):
+            for n in range(options['messages']):
+                await communicator.send_json_to(
+                    {'message': f'{marker} {number}.{n}'}
+                )
+
+        async def receive(task_id, communicator):
+            received = 0
+            expected = room_senders[task_id] * options['messages']
+            try:
+                while received < expected:
+                    await communicator.receive_from(options['timeout'])
+                    received += 1
+            except asyncio.TimeoutError:
+                pass
+            return received
+
+        start = time.perf_counter()
+        cpu = time.process_time()
+        results = await asyncio.gather(
+            *(
+                send(number, communicator)
+                for number, (_, communicator)
+                in enumerate(sockets[:options['senders']])
+            ),
+            *(
+                receive(task_id, communicator)
+                for task_id, communicator in sockets
+            ),
+        )
+        broadcast = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+        await get_write_buffer().flush()
+        persisted = time.perf_counter() - start
+
+        for _, communicator in sockets:
+            await communicator.disconnect()
+        return {
+            'delivered': sum(results[options['senders']:]),
+            'expected': sum(
+                size * room_senders[task_id] * options['messages']
+                for task_id, size in room_sizes.items()
+            ),
+            'broadcast_s': broadcast,
+            'persisted_s': persisted,
+            'cpu_s': cpu,
+        }
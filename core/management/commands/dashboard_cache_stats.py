@@ -0,0 +1,56 @@
+"""Django management command to report dashboard cache effectiveness."""
+import logging
+
+from django.core.management.base import BaseCommand
+
+from core.dashboard_cache import get_cache_stats, reset_cache_stats
+
+
+# Configure logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Management command printing dashboard cache hit and miss counts.
+
+    The counters live in the shared cache, so the figures cover every
+    worker using the same backend. Use --reset to start a new sampling
+    window, for example after changing DASHBOARD_CACHE_TIMEOUT.
+    """
+
+    help = 'Show or reset dashboard cache hit/miss counters'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        Args:
+            parser: ArgumentParser instance.
+        """
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Reset the counters after printing them'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the management command.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        stats = get_cache_stats()
+        ratio = stats['hit_ratio']
+        message = (
+            f'hits={stats["hits"]} misses={stats["misses"]} '
+            f'hit_ratio={"n/a" if ratio is None else f"{ratio:.1%}"}'
+        )
+        self.stdout.write(message)
+        logger.info(message)
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset'))
@@ -0,0 +1,41 @@
+"""Django management command to rebuild the per-user task statistics."""
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.tenancy import tenant_scope
+from tasks.models import UserTaskStats
+
+
+# Configure logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Management command to recompute UserTaskStats from scratch.
+
+    The table is normally maintained incrementally by signals. This
+    command repairs it after bulk imports or raw SQL changes that bypass
+    them, replacing every row inside one transaction.
+    """
+
+    help = 'Rebuild the UserTaskStats rollup table from TaskAccess grants'
+
+    @tenant_scope(unrestricted=True)
+    def handle(self, *args, **options):
+        """Execute the management command.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+        """
+        with transaction.atomic():
+            count = UserTaskStats.objects.rebuild()
+
+        message = f'Rebuilt {count} user task statistics row(s)'
+        self.stdout.write(self.style.SUCCESS(message))
+        logger.info(message)
@@ -0,0 +1,82 @@
+"""Django management command to manage tenant row-level security policies."""
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from core.tenancy import (
+    RLS_POLICIES,
+    install_policies,
+    rls_enabled,
+    uninstall_policies,
+)
+
+
+# Configure logger for this module
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Management command to install or remove tenant RLS policies.
+
+    Policies are only supported on PostgreSQL. Installing them requires
+    TENANT_RLS_ENABLED=True: the policies deny every row to sessions
+    without a tenant scope, so requests must set one.
+    """
+
+    help = 'Install or remove PostgreSQL row-level security policies'
+
+    def add_arguments(self, parser):
+        """Register command line options.
+
+        Args:
+            parser: ArgumentParser instance.
+        """
+        parser.add_argument(
+            'action',
+            choices=['install', 'uninstall'],
+            help='Whether to install or remove the policies'
+        )
+        parser.add_argument(
+            '--database',
+            default='default',
+            help='Database alias to operate on (default: "default")'
+        )
+
+    def handle(self, *args, **options):
+        """Execute the management command.
+
+        Args:
+            *args: Variable length argument list.
+            **options: Arbitrary keyword arguments.
+
+        Returns:
+            None
+
+        Raises:
+            CommandError: If the database is not PostgreSQL, or when
+                installing while TENANT_RLS_ENABLED is not set.
+        """
+        connection = connections[options['database']]
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Row-level security policies require PostgreSQL'
+            )
+        if options['action'] == 'install' and not rls_enabled():
+            raise CommandError(
+                'Set TENANT_RLS_ENABLED=True before installing the '
+                'policies; they deny every row to unscoped sessions'
+            )
+
+        with transaction.atomic(using=options['database']):
+            if options['action'] == 'install':
+                install_policies(connection)
+            else:
+                uninstall_policies(connection)
+
+        message = (
+            f'Tenant policies {options["action"]}ed on: '
+            f'{", ".join(RLS_POLICIES)}'
+        )
+        self.stdout.write(self.style.SUCCESS(message))
+        logger.info(message)
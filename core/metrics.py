@@ -0,0 +1,471 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Counters, gauges and histograms are declared once at import time on the
+module REGISTRY and updated from request, WebSocket and file serving
+code. Updates are plain dictionary operations under a lock.
+
+Every process keeps its own values. When METRICS_MULTIPROC_DIR is set,
+each process (gunicorn workers as well as daphne) also writes a snapshot
+to that shared directory every METRICS_FLUSH_INTERVAL seconds, and the
+exposition merges all snapshots: counters and histograms are summed over
+every file, gauges only over processes that wrote recently, so the
+connections of a dead worker stop being reported. Empty the directory
+before the processes start.
+"""
+
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the default latency histogram buckets
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Snapshots older than this many flush intervals belong to dead processes
+STALE_INTERVALS = 3
+
+
+class Metric:
+    """
+    Family of labelled samples sharing a name.
+
+    Attributes:
+        registry: Registry the metric belongs to
+        name: Metric name
+        documentation: HELP text
+        labelnames: Names of the labels every update must provide
+        values: Current value per tuple of label values
+    """
+
+    kind = None
+
+    def __init__(self, registry, name, documentation, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+
+    def _key(self, labels):
+        """
+        Build the sample key of an update.
+
+        Args:
+            labels: Label values keyed by label name
+
+        Returns:
+            tuple: Label values in declaration order
+
+        Raises:
+            ValueError: If the labels do not match labelnames
+        """
+        if labels.keys() != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} expects labels {self.labelnames}, '
+                f'got {tuple(labels)}'
+            )
+        self.registry.check_process()
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _copy(self, value):
+        return value
+
+    def snapshot(self):
+        """
+        Copy the family into a JSON serializable dictionary.
+
+        Returns:
+            dict: kind, help, labels and samples as [label values, value]
+        """
+        return {
+            'kind': self.kind,
+            'help': self.documentation,
+            'labels': list(self.labelnames),
+            'samples': [
+                [list(key), self._copy(value)]
+                for key, value in self.values.items()
+            ],
+        }
+
+
+class Counter(Metric):
+    """Monotonically increasing total."""
+
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        """
+        Add to the total of a label combination.
+
+        Args:
+            amount: Non-negative increment
+            **labels: Label values
+
+        Raises:
+            ValueError: If amount is negative
+        """
+        if amount < 0:
+            raise ValueError(f'{self.name} can only increase')
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value that goes up and down, such as open connections."""
+
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        """
+        Raise the value of a label combination.
+
+        Args:
+            amount: Increment
+            **labels: Label values
+        """
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        """
+        Lower the value of a label combination.
+
+        Args:
+            amount: Decrement
+            **labels: Label values
+        """
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        """
+        Replace the value of a label combination.
+
+        Args:
+            value: New value
+            **labels: Label values
+        """
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Distribution of observations over fixed buckets.
+
+    Attributes:
+        buckets: Sorted upper bounds, +Inf is implied
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, registry, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        """
+        Record one observation.
+
+        Args:
+            value: Observed value, in seconds for latencies
+            **labels: Label values
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.registry.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {
+                    'counts': [0] * (len(self.buckets) + 1),
+                    'sum': 0,
+                }
+            state['counts'][index] += 1
+            state['sum'] += value
+
+    def _copy(self, value):
+        return {'counts': list(value['counts']), 'sum': value['sum']}
+
+    def snapshot(self):
+        family = super().snapshot()
+        family['buckets'] = list(self.buckets)
+        return family
+
+
+class Registry:
+    """
+    Collection of the metrics of one process.
+
+    Attributes:
+        lock: Lock guarding every metric value
+        metrics: Metric instances keyed by name
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self._pid = None
+
+    def _register(self, cls, name, documentation, labelnames, **kwargs):
+        """
+        Declare a metric, returning the existing one on redeclaration.
+
+        Args:
+            cls: Metric subclass
+            name: Metric name
+            documentation: HELP text
+            labelnames: Label names
+            **kwargs: Extra arguments of the metric class
+
+        Returns:
+            Metric: Registered instance
+
+        Raises:
+            ValueError: If the name is registered with another kind or
+                other labels
+        """
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(
+                    self, name, documentation, labelnames, **kwargs
+                )
+            elif (type(metric) is not cls or
+                    metric.labelnames != tuple(labelnames)):
+                raise ValueError(f'{name} is already registered differently')
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        """Declare a Counter."""
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        """Declare a Gauge."""
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        """Declare a Histogram."""
+        return self._register(
+            Histogram, name, documentation, labelnames, buckets=buckets
+        )
+
+    def check_process(self):
+        """
+        Prepare the registry for the current process.
+
+        Values inherited through fork() belong to the parent and are
+        dropped, and the snapshot writer is started in multiprocess
+        mode. Called on every update; a no-op after the first one.
+        """
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+        with self.lock:
+            if pid == self._pid:
+                return
+            self._pid = pid
+            for metric in self.metrics.values():
+                metric.values.clear()
+        if settings.METRICS_MULTIPROC_DIR:
+            thread = threading.Thread(
+                target=self._write_periodically,
+                name='metrics-writer',
+                daemon=True,
+            )
+            thread.start()
+            atexit.register(self.write)
+
+    def snapshot(self):
+        """
+        Copy every metric of this process.
+
+        Returns:
+            dict: Family dictionaries keyed by metric name
+        """
+        with self.lock:
+            return {
+                name: metric.snapshot()
+                for name, metric in self.metrics.items()
+            }
+
+    def snapshot_path(self):
+        """
+        Path of this process's snapshot in METRICS_MULTIPROC_DIR.
+
+        The host name keeps processes of different containers sharing
+        the directory apart.
+
+        Returns:
+            str: File path
+        """
+        return os.path.join(
+            settings.METRICS_MULTIPROC_DIR,
+            f'{socket.gethostname()}_{os.getpid()}.json',
+        )
+
+    def write(self):
+        """Atomically replace this process's snapshot file."""
+        path = self.snapshot_path()
+        temporary = f'{path}.tmp'
+        with open(temporary, 'w') as snapshot_file:
+            json.dump(self.snapshot(), snapshot_file)
+        os.replace(temporary, path)
+
+    def _write_periodically(self):
+        """Write snapshots forever; runs in a daemon thread."""
+        while True:
+            try:
+                self.write()
+            except OSError:
+                logger.exception('Could not write metrics snapshot')
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+
+    def collect(self):
+        """
+        Gather the metrics to expose.
+
+        Returns:
+            dict: Family dictionaries keyed by metric name, merged over
+            every process in multiprocess mode
+        """
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory:
+            return self.snapshot()
+
+        self.check_process()
+        self.write()
+        stale_after = settings.METRICS_FLUSH_INTERVAL * STALE_INTERVALS
+        now = time.time()
+        snapshots = []
+        for entry in os.scandir(directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as snapshot_file:
+                    families = json.load(snapshot_file)
+                live = now - entry.stat().st_mtime <= stale_after
+            except (OSError, ValueError):
+                # Removed or replaced while reading
+                continue
+            snapshots.append((families, live))
+        return merge(snapshots)
+
+
+def merge(snapshots):
+    """
+    Combine the snapshots of several processes.
+
+    Args:
+        snapshots: (families, live) tuples; gauges of processes that are
+            not live are left out
+
+    Returns:
+        dict: Family dictionaries keyed by metric name
+    """
+    merged = {}
+    for families, live in snapshots:
+        for name, family in families.items():
+            if family['kind'] == 'gauge' and not live:
+                continue
+            target = merged.setdefault(name, {**family, 'samples': {}})
+            if target.get('buckets') != family.get('buckets'):
+                # Declared differently by another release
+                continue
+            samples = target['samples']
+            for labelvalues, value in family['samples']:
+                key = tuple(labelvalues)
+                if family['kind'] != 'histogram':
+                    samples[key] = samples.get(key, 0) + value
+                elif key not in samples:
+                    samples[key] = {
+                        'counts': list(value['counts']),
+                        'sum': value['sum'],
+                    }
+                else:
+                    state = samples[key]
+                    state['counts'] = [
+                        a + b for a, b in zip(state['counts'], value['counts'])
+                    ]
+                    state['sum'] += value['sum']
+
+    for family in merged.values():
+        family['samples'] = [
+            [list(key), value] for key, value in family['samples'].items()
+        ]
+    return merged
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\n', '\\n')
+        .replace('"', '\\"')
+    )
+
+
+def _format(value):
+    return '+Inf' if value == math.inf else repr(value)
+
+
+def _sample(name, labels, value):
+    if labels:
+        pairs = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {_format(value)}'
+
+
+def render(families):
+    """
+    Format metric families in the Prometheus text exposition format.
+
+    Args:
+        families: Family dictionaries keyed by metric name
+
+    Returns:
+        str: Exposition text
+    """
+    lines = []
+    for name in sorted(families):
+        family = families[name]
+        kind = family['kind']
+        help_text = family['help'].replace('\\', '\\\\').replace('\n', '\\n')
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labelvalues, value in sorted(family['samples']):
+            labels = list(zip(family['labels'], labelvalues))
+            if kind != 'histogram':
+                lines.append(_sample(name, labels, value))
+                continue
+            cumulative = 0
+            bounds = family['buckets'] + [math.inf]
+            for bound, count in zip(bounds, value['counts']):
+                cumulative += count
+                lines.append(_sample(
+                    f'{name}_bucket', labels + [('le', _format(bound))],
+                    cumulative,
+                ))
+            lines.append(_sample(f'{name}_sum', labels, value['sum']))
+            lines.append(_sample(f'{name}_count', labels, cumulative))
+    return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
@@ -0,0 +1,281 @@
+"""Middleware for request-scoped access control state and instrumentation."""
+
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections
+
+from .access import AccessContext, get_access_context
+from .instrumentation import QueryRecorder, server_timing
+from .metrics import REGISTRY
+from .tenancy import clear_tenant, rls_enabled, set_tenant
+
+
+logger = logging.getLogger(__name__)
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'http_requests_total', 'Requests by URL name, method and status.',
+    ['view', 'method', 'status'],
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    'http_request_duration_seconds', 'Request latency by URL name.',
+    ['view'],
+)
+HTTP_DB_QUERIES = REGISTRY.counter(
+    'http_db_queries_total', 'SQL statements executed by URL name.',
+    ['view'],
+)
+HTTP_DB_DURATION = REGISTRY.counter(
+    'http_db_duration_seconds_total', 'Time spent in SQL by URL name.',
+    ['view'],
+)
+
+
+class AccessContextMiddleware:
+    """Attach a lazily evaluated AccessContext to every request.
+
+    Must be placed after AuthenticationMiddleware. No query is issued
+    unless a view actually reads the user's memberships.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler in the middleware chain.
+
+        Args:
+            get_response: Callable returning the response for a request.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Attach request.access and continue processing.
+
+        Args:
+            request: HTTP request object.
+
+        Returns:
+            HttpResponse from the next handler.
+        """
+        request.access = AccessContext(request.user)
+        return self.get_response(request)
+
+
+class TenantRLSMiddleware:
+    """Scope the database session to the user's organizations.
+
+    Active only when TENANT_RLS_ENABLED is set. Must be placed after
+    AccessContextMiddleware. The session variable is cleared when the
+    response is closed, after any streaming body has been produced, so
+    persistent connections never carry one user's scope into the next
+    request.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler or opt out when RLS mode is off.
+
+        Args:
+            get_response: Callable returning the response for a request.
+
+        Raises:
+            MiddlewareNotUsed: If TENANT_RLS_ENABLED is not set.
+        """
+        if not rls_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Set the tenant scope and clear it when the response closes.
+
+        Args:
+            request: HTTP request object.
+
+        Returns:
+            HttpResponse from the next handler.
+        """
+        user = request.user
+        set_tenant(
+            connection,
+            get_access_context(request).org_ids,
+            unrestricted=user.is_superuser,
+        )
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            clear_tenant(connection)
+            raise
+
+        close = response.close
+
+        def close_and_clear():
+            # Before close() sends request_finished, which may close
+            # the connection
+            try:
+                clear_tenant(connection)
+            finally:
+                close()
+
+        response.close = close_and_clear
+        return response
+
+
+class RequestMetricsMiddleware:
+    """Add every request to the http_* metrics.
+
+    Requests are counted by resolved URL name, method and status, and
+    their latency is observed; requests matching no URL are counted as
+    "unresolved". The SQL metrics are taken from the record left by
+    QueryInstrumentationMiddleware, so they are only collected while
+    REQUEST_INSTRUMENTATION is set.
+
+    Place it right before QueryInstrumentationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler in the middleware chain.
+
+        Args:
+            get_response: Callable returning the response for a request.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Process the request and record its metrics.
+
+        Args:
+            request: HTTP request object.
+
+        Returns:
+            HttpResponse from the next handler.
+        """
+        start = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        HTTP_REQUESTS.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+        HTTP_LATENCY.observe(duration, view=view)
+
+        record = getattr(request, 'instrumentation', None)
+        if record is not None:
+            HTTP_DB_QUERIES.inc(record['queries'], view=view)
+            HTTP_DB_DURATION.inc(record['db_ms'] / 1000, view=view)
+        return response
+
+
+class QueryInstrumentationMiddleware:
+    """Record the queries and timings of every request.
+
+    Every database connection is wrapped with a QueryRecorder while the
+    request is processed. Responses to staff users get a Server-Timing
+    header when SERVER_TIMING_HEADER is set, and one structured log
+    record is written per request, keyed by the
+    resolved URL name. A SLOW_REQUEST_SAMPLE_RATE fraction of requests
+    slower than SLOW_REQUEST_MS is logged again with its full query list
+    and duplicate fingerprints. The record is also left on
+    request.instrumentation for other consumers, such as the SQL
+    metrics of RequestMetricsMiddleware.
+
+    Place it right after WhiteNoiseMiddleware so static files are not
+    measured but session and authentication queries are. Queries run
+    while a streaming response is consumed are not included.
+    """
+
+    def __init__(self, get_response):
+        """Store the next handler or opt out when disabled.
+
+        Args:
+            get_response: Callable returning the response for a request.
+
+        Raises:
+            MiddlewareNotUsed: If REQUEST_INSTRUMENTATION is not set.
+        """
+        if not settings.REQUEST_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """Process the request with every query recorded.
+
+        Args:
+            request: HTTP request object.
+
+        Returns:
+            HttpResponse from the next handler.
+        """
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        # Timings reveal query counts, so only staff get them, as with
+        # the /metrics endpoint
+        user = getattr(request, 'user', None)
+        if settings.SERVER_TIMING_HEADER and user and user.is_staff:
+            response['Server-Timing'] = server_timing(recorder, total_ms)
+
+        match = request.resolver_match
+        duplicates = recorder.duplicates()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'duplicate_queries': sum(count - 1 for _, count, _ in duplicates),
+            'db_ms': round(recorder.total_ms, 2),
+            'total_ms': round(total_ms, 2),
+        }
+        request.instrumentation = record
+        logger.info(
+            '%(method)s %(view)s %(status)s queries=%(queries)d '
+            'duplicates=%(duplicate_queries)d db=%(db_ms).1fms '
+            'total=%(total_ms).1fms',
+            record,
+            extra={'request_metrics': record},
+        )
+
+        if (total_ms >= settings.SLOW_REQUEST_MS and
+                random.random() < settings.SLOW_REQUEST_SAMPLE_RATE):
+            self._log_slow_request(record, recorder, duplicates)
+        return response
+
+    def _log_slow_request(self, record, recorder, duplicates):
+        """Log a slow request with every statement it executed.
+
+        Args:
+            record: Summary dictionary of the request.
+            recorder: QueryRecorder holding the statements.
+            duplicates: Repeated statement shapes from the recorder.
+        """
+        lines = [
+            f'{duration:8.2f} ms  {sql}' for sql, duration in recorder.queries
+        ]
+        lines += [
+            f'{count:5d} x {key}  {shape}'
+            for key, count, shape in duplicates
+        ]
+        logger.warning(
+            'Slow request %s %s (%.1f ms, %d queries)\n%s',
+            record['method'], record['path'], record['total_ms'],
+            record['queries'], '\n'.join(lines),
+            extra={
+                'request_metrics': record,
+                'queries': [
+                    {'sql': sql, 'ms': round(duration, 2)}
+                    for sql, duration in recorder.queries
+                ],
+                'duplicates': [
+                    {'fingerprint': key, 'count': count, 'sql': shape}
+                    for key, count, shape in duplicates
+                ],
+            },
+        )
@@ -1,14 +1,21 @@
 """Mixins for organization-based access control and filtering.
 
 This module provides reusable mixins for role-based permission checking,
-organization-level data filtering, and form field filtering based on
-user's organization access.
+organization-level data filtering, form field filtering based on
+user's organization access, keyset pagination, and N+1-free rendering
+of list columns and form choices.
 """
 
 from django.contrib import messages
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.core.exceptions import FieldDoesNotExist
 from django.shortcuts import redirect
 
+from .access import get_access_context
+from .pagination import estimated_count, keyset_paginate
+from .permissions import user_has_role_permission
+from .scoping import org_scopes
+
 
 class RolePermissionMixin(UserPassesTestMixin):
     """Check if user has permission through their assigned role.
@@ -30,8 +37,8 @@ class RolePermissionMixin(UserPassesTestMixin):
     def test_func(self):
         """Test if user has required permission.
 
-        Checks superuser status first, then validates permission
-        through user's assigned roles in organizations.
+        Checks superuser status first, then looks the permission up
+        in the user's compiled role permission set.
 
         Returns:
             Boolean indicating whether user has permission.
@@ -39,21 +46,9 @@ class RolePermissionMixin(UserPassesTestMixin):
         if not self.required_permission:
             return True
 
-        user = self.request.user
-
-        if user.is_superuser:
-            return True
-
-        app_label, codename = self.required_permission.split('.')
-
-        for user_role in user.user_org_roles.all():
-            if user_role.role.permissions.filter(
-                content_type__app_label=app_label,
-                codename=codename
-            ).exists():
-                return True
-
-        return False
+        return user_has_role_permission(
+            self.request.user, self.required_permission
+        )
 
     def handle_no_permission(self):
         """Handle permission denial with error message and redirect.
@@ -81,14 +76,16 @@ class OrganizationFilterMixin:
     """Filter queryset based on user's organizations.
 
     Ensures users only see data from organizations they belong to,
-    with automatic filtering based on model relationships.
+    using the lookup path the model registered in core.scoping. Models
+    without a registered scope raise ImproperlyConfigured rather than
+    leaking unfiltered data.
     """
 
     def get_queryset(self):
         """Filter queryset to user's accessible organizations.
 
-        Applies organization-level filtering based on model type
-        and user's organization memberships.
+        Applies the model's registered organization scope to the
+        user's organization memberships.
 
         Returns:
             Filtered QuerySet containing only accessible records.
@@ -99,26 +96,9 @@ class OrganizationFilterMixin:
         if user.is_superuser:
             return queryset
 
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-
-        model_name = self.model.__name__.lower()
-
-        if model_name == 'organization':
-            return queryset.filter(id__in=user_orgs)
-        elif model_name == 'department':
-            return queryset.filter(organization__id__in=user_orgs)
-        elif model_name == 'userorganizationrole':
-            return queryset.filter(organization__id__in=user_orgs)
-        elif model_name == 'task':
-            return queryset.filter(organization__id__in=user_orgs)
-        elif model_name == 'taskassignment':
-            return queryset.filter(task__organization__id__in=user_orgs)
-        elif model_name == 'taskviewer':
-            return queryset.filter(task__organization__id__in=user_orgs)
-
-        return queryset
+        return org_scopes.scope(
+            queryset, get_access_context(self.request).org_ids
+        )
 
 
 class OrganizationFormMixin:
@@ -146,9 +126,7 @@ class OrganizationFormMixin:
         if user.is_superuser:
             return form
 
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
+        user_orgs = get_access_context(self.request).org_ids
 
         if 'organization' in form.fields:
             from organizations.models import Organization
@@ -163,3 +141,153 @@ class OrganizationFormMixin:
             )
 
         return form
+
+
+def list_select_related(model, attrs):
+    """Derive the select_related paths needed to render list columns.
+
+    Every attribute that is a forward foreign key is rendered through
+    the related model's __str__, so the key itself and the relations
+    that __str__ reads (declared as str_select_related on the related
+    model) are joined in.
+
+    Args:
+        model: Model class of the listed rows.
+        attrs: Attribute names rendered per row.
+
+    Returns:
+        List of select_related lookup paths.
+    """
+    paths = []
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            continue
+        if not (field.many_to_one or field.one_to_one) or not field.concrete:
+            continue
+
+        paths.append(attr)
+        for dependency in getattr(field.related_model, 'str_select_related', ()):
+            paths.append(f'{attr}__{dependency}')
+    return list(dict.fromkeys(paths))
+
+
+class RelatedListMixin:
+    """Join the relations shown in a ListView's list_attrs columns.
+
+    The generic_list templates render obj|attr:name for each name in
+    list_attrs. Foreign keys among them, and whatever their __str__
+    reads, are fetched with the page through select_related so each
+    page costs a fixed number of queries whatever its size.
+
+    Attributes:
+        list_attrs: Attribute names rendered as table columns.
+    """
+
+    list_attrs = []
+
+    def paginate_queryset(self, queryset, page_size):
+        """Paginate the queryset with the list_attrs relations joined.
+
+        Args:
+            queryset: QuerySet to paginate.
+            page_size: Number of rows per page.
+
+        Returns:
+            Tuple of (paginator, page, object_list, is_paginated).
+        """
+        paths = list_select_related(queryset.model, self.list_attrs)
+        if paths:
+            queryset = queryset.select_related(*paths)
+        return super().paginate_queryset(queryset, page_size)
+
+    def get_context_data(self, **kwargs):
+        """Expose list_attrs to the template.
+
+        Returns:
+            Dictionary with the list context.
+        """
+        context = super().get_context_data(**kwargs)
+        context['list_attrs'] = self.list_attrs
+        return context
+
+
+class RelatedChoicesMixin:
+    """Join the relations read by model choice labels in a form view.
+
+    Every option of a model choice field is labelled with the model's
+    __str__, so the relations declared in its str_select_related are
+    fetched with the choices instead of once per option. Place it
+    before OrganizationFormMixin so the querysets that mixin narrows
+    are joined too.
+    """
+
+    def get_form(self, form_class=None):
+        """Get form with str_select_related joined into choice querysets.
+
+        Args:
+            form_class: Optional form class to instantiate.
+
+        Returns:
+            Form instance with joined choice querysets.
+        """
+        form = super().get_form(form_class)
+        for field in form.fields.values():
+            queryset = getattr(field, 'queryset', None)
+            if queryset is None:
+                continue
+            related = getattr(queryset.model, 'str_select_related', ())
+            if related:
+                field.queryset = queryset.select_related(*related)
+        return form
+
+
+class CursorPaginationMixin:
+    """Paginate a ListView by keyset cursor instead of page number.
+
+    Each page is a range scan continuing from the previous page's last
+    row, and no COUNT(*) is run unless an estimate is requested. The
+    page object exposes has_next/has_previous and next_cursor/
+    previous_cursor for the generic_list templates.
+
+    Attributes:
+        cursor_ordering: Non-nullable ordering keys ending in a unique
+            one, ideally matching an index.
+        cursor_param: Query parameter carrying the cursor.
+        estimate_count: Whether to add an estimated_count to the context.
+    """
+
+    cursor_ordering = ('id',)
+    cursor_param = 'cursor'
+    estimate_count = False
+
+    def paginate_queryset(self, queryset, page_size):
+        """Fetch the page addressed by the request's cursor.
+
+        Args:
+            queryset: QuerySet to paginate.
+            page_size: Number of rows per page.
+
+        Returns:
+            Tuple of (paginator, page, object_list, is_paginated) as
+            expected by MultipleObjectMixin; there is no paginator.
+        """
+        page = keyset_paginate(
+            queryset,
+            self.cursor_ordering,
+            self.request.GET.get(self.cursor_param),
+            page_size,
+        )
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        """Add the estimated row count when enabled.
+
+        Returns:
+            Dictionary with the list context.
+        """
+        context = super().get_context_data(**kwargs)
+        if self.estimate_count:
+            context['estimated_count'] = estimated_count(self.object_list)
+        return context
@@ -0,0 +1,269 @@
+"""Keyset (cursor) pagination.
+
+Pages are addressed by the ordering values of a boundary row instead of
+an OFFSET, so every page costs one indexed range scan no matter how
+deep it is, and rows inserted meanwhile do not shift the pages a user
+is walking through. No COUNT query is issued.
+
+Cursors are opaque URL-safe strings encoding the boundary values and
+the direction of travel. When a total is wanted, estimated_count reads
+the planner's statistics on PostgreSQL instead of running COUNT(*).
+"""
+
+import base64
+import datetime
+import json
+
+from django.core.exceptions import EmptyResultSet
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded for the given ordering."""
+
+
+class _CursorEncoder(DjangoJSONEncoder):
+    """JSON encoder keeping full microsecond precision of datetimes.
+
+    DjangoJSONEncoder rounds to milliseconds, which would make a cursor
+    skip or repeat rows created within the same millisecond.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _parse_keys(keys):
+    """
+    Split ordering keys into field names and descending flags.
+
+    Args:
+        keys: Sequence of field names, '-' prefixed for descending
+
+    Returns:
+        list: (field_name, descending) tuples
+    """
+    return [(key.lstrip('-'), key.startswith('-')) for key in keys]
+
+
+def encode_cursor(values, backwards=False):
+    """
+    Encode boundary values into a cursor string.
+
+    Args:
+        values: List of ordering values of the boundary row
+        backwards: Whether the cursor pages towards the start
+
+    Returns:
+        str: URL-safe cursor
+    """
+    payload = json.dumps(
+        {'v': values, 'b': backwards}, cls=_CursorEncoder
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, model, keys):
+    """
+    Decode a cursor into typed boundary values.
+
+    Args:
+        cursor: Cursor string from encode_cursor
+        model: Model class the keys belong to
+        keys: Ordering keys the cursor was built for
+
+    Returns:
+        tuple: (values, backwards)
+
+    Raises:
+        InvalidCursor: If the cursor is malformed or does not match keys
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        raw_values = payload['v']
+        backwards = bool(payload['b'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Malformed cursor')
+
+    parsed = _parse_keys(keys)
+    if not isinstance(raw_values, list) or len(raw_values) != len(parsed):
+        raise InvalidCursor('Cursor does not match ordering')
+
+    values = []
+    for (name, _), raw in zip(parsed, raw_values):
+        field = model._meta.get_field(name)
+        try:
+            values.append(field.to_python(raw))
+        except Exception:
+            raise InvalidCursor(f'Invalid cursor value for {name}')
+    return values, backwards
+
+
+def _boundary_filter(parsed, values, forwards):
+    """
+    Build the lexicographic filter selecting rows past a boundary.
+
+    For keys (a, b) this is a > x OR (a = x AND b > y), with each
+    comparison flipped for descending keys and for backward travel.
+
+    Args:
+        parsed: (field_name, descending) tuples
+        values: Boundary values
+        forwards: Whether rows after the boundary are wanted
+
+    Returns:
+        Q: Filter expression
+    """
+    condition = Q()
+    for index, (name, descending) in enumerate(parsed):
+        lookup = 'lt' if descending == forwards else 'gt'
+        clause = Q(**{f'{name}__{lookup}': values[index]})
+        for prior in range(index):
+            clause &= Q(**{parsed[prior][0]: values[prior]})
+        condition |= clause
+    return condition
+
+
+class KeysetPage:
+    """
+    One page of a keyset-paginated queryset.
+
+    Attributes:
+        object_list: Rows of the page in display order
+        has_next: Whether rows exist after this page
+        has_previous: Whether rows exist before this page
+        next_cursor: Cursor of the following page, or None
+        previous_cursor: Cursor of the preceding page, or None
+    """
+
+    def __init__(self, object_list, keys, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self._names = [name for name, _ in _parse_keys(keys)]
+        self.next_cursor = (
+            self._cursor(object_list[-1], backwards=False)
+            if has_next and object_list else None
+        )
+        self.previous_cursor = (
+            self._cursor(object_list[0], backwards=True)
+            if has_previous and object_list else None
+        )
+
+    def _cursor(self, obj, backwards):
+        """Encode the ordering values of obj as a cursor."""
+        return encode_cursor(
+            [getattr(obj, name) for name in self._names], backwards
+        )
+
+    def has_other_pages(self):
+        """Whether navigation links are needed."""
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def keyset_paginate(queryset, keys, cursor=None, per_page=20):
+    """
+    Fetch one page of a queryset ordered by unique keys.
+
+    Keys must be non-nullable and the last one unique (normally 'id' or
+    '-id') so the ordering is total. An index matching keys makes each
+    page a single range scan. Invalid cursors fall back to the first
+    page.
+
+    Args:
+        queryset: QuerySet to paginate
+        keys: Ordering keys, e.g. ('-created_at', '-id')
+        cursor: Cursor from a previous page, or None for the first page
+        per_page: Rows per page
+
+    Returns:
+        KeysetPage: The requested page
+    """
+    parsed = _parse_keys(keys)
+    values, backwards = None, False
+    if cursor:
+        try:
+            values, backwards = decode_cursor(cursor, queryset.model, keys)
+        except InvalidCursor:
+            values, backwards = None, False
+
+    if backwards:
+        ordering = [
+            name if descending else f'-{name}' for name, descending in parsed
+        ]
+    else:
+        ordering = list(keys)
+
+    queryset = queryset.order_by(*ordering)
+    if values is not None:
+        queryset = queryset.filter(
+            _boundary_filter(parsed, values, forwards=not backwards)
+        )
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if backwards:
+        rows.reverse()
+        return KeysetPage(rows, keys, has_next=True, has_previous=has_more)
+    return KeysetPage(
+        rows, keys, has_next=has_more, has_previous=values is not None
+    )
+
+
+def estimated_count(queryset):
+    """
+    Estimate the number of rows of a queryset without counting them.
+
+    On PostgreSQL an unfiltered queryset uses pg_class.reltuples and a
+    filtered one the row estimate of its query plan; both are as fresh
+    as the last ANALYZE. Other backends fall back to an exact count.
+
+    Args:
+        queryset: QuerySet to estimate
+
+    Returns:
+        int: Estimated row count
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    try:
+        sql, params = queryset.order_by().query.get_compiler(
+            using=queryset.db
+        ).as_sql()
+    except EmptyResultSet:
+        # An empty __in filter, e.g. a user without organizations
+        return 0
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # reltuples is -1 for tables never vacuumed or analyzed
+            if row and row[0] >= 0:
+                return row[0]
+
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
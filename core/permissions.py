@@ -0,0 +1,262 @@
+"""Compiled role permission resolution.
+
+This module resolves the complete set of permissions a user holds
+through their UserOrganizationRole assignments with a single joined
+query, memoizes the result on the user instance for the lifetime of
+the request, and stores it in the Django cache under a versioned key.
+
+Cached entries are invalidated through generation counters rather than
+deletes. Each user and each role owns a counter; a user's entry is keyed
+by the user's generation and records the generation of every role it
+was built from. Bumping a role's counter therefore expires only the
+entries of users holding that role. Counters evicted from the cache are
+seeded again from the clock, never from a value an older entry could
+still be stored under.
+
+Generations must be read before the permissions are loaded, or an entry
+loaded before a bump could be stored as current. A user's roles are
+only known after the load, so every role bump also bumps a shared role
+epoch that is read beforehand; a set loaded while it moved is returned
+but not cached.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+# Bump to invalidate every cached permission set after a format change
+PERMISSION_CACHE_VERSION = 2
+
+# Attribute used to memoize the permission set on the user instance
+_REQUEST_CACHE_ATTR = '_role_permission_set'
+
+_KEY_PREFIX = f'role_perms:v{PERMISSION_CACHE_VERSION}'
+
+
+def _user_generation_key(user_id):
+    """Build the cache key holding a user's generation counter.
+
+    Args:
+        user_id: Primary key of the user.
+
+    Returns:
+        String cache key.
+    """
+    return f'{_KEY_PREFIX}:user_gen:{user_id}'
+
+
+def _role_epoch_key():
+    """Build the cache key of the counter bumped with every role.
+
+    Returns:
+        String cache key.
+    """
+    return f'{_KEY_PREFIX}:role_epoch'
+
+
+def _role_generation_key(role_id):
+    """Build the cache key holding a role's generation counter.
+
+    Args:
+        role_id: Primary key of the role.
+
+    Returns:
+        String cache key.
+    """
+    return f'{_KEY_PREFIX}:role_gen:{role_id}'
+
+
+def _cache_key(user_id, generation):
+    """Build the Django cache key for a user's permission set.
+
+    Args:
+        user_id: Primary key of the user.
+        generation: Current generation counter of the user.
+
+    Returns:
+        String cache key.
+    """
+    return f'{_KEY_PREFIX}:user:{user_id}:{generation}'
+
+
+def _read_generations(keys):
+    """Read generation counters, seeding the missing ones.
+
+    Seeds come from the clock so they stay ahead of any value a counter
+    held before it was evicted. cache.add() lets concurrent readers
+    agree on a single seed.
+
+    Args:
+        keys: List of counter cache keys.
+
+    Returns:
+        Dictionary mapping cache key to generation.
+    """
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        seed = time.time_ns()
+        for key in missing:
+            cache.add(key, seed, None)
+        found.update(cache.get_many(missing))
+    return found
+
+
+def _role_generations(role_ids):
+    """Read the current generation counter of each role.
+
+    Args:
+        role_ids: Iterable of role primary keys.
+
+    Returns:
+        Dictionary mapping role ID to generation.
+    """
+    role_ids = list(role_ids)
+    if not role_ids:
+        return {}
+
+    keys = {_role_generation_key(role_id): role_id for role_id in role_ids}
+    found = _read_generations(list(keys))
+    return {
+        role_id: found.get(key)
+        for key, role_id in keys.items()
+    }
+
+
+def _load_permission_set(user):
+    """Load a user's roles and role permissions from the database.
+
+    Joins UserOrganizationRole through Role to Permission so role IDs
+    and the whole permission set are fetched in one query regardless
+    of role count. Roles without permissions are still reported so
+    that granting them a permission later invalidates the entry.
+
+    Args:
+        user: User instance to resolve permissions for.
+
+    Returns:
+        Tuple of (frozenset of 'app_label.codename' strings,
+        set of role IDs).
+    """
+    from organizations.models import UserOrganizationRole
+
+    rows = UserOrganizationRole.objects.filter(user=user).values_list(
+        'role_id',
+        'role__permissions__content_type__app_label',
+        'role__permissions__codename',
+    ).order_by().distinct()
+
+    role_ids = set()
+    permissions = set()
+    for role_id, app_label, codename in rows:
+        role_ids.add(role_id)
+        if codename is not None:
+            permissions.add(f'{app_label}.{codename}')
+    return frozenset(permissions), role_ids
+
+
+def get_permission_set(user):
+    """Get the set of permissions granted to a user through roles.
+
+    Checks the per-request memo first, then the Django cache, and
+    only falls back to the database on a miss or when any of the
+    user's roles has been bumped since the entry was built.
+
+    Args:
+        user: User instance to resolve permissions for.
+
+    Returns:
+        Frozenset of 'app_label.codename' strings.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+
+    permissions = getattr(user, _REQUEST_CACHE_ATTR, None)
+    if permissions is not None:
+        return permissions
+
+    generation_key = _user_generation_key(user.pk)
+    generations = _read_generations([generation_key, _role_epoch_key()])
+    key = _cache_key(user.pk, generations.get(generation_key))
+    entry = cache.get(key)
+
+    if entry is not None:
+        permissions, role_generations = entry
+        if _role_generations(role_generations) != role_generations:
+            permissions = None
+
+    if permissions is None:
+        permissions, role_ids = _load_permission_set(user)
+        role_generations = _role_generations(role_ids)
+        # A role bumped during the load may be missing from the result
+        epoch = _read_generations([_role_epoch_key()]).get(_role_epoch_key())
+        if epoch == generations.get(_role_epoch_key()):
+            cache.set(
+                key,
+                (permissions, role_generations),
+                settings.ROLE_PERMISSION_CACHE_TIMEOUT,
+            )
+
+    setattr(user, _REQUEST_CACHE_ATTR, permissions)
+    return permissions
+
+
+def _bump(key):
+    """Increment a generation counter, seeding it if missing.
+
+    Args:
+        key: Cache key of the counter.
+    """
+    if cache.add(key, time.time_ns(), None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.add(key, time.time_ns(), None)
+
+
+def invalidate_user_permissions(user_ids):
+    """Expire the cached permission sets of the given users.
+
+    Args:
+        user_ids: Iterable of user primary keys.
+    """
+    for user_id in set(user_ids):
+        _bump(_user_generation_key(user_id))
+
+
+def invalidate_role_permissions(role_ids):
+    """Expire the cached permission sets of every user holding a role.
+
+    Args:
+        role_ids: Iterable of role primary keys.
+    """
+    role_ids = set(role_ids)
+    for role_id in role_ids:
+        _bump(_role_generation_key(role_id))
+    if role_ids:
+        _bump(_role_epoch_key())
+
+
+def user_has_role_permission(user, permission):
+    """Check if user has a permission through their assigned roles.
+
+    Superusers automatically have all permissions.
+
+    Args:
+        user: User instance to check permissions for.
+        permission: Permission string in format 'app_label.codename'.
+
+    Returns:
+        Boolean indicating whether user has the specified permission.
+    """
+    if user.is_superuser:
+        return True
+
+    if not permission or '.' not in permission:
+        return False
+
+    return permission in get_permission_set(user)
@@ -1,11 +1,15 @@
 """Template tags for permission checking.
 
 This module provides custom template filters for checking user permissions
-through role-based access control in templates.
+through role-based access control in templates, and a tag listing the
+role assignments behind them.
 """
 
 from django import template
 
+from core.permissions import user_has_role_permission
+from organizations.models import UserOrganizationRole
+
 
 register = template.Library()
 
@@ -29,19 +33,25 @@ def has_permission(user, permission_codename):
     Example:
         In template: {% if request.user|has_permission:'organizations.add_organization' %}
     """
-    if user.is_superuser:
-        return True
+    return user_has_role_permission(user, permission_codename)
+
 
-    if not permission_codename or '.' not in permission_codename:
-        return False
+@register.simple_tag
+def role_assignments(user):
+    """Get a user's role assignments with their role and organization.
 
-    app_label, codename = permission_codename.split('.')
+    Fetches the assignments and the names they display in one query,
+    for example in the profile menu rendered on every page.
 
-    for user_role in user.user_org_roles.all():
-        if user_role.role.permissions.filter(
-            content_type__app_label=app_label,
-            codename=codename
-        ).exists():
-            return True
+    Args:
+        user: User instance whose assignments are listed.
 
-    return False
+    Returns:
+        QuerySet of UserOrganizationRole instances.
+
+    Example:
+        In template: {% role_assignments request.user as user_roles %}
+    """
+    if not user.is_authenticated:
+        return UserOrganizationRole.objects.none()
+    return user.user_org_roles.select_related('role', 'organization')
@@ -0,0 +1,211 @@
+"""PostgreSQL row-level security for tenant isolation.
+
+When TENANT_RLS_ENABLED is set, organization isolation for the tables
+listed in RLS_POLICIES is enforced by PostgreSQL policies instead of
+Python querysets. Each request stores the user's organization IDs in
+the 'app.tenant_org_ids' session variable and the policies compare
+rows against it, so the planner can use the organization indexes
+directly and views no longer need to add IN (...) filters.
+
+The variable is interpreted as follows:
+    unset or ''  no rows
+    '*'          unrestricted (superusers, commands, websocket consumers)
+    '{1,2,3}'    only rows of organizations 1, 2 and 3
+
+Access is denied unless the variable is set, so a code path that skips
+the middleware cannot read or write other tenants by accident. Code
+running outside requests, such as management commands and websocket
+consumers, opts in with tenant_scope().
+
+Policies are installed and removed with the tenant_rls management
+command, which requires TENANT_RLS_ENABLED since every request must
+set the variable once they are in place.
+"""
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+TENANT_SETTING = 'app.tenant_org_ids'
+
+# Expression granting access to rows of organization_id
+_ORG_VISIBLE = (
+    "CASE COALESCE(current_setting('{setting}', true), '') "
+    "WHEN '' THEN false "
+    "WHEN '*' THEN true "
+    "ELSE {column} = ANY (current_setting('{setting}', true)::bigint[]) "
+    "END"
+)
+
+# Table name -> USING expression. Child tables defer to their parent,
+# whose own policy filters the EXISTS subquery.
+RLS_POLICIES = {
+    'tasks_task': _ORG_VISIBLE.format(
+        setting=TENANT_SETTING, column='organization_id'
+    ),
+    'organizations_department': _ORG_VISIBLE.format(
+        setting=TENANT_SETTING, column='organization_id'
+    ),
+    # Denormalized tables carry their task's organization themselves
+    'tasks_taskaccess': _ORG_VISIBLE.format(
+        setting=TENANT_SETTING, column='organization_id'
+    ),
+    'tasks_usertaskstats': _ORG_VISIBLE.format(
+        setting=TENANT_SETTING, column='organization_id'
+    ),
+    'tasks_taskoutputfield': (
+        'EXISTS (SELECT 1 FROM tasks_task t WHERE t.id = task_id)'
+    ),
+    'tasks_taskoutput': (
+        'EXISTS (SELECT 1 FROM tasks_taskoutputfield f '
+        'WHERE f.id = output_field_id)'
+    ),
+    'task_chat_taskchatmessage': (
+        'EXISTS (SELECT 1 FROM tasks_task t WHERE t.id = task_id)'
+    ),
+}
+
+POLICY_NAME = 'tenant_isolation'
+
+
+def rls_enabled():
+    """Check whether row-level security mode is switched on.
+
+    Returns:
+        Boolean from the TENANT_RLS_ENABLED setting.
+    """
+    return getattr(settings, 'TENANT_RLS_ENABLED', False)
+
+
+def is_rls_enforced(model):
+    """Check whether a model's table is isolated by the database.
+
+    Args:
+        model: Model class to check.
+
+    Returns:
+        Boolean indicating that org filtering can be left to PostgreSQL.
+    """
+    return rls_enabled() and model._meta.db_table in RLS_POLICIES
+
+
+def install_policies(connection):
+    """Create tenant isolation policies on every RLS table.
+
+    FORCE is used so the policies also apply when the application
+    connects as the table owner.
+
+    Args:
+        connection: PostgreSQL database connection.
+    """
+    with connection.cursor() as cursor:
+        for table, expression in RLS_POLICIES.items():
+            quoted = connection.ops.quote_name(table)
+            cursor.execute(f'DROP POLICY IF EXISTS {POLICY_NAME} ON {quoted}')
+            cursor.execute(
+                f'CREATE POLICY {POLICY_NAME} ON {quoted} '
+                f'USING ({expression})'
+            )
+            cursor.execute(f'ALTER TABLE {quoted} ENABLE ROW LEVEL SECURITY')
+            cursor.execute(f'ALTER TABLE {quoted} FORCE ROW LEVEL SECURITY')
+
+
+def uninstall_policies(connection):
+    """Drop tenant isolation policies and disable row-level security.
+
+    Args:
+        connection: PostgreSQL database connection.
+    """
+    with connection.cursor() as cursor:
+        for table in RLS_POLICIES:
+            quoted = connection.ops.quote_name(table)
+            cursor.execute(f'DROP POLICY IF EXISTS {POLICY_NAME} ON {quoted}')
+            cursor.execute(
+                f'ALTER TABLE {quoted} NO FORCE ROW LEVEL SECURITY'
+            )
+            cursor.execute(
+                f'ALTER TABLE {quoted} DISABLE ROW LEVEL SECURITY'
+            )
+
+
+def _set_tenant_setting(connection, value):
+    """Store a raw value in the tenant session variable.
+
+    The value is also kept on the connection wrapper so that it is
+    applied again should Django reconnect, e.g. after
+    close_old_connections() in channels' database_sync_to_async.
+
+    Args:
+        connection: PostgreSQL database connection.
+        value: Value as interpreted by the policies.
+    """
+    connection.tenant_setting = value
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT set_config(%s, %s, false)', [TENANT_SETTING, value]
+        )
+
+
+@receiver(connection_created)
+def _restore_tenant_setting(sender, connection, **kwargs):
+    """Apply the tenant scope of a wrapper to its new connection."""
+    value = getattr(connection, 'tenant_setting', '')
+    if value:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT set_config(%s, %s, false)', [TENANT_SETTING, value]
+            )
+
+
+def set_tenant(connection, org_ids, unrestricted=False):
+    """Scope a database session to the given organizations.
+
+    Args:
+        connection: PostgreSQL database connection.
+        org_ids: Iterable of organization IDs the session may see.
+        unrestricted: Whether the session may see every organization.
+    """
+    if unrestricted:
+        value = '*'
+    else:
+        value = '{' + ','.join(str(int(org_id)) for org_id in org_ids) + '}'
+    _set_tenant_setting(connection, value)
+
+
+def clear_tenant(connection):
+    """Remove the tenant scope from a database session.
+
+    Args:
+        connection: PostgreSQL database connection.
+    """
+    _set_tenant_setting(connection, '')
+
+
+@contextmanager
+def tenant_scope(org_ids=(), unrestricted=False, using=DEFAULT_DB_ALIAS):
+    """Scope the database session for the duration of a block.
+
+    The previous scope is restored afterwards, so blocks may nest and
+    may run inside a request. Does nothing unless TENANT_RLS_ENABLED is
+    set. Usable as a decorator as well.
+
+    Args:
+        org_ids: Iterable of organization IDs the session may see.
+        unrestricted: Whether the session may see every organization.
+        using: Alias of the database to scope.
+    """
+    if not rls_enabled():
+        yield
+        return
+
+    connection = connections[using]
+    previous = getattr(connection, 'tenant_setting', '')
+    set_tenant(connection, org_ids, unrestricted=unrestricted)
+    try:
+        yield
+    finally:
+        _set_tenant_setting(connection, previous)
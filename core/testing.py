@@ -0,0 +1,248 @@
+"""Query and latency budgets for view regression tests.
+
+Each app's tests declare, for every URL of its urlconf, how many queries
+and milliseconds one request may cost against a dataset generated by
+BulkTenantFactory. Query budgets hold at any scale, so an N+1 shows up
+as a failure even on the small default dataset, and repeating an
+identical query fails unless the budget allows it. Latency depends on
+the machine, so it is only reported unless settings.PERF_ENFORCE_LATENCY
+is set; budgets are then scaled by settings.PERF_LATENCY_FACTOR.
+
+Every measurement is appended to a JSON report at
+settings.PERF_REPORT_PATH for trend tracking. The report collects the
+results of the whole run, so run the suite without --parallel when the
+report matters.
+"""
+
+import datetime
+import json
+import re
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from organizations.models import Role, UserOrganizationRole
+from tasks.models import Task
+
+from .factories import SCALE_PRESETS, BulkTenantFactory
+
+
+User = get_user_model()
+
+# Timed requests per view; the fastest one is reported
+LATENCY_SAMPLES = 3
+
+# psycopg names each server-side cursor uniquely; iterator() queries
+# repeat the same statement under a different cursor name
+_SERVER_SIDE_CURSOR = re.compile(
+    r'^DECLARE "[^"]+" NO SCROLL CURSOR WITH(?:OUT)? HOLD FOR '
+)
+
+_results = []
+
+
+class Budget:
+    """
+    Declared cost of one request to a view.
+
+    Attributes:
+        url_name: Namespaced URL name, e.g. 'tasks:task_detail'
+        args: Positional URL arguments
+        queries: Maximum number of SQL queries
+        duplicates: Maximum number of queries repeating an earlier one
+        latency_ms: Maximum response time in milliseconds
+        user: Attribute of the test case holding the requesting user,
+            or None for an anonymous request
+        method: Client method name
+        data: Query or form data
+        status: Expected response status code
+    """
+
+    def __init__(self, url_name, args=(), queries=0, duplicates=0,
+                 latency_ms=100, user='admin', method='get', data=None,
+                 status=200):
+        self.url_name = url_name
+        self.args = tuple(args)
+        self.queries = queries
+        self.duplicates = duplicates
+        self.latency_ms = latency_ms
+        self.user = user
+        self.method = method
+        self.data = data
+        self.status = status
+
+
+def write_report():
+    """Write every result recorded so far to settings.PERF_REPORT_PATH."""
+    if not settings.PERF_REPORT_PATH:
+        return
+    report = {
+        'generated_at': datetime.datetime.now(
+            datetime.timezone.utc
+        ).isoformat(),
+        'scale': settings.PERF_TEST_SCALE,
+        'seed': settings.PERF_TEST_SEED,
+        'database': connection.vendor,
+        'latency_factor': settings.PERF_LATENCY_FACTOR,
+        'latency_enforced': settings.PERF_ENFORCE_LATENCY,
+        'results': _results,
+    }
+    with open(settings.PERF_REPORT_PATH, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+
+class ViewBudgetMixin:
+    """
+    TestCase mixin asserting every URL of an urlconf against its budget.
+
+    Subclasses set urlconf and list their budgets in budgets, or
+    override get_budgets when they need objects of the dataset. The
+    dataset is generated once per class; admin is a superuser, member is
+    assigned to task and manages its organization, and viewer can view
+    it.
+
+    The tables are analyzed on PostgreSQL as they would be in
+    production, so estimated_count reads an unfiltered list's size from
+    pg_class instead of running an extra EXPLAIN.
+
+    Attributes:
+        urlconf: Dotted path of the urlconf module whose URLs are covered
+        budgets: Budget instances that need no dataset objects
+    """
+
+    urlconf = None
+    budgets = ()
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        factory = BulkTenantFactory(seed=settings.PERF_TEST_SEED)
+        cls.dataset = factory.create(
+            **SCALE_PRESETS[settings.PERF_TEST_SCALE]
+        )
+        cls.admin = User.objects.create_superuser(
+            f'{factory.prefix}_admin', f'{factory.prefix}_admin@example.com',
+            'password'
+        )
+        cls.task = Task.objects.order_by('pk').first()
+        cls.member = cls.task.assigned_users.order_by('pk').first()
+        cls.viewer = cls.task.viewers.order_by('pk').first()
+        # Managers reach every view, exercising the scoped code paths
+        UserOrganizationRole.objects.create(
+            user=cls.member,
+            organization=cls.task.organization,
+            role=Role.objects.get(name=f'{factory.prefix} Manager'),
+        )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    @classmethod
+    def tearDownClass(cls):
+        write_report()
+        super().tearDownClass()
+
+    def get_budgets(self):
+        """
+        Declare the budgets of the urlconf's views.
+
+        Returns:
+            list: Budget instances
+        """
+        return list(self.budgets)
+
+    def _request(self, budget):
+        """
+        Send a budget's request as its user with empty caches.
+
+        Args:
+            budget: Budget to send
+
+        Returns:
+            tuple: (response, captured queries, elapsed milliseconds)
+        """
+        # One client per test: creating a client reloads the middleware
+        if not hasattr(self, '_client'):
+            self._client = Client()
+        if budget.user is None:
+            self._client.logout()
+        else:
+            self._client.force_login(getattr(self, budget.user))
+        send = getattr(self._client, budget.method)
+        url = reverse(budget.url_name, args=budget.args)
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = send(url, budget.data)
+            elapsed = (time.perf_counter() - start) * 1000
+        return response, queries, elapsed
+
+    def measure(self, budget):
+        """
+        Time a budget's request and record the result.
+
+        The first request warms templates and URL resolution and is not
+        counted.
+
+        Args:
+            budget: Budget to measure
+
+        Returns:
+            dict: Recorded result
+        """
+        self._request(budget)
+        samples = [self._request(budget) for _ in range(LATENCY_SAMPLES)]
+        response, queries, _ = samples[-1]
+        statements = [
+            _SERVER_SIDE_CURSOR.sub('', query['sql'])
+            for query in queries.captured_queries
+        ]
+
+        result = {
+            'view': budget.url_name,
+            'path': response.request['PATH_INFO'],
+            'method': budget.method.upper(),
+            'user': budget.user,
+            'status': response.status_code,
+            'queries': len(statements),
+            'query_budget': budget.queries,
+            'duplicate_queries': len(statements) - len(set(statements)),
+            'duplicate_budget': budget.duplicates,
+            'latency_ms': round(min(elapsed for *_, elapsed in samples), 2),
+            'latency_budget_ms': round(
+                budget.latency_ms * settings.PERF_LATENCY_FACTOR, 2
+            ),
+        }
+        _results.append(result)
+        return result
+
+    def test_every_url_has_a_budget(self):
+        module = import_module(self.urlconf)
+        names = {
+            f'{module.app_name}:{pattern.name}'
+            for pattern in module.urlpatterns
+        }
+        covered = {budget.url_name for budget in self.get_budgets()}
+        self.assertEqual(names - covered, set())
+
+    def test_views_stay_within_budget(self):
+        for budget in self.get_budgets():
+            with self.subTest(view=budget.url_name, user=budget.user):
+                result = self.measure(budget)
+                self.assertEqual(result['status'], budget.status)
+                self.assertLessEqual(result['queries'], budget.queries)
+                self.assertLessEqual(
+                    result['duplicate_queries'], budget.duplicates
+                )
+                if settings.PERF_ENFORCE_LATENCY:
+                    self.assertLessEqual(
+                        result['latency_ms'], result['latency_budget_ms']
+                    )
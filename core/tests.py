@@ -1,3 +1,1179 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import os
+import tempfile
+import zipfile
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser, Permission
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.signals import request_finished
+from django.db import close_old_connections, connection
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.views import UserListView
+from core.access import AccessContext, get_access_context
+from core.dashboard_cache import (
+    _org_generation_key,
+    get_dashboard_context,
+    reset_cache_stats,
+)
+from core.instrumentation import QueryRecorder, fingerprint, normalize_sql
+from core.metrics import Registry, merge, render
+from core.middleware import (
+    HTTP_REQUESTS,
+    AccessContextMiddleware,
+    TenantRLSMiddleware,
+)
+from core.mixins import list_select_related
+from core.pagination import encode_cursor, estimated_count, keyset_paginate
+from core import permissions as permissions_module
+from core.permissions import (
+    _role_generation_key,
+    _user_generation_key,
+    get_permission_set,
+    invalidate_role_permissions,
+    invalidate_user_permissions,
+    user_has_role_permission,
+)
+from core.scoping import OrgScopeRegistry, org_scopes
+from core.tenancy import (
+    TENANT_SETTING,
+    clear_tenant,
+    install_policies,
+    tenant_scope,
+)
+from core.exports import MANIFEST_NAME, archive_path
+from core.management.commands.benchmark_file_access import (
+    legacy_has_file_access,
+)
+from core.views import (
+    FILE_BYTES,
+    annotate_file_access,
+    filter_file_access,
+    has_file_access,
+)
+from organizations.models import (
+    Department,
+    Organization,
+    Role,
+    UserOrganizationRole,
+)
+from organizations.views import (
+    DepartmentListView,
+    OrganizationListView,
+    RoleListView,
+    UserOrganizationRoleListView,
+)
+from tasks.models import (
+    Task,
+    TaskAccess,
+    TaskOutput,
+    TaskOutputField,
+    UserTaskStats,
+)
+from tasks.views import (
+    MyAssignedTasksListView,
+    MyViewerTasksListView,
+    TaskListView,
+    TaskOutputFieldListView,
+    TaskOutputListView,
+)
+
+
+User = get_user_model()
+
+
+class ListSelectRelatedTests(TestCase):
+    """Derivation of select_related paths from list_attrs."""
+
+    def test_plain_fields_need_no_joins(self):
+        self.assertEqual(
+            list_select_related(Task, ['name', 'due_date', 'created_at']),
+            []
+        )
+
+    def test_foreign_key_includes_str_dependencies(self):
+        self.assertEqual(
+            list_select_related(TaskOutput, ['output_field', 'value_text']),
+            ['output_field', 'output_field__task']
+        )
+        self.assertEqual(
+            list_select_related(Department, ['organization', 'name']),
+            ['organization']
+        )
+
+    def test_unknown_and_reverse_attrs_are_ignored(self):
+        self.assertEqual(
+            list_select_related(Task, ['missing', 'output_fields']),
+            []
+        )
+
+
+class ListViewQueryCountTests(TestCase):
+    """Every generic list page costs the same queries at any page size."""
+
+    LIST_VIEWS = [
+        ('/tasks/', TaskListView),
+        ('/tasks/output-fields/', TaskOutputFieldListView),
+        ('/tasks/outputs/', TaskOutputListView),
+        ('/tasks/my-tasks/', MyAssignedTasksListView),
+        ('/tasks/my-viewer-tasks/', MyViewerTasksListView),
+        ('/organizations/', OrganizationListView),
+        ('/organizations/departments/', DepartmentListView),
+        ('/organizations/roles/', RoleListView),
+        ('/organizations/user-org-roles/', UserOrganizationRoleListView),
+        ('/accounts/users/', UserListView),
+    ]
+
+    ROWS = 12
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'pw'
+        )
+        for index in range(cls.ROWS):
+            organization = Organization.objects.create(name=f'org{index}')
+            department = Department.objects.create(
+                organization=organization, name=f'dept{index}'
+            )
+            role = Role.objects.create(name=f'role{index}')
+            member = User.objects.create_user(f'user{index}', password='pw')
+            UserOrganizationRole.objects.create(
+                user=member,
+                organization=organization,
+                department=department,
+                role=role,
+            )
+
+            task = Task.objects.create(
+                name=f'task{index}', organization=organization
+            )
+            task.departments.add(department)
+            task.assigned_users.add(cls.admin)
+            task.viewers.add(cls.admin)
+
+            field = TaskOutputField.objects.create(
+                task=task, name=f'field{index}', field_type='text'
+            )
+            TaskOutput.objects.create(
+                output_field=field, user=cls.admin, value_text='done'
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def count_queries(self, url, view, page_size):
+        with mock.patch.object(view, 'paginate_by', page_size):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            len(response.context['object_list']), page_size
+        )
+        return len(queries)
+
+    def test_query_count_is_independent_of_page_size(self):
+        for url, view in self.LIST_VIEWS:
+            with self.subTest(url=url):
+                small = self.count_queries(url, view, 2)
+                large = self.count_queries(url, view, 10)
+                self.assertEqual(small, large)
+
+
+class EstimatedCountTests(TestCase):
+    """Row estimates of list querysets."""
+
+    def test_user_without_organizations_estimates_zero(self):
+        Task.objects.create(
+            name='task', organization=Organization.objects.create(name='org')
+        )
+        tasks = org_scopes.scope(Task.objects.all(), [])
+        # The empty __in filter fails while compiling, before any query
+        with mock.patch.object(connection, 'vendor', 'postgresql'):
+            self.assertEqual(estimated_count(tasks), 0)
+        self.assertEqual(estimated_count(tasks), 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL')
+@override_settings(TENANT_RLS_ENABLED=True)
+class TenantRLSTests(TestCase):
+    """Tenant isolation policies on a live PostgreSQL database."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.own = Organization.objects.create(name='own')
+        other = Organization.objects.create(name='other')
+        for organization in (cls.own, other):
+            task = Task.objects.create(
+                name=organization.name, organization=organization
+            )
+            TaskOutputField.objects.create(
+                task=task, name='field', field_type='text'
+            )
+        cls.member = User.objects.create_user('member', password='pw')
+        UserOrganizationRole.objects.create(
+            user=cls.member,
+            organization=cls.own,
+            role=Role.objects.create(name='Member'),
+        )
+        cls.member.assigned_tasks.add(*Task.objects.all())
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            # ALTER TABLE refuses to run with deferred FK checks pending
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+            cursor.execute(
+                'SELECT rolsuper FROM pg_roles WHERE rolname = current_user'
+            )
+            superuser = cursor.fetchone()[0]
+        # Rolled back with the test transaction
+        install_policies(connection)
+        if superuser:
+            self.assume_unprivileged_role()
+
+    def assume_unprivileged_role(self):
+        """Run the test as a role subject to row-level security.
+
+        Superusers bypass the policies, so a role without that attribute
+        is created for the test. Creating it is transactional and undone
+        with the test transaction.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('CREATE ROLE tenant_rls_test NOLOGIN')
+            cursor.execute(
+                'GRANT ALL ON ALL TABLES IN SCHEMA public TO tenant_rls_test'
+            )
+            cursor.execute(
+                'GRANT ALL ON ALL SEQUENCES IN SCHEMA public '
+                'TO tenant_rls_test'
+            )
+            cursor.execute('SET ROLE tenant_rls_test')
+        self.addCleanup(self.reset_role)
+
+    def reset_role(self):
+        with connection.cursor() as cursor:
+            cursor.execute('RESET ROLE')
+
+    def visible_tasks(self):
+        return sorted(Task.objects.values_list('name', flat=True))
+
+    def test_unscoped_sessions_see_no_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'RESET {TENANT_SETTING}')
+        self.assertEqual(self.visible_tasks(), [])
+        clear_tenant(connection)
+        self.assertEqual(self.visible_tasks(), [])
+        self.assertFalse(TaskOutputField.objects.exists())
+
+    def test_denormalized_tables_are_isolated(self):
+        with tenant_scope([self.own.pk]):
+            for model in (TaskAccess, UserTaskStats):
+                with self.subTest(model=model.__name__):
+                    self.assertEqual(
+                        list(model.objects.values_list(
+                            'organization_id', flat=True
+                        )),
+                        [self.own.pk],
+                    )
+        with tenant_scope(unrestricted=True):
+            self.assertEqual(UserTaskStats.objects.count(), 2)
+
+    def test_scopes_nest_and_restore(self):
+        with tenant_scope([self.own.pk]):
+            self.assertEqual(self.visible_tasks(), ['own'])
+            self.assertEqual(
+                list(TaskOutputField.objects.values_list(
+                    'task__name', flat=True
+                )),
+                ['own'],
+            )
+            with tenant_scope(unrestricted=True):
+                self.assertEqual(self.visible_tasks(), ['other', 'own'])
+            self.assertEqual(self.visible_tasks(), ['own'])
+        self.assertEqual(self.visible_tasks(), [])
+
+    def test_scope_outlives_streaming_response_until_close(self):
+        def streaming_view(request):
+            return StreamingHttpResponse(
+                ','.join(self.visible_tasks()) for _ in range(1)
+            )
+
+        request = RequestFactory().get('/')
+        request.user = self.member
+        response = TenantRLSMiddleware(streaming_view)(request)
+        self.assertEqual(b''.join(response.streaming_content), b'own')
+
+        # As the test client does, keep the test transaction open
+        request_finished.disconnect(close_old_connections)
+        try:
+            response.close()
+        finally:
+            request_finished.connect(close_old_connections)
+        self.assertEqual(self.visible_tasks(), [])
+
+
+class QueryInstrumentationTests(TestCase):
+    """SQL fingerprinting and the per-request instrumentation header."""
+
+    def test_values_do_not_change_the_fingerprint(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT * FROM t WHERE id = 12 AND name = 'a''b' "
+                "AND pk IN (%s, %s, %s)"
+            ),
+            'SELECT * FROM t WHERE id = ? AND name = ? AND pk IN (...)'
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id = %s'),
+            fingerprint('SELECT  *  FROM t WHERE id = 7')
+        )
+
+    def test_recorder_groups_repeated_statements(self):
+        recorder = QueryRecorder()
+        recorder.queries = [
+            ('SELECT * FROM t WHERE id = 1', 1.0),
+            ('SELECT * FROM t WHERE id = 2', 2.0),
+            ('SELECT * FROM u', 0.5),
+        ]
+        self.assertEqual(recorder.count, 3)
+        self.assertEqual(recorder.total_ms, 3.5)
+        [(key, count, shape)] = recorder.duplicates()
+        self.assertEqual(count, 2)
+        self.assertEqual(shape, 'SELECT * FROM t WHERE id = ?')
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_is_sent_to_staff_only(self):
+        response = self.client.get('/accounts/login/')
+        self.assertNotIn('Server-Timing', response)
+
+        self.client.force_login(User.objects.create_user(
+            'member', 'member@example.com', 'password'
+        ))
+        response = self.client.get('/accounts/login/')
+        self.assertNotIn('Server-Timing', response)
+
+        self.client.force_login(User.objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True
+        ))
+        response = self.client.get('/accounts/login/')
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_server_timing_is_off_by_default(self):
+        self.client.force_login(User.objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True
+        ))
+        response = self.client.get('/accounts/login/')
+        self.assertNotIn('Server-Timing', response)
+
+
+class MetricsTests(TestCase):
+    """Metric exposition, multiprocess merging and the /metrics endpoint."""
+
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = Registry()
+        latency = registry.histogram(
+            'latency_seconds', 'Latency.', ['view'], buckets=[1, 0.1]
+        )
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, view='a')
+        text = render(registry.snapshot())
+        self.assertIn('# TYPE latency_seconds histogram', text)
+        self.assertIn('latency_seconds_bucket{view="a",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{view="a",le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{view="a",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_count{view="a"} 3', text)
+        with self.assertRaises(ValueError):
+            latency.observe(1, other='a')
+
+    def test_merge_drops_gauges_of_dead_processes(self):
+        snapshots = []
+        for live in (True, False):
+            registry = Registry()
+            registry.counter('hits_total', 'Hits.').inc(2)
+            registry.gauge('open', 'Open.').inc()
+            snapshots.append((registry.snapshot(), live))
+        text = render(merge(snapshots))
+        self.assertIn('hits_total 4', text)
+        self.assertIn('open 1', text)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint_requires_staff_or_token(self):
+        self.client.get('/accounts/login/')
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+        response = self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'http_requests_total{view="accounts:login",method="GET",'
+            'status="200"}',
+            response.content.decode()
+        )
+
+        self.client.force_login(User.objects.create_user(
+            'staff', 'staff@example.com', 'password', is_staff=True
+        ))
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+    @override_settings(REQUEST_INSTRUMENTATION=False)
+    def test_request_metrics_do_not_need_instrumentation(self):
+        key = ('accounts:login', 'GET', '200')
+        before = HTTP_REQUESTS.values.get(key, 0)
+        response = self.client.get('/accounts/login/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(HTTP_REQUESTS.values[key], before + 1)
+
+
+class ProtectedFileTests(TestCase):
+    """Delivery of uploaded files through serve_protected_file."""
+
+    @classmethod
+    def setUpClass(cls):
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        cls.enterClassContext(override_settings(MEDIA_ROOT=media.name))
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'pw'
+        )
+        task = Task.objects.create(
+            name='task', organization=Organization.objects.create(name='org')
+        )
+        field = TaskOutputField.objects.create(
+            task=task, name='report', field_type='file'
+        )
+        cls.output = TaskOutput.objects.create(
+            output_field=field,
+            user=cls.admin,
+            value_file=SimpleUploadedFile('report.txt', b'0123456789'),
+        )
+        cls.url = reverse('serve_protected_file', args=[cls.output.pk])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_unknown_backend_is_not_reported_as_missing_file(self):
+        with self.settings(PROTECTED_FILE_BACKEND='ftp'):
+            with self.assertRaises(ImproperlyConfigured):
+                self.client.get(self.url)
+
+    def test_storage_errors_are_not_shown_to_the_client(self):
+        error = OSError('/srv/media/secret')
+        # The DEBUG 404 page shows the Http404 message
+        with self.settings(DEBUG=True), mock.patch(
+            'core.views.stream_file_response', side_effect=error
+        ):
+            with self.assertLogs('core.views', 'ERROR'):
+                response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(b'secret', response.content)
+
+    def test_ranges_of_empty_files_are_not_satisfiable(self):
+        field = TaskOutputField.objects.create(
+            task=self.output.output_field.task,
+            name='empty',
+            field_type='file',
+        )
+        empty = TaskOutput.objects.create(
+            output_field=field,
+            user=self.admin,
+            value_file=SimpleUploadedFile('empty.txt', b''),
+        )
+        url = reverse('serve_protected_file', args=[empty.pk])
+        for header in ('bytes=-5', 'bytes=0-'):
+            with self.subTest(header=header):
+                response = self.client.get(url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 416)
+                self.assertEqual(response['Content-Range'], 'bytes */0')
+
+    def test_manifest_cells_cannot_start_formulas(self):
+        task = self.output.output_field.task
+        field = TaskOutputField.objects.create(
+            task=task, name='+answer', field_type='text'
+        )
+        TaskOutput.objects.create(
+            output_field=field, user=self.admin, value_text='=1+1'
+        )
+
+        response = self.client.get(
+            reverse('export_task_outputs', args=[task.pk])
+        )
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response)))
+        manifest = archive.read('manifest.csv').decode()
+        row = next(
+            row for row in csv.DictReader(io.StringIO(manifest))
+            if row['value_text']
+        )
+        self.assertEqual(row['field'], "'+answer")
+        self.assertEqual(row['value_text'], "'=1+1")
+
+    def add_file_output(self, task, user, name):
+        field = TaskOutputField.objects.create(
+            task=task, name=name, field_type='file'
+        )
+        return TaskOutput.objects.create(
+            output_field=field,
+            user=user,
+            value_file=SimpleUploadedFile(f'{name}.txt', name.encode()),
+        )
+
+    def test_exports_leave_out_tasks_the_user_cannot_see(self):
+        visible = self.output.output_field.task
+        organization = visible.organization
+        hidden = Task.objects.create(name='hidden', organization=organization)
+        department = Department.objects.create(
+            organization=organization, name='department'
+        )
+        department.tasks.add(visible, hidden)
+        self.add_file_output(hidden, self.admin, 'secret')
+        member = User.objects.create_user('member', password='pw')
+        UserOrganizationRole.objects.create(
+            user=member,
+            organization=organization,
+            role=Role.objects.create(name='Member'),
+        )
+        member.viewed_tasks.add(visible)
+        own = self.add_file_output(hidden, member, 'own')
+        # A grant without a role in the organization gives no access
+        outsider = User.objects.create_user('outsider', password='pw')
+        outsider.viewed_tasks.add(visible, hidden)
+
+        self.assertQuerySetEqual(
+            filter_file_access(TaskOutput.objects.order_by('pk'), member),
+            [self.output, own],
+        )
+        self.assertFalse(
+            filter_file_access(TaskOutput.objects.all(), outsider).exists()
+        )
+
+        self.client.force_login(member)
+        response = self.client.get(
+            reverse('export_department_outputs', args=[department.pk])
+        )
+        self.assertTrue(response.streaming)
+        self.assertNotIn('Content-Length', response)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response)))
+        self.assertIsNone(archive.testzip())
+        self.assertCountEqual(archive.namelist(), [
+            MANIFEST_NAME, archive_path(self.output), archive_path(own),
+        ])
+        self.assertEqual(
+            archive.read(archive_path(self.output)), b'0123456789'
+        )
+        manifest = archive.read(MANIFEST_NAME).decode()
+        self.assertNotIn('secret', manifest)
+
+    def test_exports_stream_valid_archives(self):
+        task = self.output.output_field.task
+        large = self.add_file_output(task, self.admin, 'large')
+        content = os.urandom(200 * 1024)
+        large.value_file.save('large.bin', ContentFile(content))
+
+        response = self.client.get(
+            reverse('export_task_outputs', args=[task.pk])
+        )
+        chunks = list(response.streaming_content)
+        # Files are sent in chunks, not as one buffered archive
+        self.assertGreater(len(chunks), 2)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read(archive_path(large)), content)
+
+    def test_offloaded_ranges_count_the_requested_bytes(self):
+        sent = FILE_BYTES.values.get(('nginx',), 0)
+        with self.settings(PROTECTED_FILE_BACKEND='nginx'):
+            response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertIn('X-Accel-Redirect', response)
+        self.assertEqual(FILE_BYTES.values[('nginx',)], sent + 4)
+
+    def test_offloaded_validators_match_nginx(self):
+        stat = os.stat(self.output.value_file.path)
+        # nginx's ETag format: hex modification time and size
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        with self.settings(PROTECTED_FILE_BACKEND='nginx'):
+            response = self.client.get(self.url)
+            self.assertEqual(response['ETag'], etag)
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+            sent = FILE_BYTES.values[('nginx',)]
+            self.client.get(
+                self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=etag
+            )
+            self.assertEqual(FILE_BYTES.values[('nginx',)], sent + 4)
+
+
+class RolePermissionCacheTests(TestCase):
+    """Expiry of cached role permission sets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='org')
+        cls.other_organization = Organization.objects.create(name='other')
+        cls.view_task, cls.add_task, cls.change_task = (
+            Permission.objects.get(
+                content_type__app_label='tasks', codename=codename
+            )
+            for codename in ('view_task', 'add_task', 'change_task')
+        )
+        cls.editor = Role.objects.create(name='editor')
+        cls.editor.permissions.add(cls.view_task)
+        cls.reader = Role.objects.create(name='reader')
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+        cls.assignment = UserOrganizationRole.objects.create(
+            user=cls.alice, organization=cls.organization, role=cls.editor
+        )
+        UserOrganizationRole.objects.create(
+            user=cls.bob, organization=cls.organization, role=cls.reader
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def has_permission(self, user, permission):
+        """Check a permission on a fresh instance, bypassing the memo."""
+        return user_has_role_permission(
+            User.objects.get(pk=user.pk), permission
+        )
+
+    def assertCached(self, user):
+        """Assert the user's permission set is served from the cache."""
+        user = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(0):
+            get_permission_set(user)
+
+    def test_permission_set_is_memoized_per_request(self):
+        user = User.objects.get(pk=self.alice.pk)
+        with self.assertNumQueries(1):
+            permissions = get_permission_set(user)
+        self.assertEqual(permissions, frozenset({'tasks.view_task'}))
+        cache.clear()
+        # The memo on the instance needs neither cache nor database
+        with self.assertNumQueries(0):
+            self.assertTrue(user_has_role_permission(user, 'tasks.view_task'))
+            self.assertFalse(user_has_role_permission(user, 'tasks.add_task'))
+        self.assertIs(get_permission_set(user), permissions)
+
+    def test_later_requests_hit_the_cache(self):
+        self.assertTrue(self.has_permission(self.alice, 'tasks.view_task'))
+        self.assertCached(self.alice)
+
+    def test_users_without_roles_or_login_hold_nothing(self):
+        carol = User.objects.create_user('carol', password='pw')
+        self.assertEqual(get_permission_set(carol), frozenset())
+        with self.assertNumQueries(0):
+            self.assertEqual(get_permission_set(AnonymousUser()), frozenset())
+        carol.is_superuser = True
+        self.assertTrue(user_has_role_permission(carol, 'tasks.add_task'))
+
+    def test_role_permission_changes_reach_holders_only(self):
+        self.assertFalse(self.has_permission(self.alice, 'tasks.add_task'))
+        self.assertFalse(self.has_permission(self.bob, 'tasks.add_task'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editor.permissions.add(self.add_task)
+        self.assertCached(self.bob)
+        self.assertTrue(self.has_permission(self.alice, 'tasks.add_task'))
+        self.assertFalse(self.has_permission(self.bob, 'tasks.add_task'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editor.permissions.remove(self.view_task)
+        self.assertCached(self.bob)
+        self.assertFalse(self.has_permission(self.alice, 'tasks.view_task'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.editor.permissions.clear()
+        self.assertCached(self.bob)
+        self.assertFalse(self.has_permission(self.alice, 'tasks.add_task'))
+
+    def test_reverse_permission_changes_reach_holders_only(self):
+        self.assertFalse(self.has_permission(self.bob, 'tasks.change_task'))
+        self.assertFalse(self.has_permission(self.alice, 'tasks.change_task'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change_task.roles.add(self.reader)
+        self.assertCached(self.alice)
+        self.assertTrue(self.has_permission(self.bob, 'tasks.change_task'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.change_task.roles.clear()
+        self.assertCached(self.alice)
+        self.assertFalse(self.has_permission(self.bob, 'tasks.change_task'))
+
+    def test_reassignment_expires_old_and_new_user(self):
+        self.assertTrue(self.has_permission(self.alice, 'tasks.view_task'))
+        self.assertFalse(self.has_permission(self.bob, 'tasks.view_task'))
+
+        assignment = UserOrganizationRole.objects.get(pk=self.assignment.pk)
+        assignment.user = self.bob
+        assignment.organization = self.other_organization
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertNumQueries(1):
+                assignment.save()
+        self.assertFalse(self.has_permission(self.alice, 'tasks.view_task'))
+        self.assertTrue(self.has_permission(self.bob, 'tasks.view_task'))
+
+    def test_evicted_user_generation_does_not_revive_old_entries(self):
+        self.assertTrue(self.has_permission(self.alice, 'tasks.view_task'))
+        UserOrganizationRole.objects.filter(pk=self.assignment.pk).update(
+            role=self.reader
+        )
+        invalidate_user_permissions([self.alice.pk])
+        cache.delete(_user_generation_key(self.alice.pk))
+        self.assertFalse(self.has_permission(self.alice, 'tasks.view_task'))
+
+    def test_roles_bumped_during_a_load_are_not_cached_as_current(self):
+        load = permissions_module._load_permission_set
+
+        def load_then_edit(user):
+            # The role is edited after the load read its permissions
+            loaded = load(user)
+            self.editor.permissions.add(self.add_task)
+            invalidate_role_permissions([self.editor.pk])
+            return loaded
+
+        with mock.patch.object(
+            permissions_module, '_load_permission_set', load_then_edit
+        ):
+            self.assertFalse(self.has_permission(self.alice, 'tasks.add_task'))
+        self.assertTrue(self.has_permission(self.alice, 'tasks.add_task'))
+        self.assertCached(self.alice)
+
+    def test_evicted_role_generation_rebuilds_entries(self):
+        self.assertTrue(self.has_permission(self.alice, 'tasks.view_task'))
+        self.editor.permissions.through.objects.filter(
+            role=self.editor
+        ).delete()
+        cache.delete(_role_generation_key(self.editor.pk))
+        self.assertFalse(self.has_permission(self.alice, 'tasks.view_task'))
+
+
+class DashboardCacheTests(TestCase):
+    """Keys and expiry of the versioned dashboard cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='org')
+        cls.other_organization = Organization.objects.create(name='other')
+        role = Role.objects.create(name='member')
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+        UserOrganizationRole.objects.create(
+            user=cls.alice, organization=cls.organization, role=role
+        )
+        UserOrganizationRole.objects.create(
+            user=cls.bob, organization=cls.other_organization, role=role
+        )
+        cls.role = role
+        cls.task = Task.objects.create(
+            name='task', organization=cls.organization
+        )
+        cls.field = TaskOutputField.objects.create(
+            task=cls.task, name='field', field_type='text'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.factory = RequestFactory()
+
+    def rebuilt(self, user, params=None):
+        """Load a user's dashboard and report whether it was rebuilt."""
+        request = self.factory.get('/dashboard/', params)
+        request.user = User.objects.get(pk=user.pk)
+        builds = []
+        get_dashboard_context(request, lambda: builds.append(1) or {})
+        return bool(builds)
+
+    def test_filters_select_separate_entries(self):
+        filters = [
+            {},
+            {'organization': self.organization.pk},
+            {'department': '1'},
+            {'user': self.bob.pk},
+        ]
+        for params in filters:
+            self.assertTrue(self.rebuilt(self.alice, params))
+        for params in filters:
+            self.assertFalse(self.rebuilt(self.alice, params))
+
+    def test_changes_expire_only_their_organization(self):
+        changes = [
+            lambda: Task.objects.create(
+                name='new', organization=self.organization
+            ),
+            lambda: TaskOutput.objects.create(
+                output_field=self.field, user=self.alice, value_text='done'
+            ),
+            lambda: UserOrganizationRole.objects.create(
+                user=User.objects.create_user('carol', password='pw'),
+                organization=self.organization,
+                role=self.role,
+            ),
+        ]
+        for change in changes:
+            self.rebuilt(self.alice)
+            self.rebuilt(self.bob)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertTrue(self.rebuilt(self.alice))
+            self.assertFalse(self.rebuilt(self.bob))
+
+    def test_reassignment_expires_the_user(self):
+        self.rebuilt(self.bob)
+        with self.captureOnCommitCallbacks(execute=True):
+            UserOrganizationRole.objects.create(
+                user=self.bob, organization=self.organization, role=self.role
+            )
+        self.assertTrue(self.rebuilt(self.bob))
+
+    def test_grants_outside_the_users_organizations_expire_them(self):
+        changes = [
+            lambda: self.task.assigned_users.add(self.bob),
+            lambda: self.task.viewers.add(self.bob),
+            lambda: self.task.assigned_users.remove(self.bob),
+            lambda: self.task.viewers.clear(),
+        ]
+        for change in changes:
+            self.rebuilt(self.bob)
+            with self.captureOnCommitCallbacks(execute=True):
+                change()
+            self.assertTrue(self.rebuilt(self.bob))
+
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        self.rebuilt(self.alice)
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(name='new', organization=self.organization)
+        cache.delete(_org_generation_key(self.organization.pk))
+        self.assertTrue(self.rebuilt(self.alice))
+
+    def test_stats_command_reports_hits_and_misses(self):
+        reset_cache_stats()
+        self.rebuilt(self.alice)
+        self.rebuilt(self.alice)
+        self.rebuilt(self.bob)
+
+        stdout = io.StringIO()
+        call_command('dashboard_cache_stats', '--reset', stdout=stdout)
+        self.assertIn('hits=1 misses=2 hit_ratio=33.3%', stdout.getvalue())
+        stdout = io.StringIO()
+        call_command('dashboard_cache_stats', stdout=stdout)
+        self.assertIn('hits=0 misses=0 hit_ratio=n/a', stdout.getvalue())
+
+
+class AccessContextTests(TestCase):
+    """Lazy loading and sharing of the request access context."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='org')
+        cls.department = Department.objects.create(
+            organization=cls.organization, name='department'
+        )
+        cls.role = Role.objects.create(name='member')
+        cls.user = User.objects.create_user('member', password='pw')
+        UserOrganizationRole.objects.create(
+            user=cls.user, organization=cls.organization, role=cls.role
+        )
+        UserOrganizationRole.objects.create(
+            user=cls.user,
+            organization=cls.organization,
+            department=cls.department,
+            role=cls.role,
+        )
+
+    def test_memberships_load_once_on_first_read(self):
+        with self.assertNumQueries(0):
+            access = AccessContext(self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(access.org_ids, {self.organization.pk})
+        with self.assertNumQueries(0):
+            self.assertEqual(access.department_ids, {self.department.pk})
+            self.assertEqual(access.role_ids, {self.role.pk})
+            self.assertTrue(access.has_org(self.organization.pk))
+            self.assertFalse(access.has_org(self.organization.pk + 1))
+
+    def test_anonymous_users_belong_nowhere(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(AccessContext(AnonymousUser()).org_ids, set())
+
+    def test_middleware_attaches_an_unevaluated_context(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        seen = []
+
+        def view(request):
+            seen.append(get_access_context(request))
+            return HttpResponse()
+
+        with self.assertNumQueries(0):
+            AccessContextMiddleware(view)(request)
+        self.assertIs(seen[0], request.access)
+
+    def test_requests_without_the_middleware_share_one_context(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        access = get_access_context(request)
+        self.assertIs(get_access_context(request), access)
+        access.org_ids
+        with self.assertNumQueries(0):
+            get_access_context(request).department_ids
+
+
+class OrgScopeTests(TestCase):
+    """Compilation and filtering of registered organization scopes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.org_a = Organization.objects.create(name='a')
+        cls.org_b = Organization.objects.create(name='b')
+        role = Role.objects.create(name='member')
+        cls.both = User.objects.create_user('both', password='pw')
+        cls.only_b = User.objects.create_user('only-b', password='pw')
+        User.objects.create_user('nowhere', password='pw')
+        for organization in (cls.org_a, cls.org_b):
+            for department in range(2):
+                UserOrganizationRole.objects.create(
+                    user=cls.both,
+                    organization=organization,
+                    department=Department.objects.create(
+                        organization=organization, name=f'd{department}'
+                    ),
+                    role=role,
+                )
+        UserOrganizationRole.objects.create(
+            user=cls.only_b, organization=cls.org_b, role=role
+        )
+
+    def test_unregistered_models_are_rejected(self):
+        with self.assertRaises(ImproperlyConfigured):
+            org_scopes.scope(Permission.objects.all(), [self.org_a.pk])
+        self.assertFalse(org_scopes.is_registered(Permission))
+
+    def test_invalid_registrations_are_rejected(self):
+        registry = OrgScopeRegistry()
+        registry.register(Task, 'organization')
+        with self.assertRaises(ImproperlyConfigured):
+            registry.register(Task, 'organization')
+        with self.assertRaises(ImproperlyConfigured):
+            registry.register(TaskOutput, 'output_field__missing')
+        with self.assertRaises(ImproperlyConfigured):
+            registry.register(TaskOutputField, 'task__name')
+        with self.assertRaises(ImproperlyConfigured):
+            registry.register(Department, 'organization__departments')
+
+    def test_multi_valued_scope_uses_exists_without_fan_out(self):
+        scope = org_scopes.get(User)
+        self.assertTrue(scope.uses_exists)
+        users = scope.filter(
+            User.objects.all(), [self.org_a.pk, self.org_b.pk]
+        )
+        sql = str(users.query).upper()
+        self.assertIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertEqual(
+            sorted(users.values_list('pk', flat=True)),
+            sorted([self.both.pk, self.only_b.pk]),
+        )
+        self.assertEqual(
+            list(scope.filter(User.objects.all(), [self.org_a.pk])),
+            [self.both],
+        )
+
+    def test_forward_scope_filters_on_the_foreign_key(self):
+        scope = org_scopes.get(Department)
+        self.assertFalse(scope.uses_exists)
+        departments = scope.filter(Department.objects.all(), [self.org_a.pk])
+        self.assertNotIn('EXISTS', str(departments.query).upper())
+        self.assertEqual(
+            {department.organization_id for department in departments},
+            {self.org_a.pk},
+        )
+        self.assertEqual(departments.count(), 2)
+
+
+class FileAccessTests(TestCase):
+    """Parity of the single-query file access check with the original."""
+
+    @classmethod
+    def setUpTestData(cls):
+        organization = Organization.objects.create(name='org')
+        other = Organization.objects.create(name='other')
+        role = Role.objects.create(name='member')
+        task = Task.objects.create(name='task', organization=organization)
+        owner = User.objects.create_user('owner', password='pw')
+        field = TaskOutputField.objects.create(
+            task=task, name='report', field_type='text'
+        )
+        cls.output = TaskOutput.objects.create(
+            output_field=field, user=owner, value_text='report'
+        )
+
+        def member(username, organization):
+            user = User.objects.create_user(username, password='pw')
+            if organization is not None:
+                UserOrganizationRole.objects.create(
+                    user=user, organization=organization, role=role
+                )
+            return user
+
+        assignee = member('assignee', organization)
+        cls.viewer = viewer = member('viewer', organization)
+        ungranted = member('ungranted', organization)
+        no_role = member('no-role', None)
+        elsewhere = member('elsewhere', other)
+        task.assigned_users.add(assignee, no_role)
+        task.viewers.add(viewer, elsewhere)
+        admin = User.objects.create_superuser('admin', 'a@example.com', 'pw')
+        cls.expected = {
+            admin: True,
+            owner: True,
+            assignee: True,
+            viewer: True,
+            ungranted: False,
+            no_role: False,
+            elsewhere: False,
+        }
+
+    def test_decisions_match_the_original_check(self):
+        for user, granted in self.expected.items():
+            with self.subTest(user=user.username):
+                output = TaskOutput.objects.get(pk=self.output.pk)
+                self.assertEqual(legacy_has_file_access(user, output), granted)
+                output = TaskOutput.objects.get(pk=self.output.pk)
+                self.assertEqual(has_file_access(user, output), granted)
+                self.assertEqual(
+                    filter_file_access(TaskOutput.objects.all(), user)
+                    .filter(pk=self.output.pk).exists(),
+                    granted,
+                )
+
+    def test_annotated_outputs_need_no_further_queries(self):
+        for user, granted in self.expected.items():
+            with self.subTest(user=user.username):
+                output = annotate_file_access(
+                    TaskOutput.objects.all(), user
+                ).get(pk=self.output.pk)
+                with self.assertNumQueries(0):
+                    self.assertEqual(has_file_access(user, output), granted)
+
+    def test_unannotated_outputs_are_checked_in_one_query(self):
+        output = TaskOutput.objects.get(pk=self.output.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(has_file_access(self.viewer, output))
+
+
+class KeysetPaginationTests(TestCase):
+    """Stability of cursor pages across ties, inserts and directions."""
+
+    keys = ('-created_at', '-id')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'pw'
+        )
+        cls.organization = Organization.objects.create(name='org')
+        Task.objects.bulk_create(
+            Task(name=f'task {index}', organization=cls.organization)
+            for index in range(11)
+        )
+        now = timezone.now().replace(microsecond=0)
+        tasks = list(Task.objects.order_by('pk'))
+        # Ties on created_at, and times within the same millisecond
+        for index, task in enumerate(tasks):
+            task.created_at = now + datetime.timedelta(
+                microseconds=index // 3 * 100
+            )
+        Task.objects.bulk_update(tasks, ['created_at'])
+
+    def walk(self, per_page=3):
+        pages, cursor = [], None
+        while True:
+            page = keyset_paginate(
+                Task.objects.all(), self.keys, cursor, per_page
+            )
+            pages.append(page)
+            if not page.has_next:
+                return pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        pages = self.walk()
+        self.assertEqual(
+            [task.pk for page in pages for task in page],
+            list(
+                Task.objects.order_by(*self.keys).values_list('pk', flat=True)
+            ),
+        )
+        self.assertFalse(pages[0].has_previous)
+        self.assertIsNone(pages[0].previous_cursor)
+
+    def test_previous_cursors_return_the_same_pages(self):
+        pages = self.walk()
+        for earlier, later in zip(pages, pages[1:]):
+            page = keyset_paginate(
+                Task.objects.all(), self.keys, later.previous_cursor, 3
+            )
+            self.assertEqual(list(page), list(earlier))
+
+    def test_inserts_do_not_shift_later_pages(self):
+        first = keyset_paginate(Task.objects.all(), self.keys, per_page=3)
+        second = list(keyset_paginate(
+            Task.objects.all(), self.keys, first.next_cursor, 3
+        ))
+        Task.objects.create(name='newest', organization=self.organization)
+        self.assertEqual(
+            list(keyset_paginate(
+                Task.objects.all(), self.keys, first.next_cursor, 3
+            )),
+            second,
+        )
+
+    def test_each_page_is_one_query(self):
+        page = keyset_paginate(Task.objects.all(), self.keys, per_page=3)
+        with self.assertNumQueries(1):
+            keyset_paginate(Task.objects.all(), self.keys, page.next_cursor, 3)
+
+    def test_invalid_cursors_fall_back_to_the_first_page(self):
+        first = list(keyset_paginate(Task.objects.all(), self.keys))
+        for cursor in ('garbage', encode_cursor([1]), encode_cursor(['x', 1])):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    list(keyset_paginate(
+                        Task.objects.all(), self.keys, cursor
+                    )),
+                    first,
+                )
+
+    def test_list_views_follow_cursors(self):
+        self.client.force_login(self.admin)
+        seen, params = [], {}
+        while True:
+            response = self.client.get(reverse('tasks:task_list'), params)
+            page = response.context['page_obj']
+            seen.extend(task.pk for task in page)
+            if not page.has_next:
+                break
+            params = {'cursor': page.next_cursor}
+        self.assertCountEqual(seen, Task.objects.values_list('pk', flat=True))
+        self.assertEqual(len(seen), len(set(seen)))
@@ -2,20 +2,97 @@
 
 """Secure file serving with access control."""
 
+import functools
+import hashlib
+import hmac
+import logging
 import mimetypes
+import re
+import time
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.http import FileResponse, Http404
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.db.models import Exists, OuterRef, Q
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import get_object_or_404
-from tasks.models import TaskOutput
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from core.access import get_access_context
+from core.exports import stream_outputs_zip
+from core.metrics import CONTENT_TYPE, REGISTRY, render as render_metrics
+from core.scoping import org_scopes
+from organizations.models import Department
+from tasks.models import Task, TaskAccess, TaskOutput
 from django.views import View
 from django.shortcuts import render
 
 
+logger = logging.getLogger(__name__)
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+FILE_BYTES = REGISTRY.counter(
+    'protected_file_bytes_total',
+    'Bytes of protected files sent, by delivery backend.',
+    ['backend'],
+)
+FILE_LATENCY = REGISTRY.histogram(
+    'protected_file_duration_seconds',
+    'Time to produce a protected file response, by status.',
+    ['status'],
+)
+
+
+def observe_file_latency(view):
+    """
+    Record the latency and status of a file view in FILE_LATENCY.
+
+    Streaming happens after the view returns, so the time to the first
+    byte is measured rather than the whole transfer.
+
+    Args:
+        view: View function
+
+    Returns:
+        function: Wrapped view
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = view(request, *args, **kwargs)
+            status = response.status_code
+            return response
+        except Http404:
+            status = 404
+            raise
+        finally:
+            FILE_LATENCY.observe(
+                time.perf_counter() - start, status=status
+            )
+    return wrapper
+
+
 @login_required
+@observe_file_latency
 def serve_protected_file(request, output_id):
     """
     Serve file with access control checks.
 
+    The output, its field and task are fetched together with the access
+    decision in a single query. Conditional requests are answered with
+    304 from the stored file metadata. Depending on PROTECTED_FILE_BACKEND
+    the transfer itself is handed to the front-end server or streamed by
+    Django, honouring single byte-range requests with 206.
+
     Args:
         request: HTTP request
         output_id: TaskOutput ID
@@ -24,8 +101,13 @@ def serve_protected_file(request, output_id):
         FileResponse: Protected file if user has access
         Http404: If file not found or access denied
     """
-    output = get_object_or_404(TaskOutput, id=output_id)
     user = request.user
+    output = get_object_or_404(
+        annotate_file_access(
+            TaskOutput.objects.select_related('output_field__task'), user
+        ),
+        id=output_id
+    )
 
     if not has_file_access(user, output):
         raise Http404("File not found or access denied")
@@ -34,13 +116,42 @@ def serve_protected_file(request, output_id):
         raise Http404("File not found")
 
     try:
-        file_handle = output.value_file.open('rb')
-        
+        last_modified = file_last_modified(output)
+        etag = file_etag(output, last_modified)
+
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            return response
+
         content_type, _ = mimetypes.guess_type(output.original_filename)
         if not content_type:
             content_type = 'application/octet-stream'
-        
-        response = FileResponse(file_handle, content_type=content_type)
+
+        response = offload_file_response(output, content_type)
+        if response is None:
+            response = stream_file_response(
+                request, output, content_type, etag, last_modified
+            )
+            if response.status_code in (200, 206):
+                FILE_BYTES.inc(
+                    int(response.get('Content-Length', output.file_size or 0)),
+                    backend='stream',
+                )
+        else:
+            # The front-end sends the body and applies the Range itself
+            FILE_BYTES.inc(
+                offloaded_bytes(request, output, etag, last_modified),
+                backend=settings.PROTECTED_FILE_BACKEND,
+            )
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, no-cache'
         response['Content-Disposition'] = (
             f'attachment; filename="{output.original_filename}"'
         )
@@ -49,14 +160,336 @@ def serve_protected_file(request, output_id):
         
         return response
         
-    except Exception as e:
-        raise Http404(f"Error serving file: {str(e)}")
+    except ImproperlyConfigured:
+        raise
+    except Exception:
+        # Storage errors would leak paths to the client
+        logger.exception('Could not serve file of task output %s', output_id)
+        raise Http404("File not found")
+
+
+def file_etag(output, last_modified):
+    """
+    Build a strong ETag from stored file metadata.
+
+    Uploads are written under a fresh UUID name and never modified in
+    place, so the storage name and size identify the exact bytes.
+
+    nginx replaces the ETag of X-Accel-Redirect responses with its own,
+    built from the file's modification time and size. That format is
+    used with the nginx backend, so validators sent back by clients
+    match in Django's conditional and If-Range checks as well.
+
+    Args:
+        output: TaskOutput instance with a stored file
+        last_modified: Modification timestamp from file_last_modified
+
+    Returns:
+        str: Quoted ETag value
+    """
+    if settings.PROTECTED_FILE_BACKEND == 'nginx':
+        size = output.file_size
+        if size is None:
+            size = output.value_file.size
+        return f'"{last_modified:x}-{size:x}"'
+
+    size = output.file_size if output.file_size is not None else ''
+    digest = hashlib.sha1(
+        f'{output.pk}:{output.value_file.name}:{size}'.encode()
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def file_last_modified(output):
+    """
+    Get the last modification time of a stored file.
+
+    Args:
+        output: TaskOutput instance with a stored file
+
+    Returns:
+        int: POSIX timestamp, from storage or the submission time
+    """
+    storage = output.value_file.storage
+    try:
+        modified = storage.get_modified_time(output.value_file.name)
+    except (NotImplementedError, OSError):
+        modified = output.submitted_at
+    return int(modified.timestamp())
+
+
+def parse_range_header(header, size):
+    """
+    Parse a single-range Range header.
+
+    Multi-range and malformed headers are ignored so the full file is
+    sent, as permitted by RFC 9110.
+
+    Args:
+        header: Value of the Range header
+        size: File size in bytes
+
+    Returns:
+        tuple: (start, end) inclusive byte offsets, or None for full file
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # Suffix range: the final N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError('Empty suffix range')
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+class _FileRange:
+    """
+    File-like view of a byte range for FileResponse streaming.
+    """
+
+    def __init__(self, file_handle, start, length):
+        file_handle.seek(start)
+        self._file = file_handle
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def ranged_request(request, etag, last_modified):
+    """
+    Check whether the Range header of a request applies.
+
+    It does if If-Range is absent or still matches the current ETag or
+    modification time.
+
+    Args:
+        request: HTTP request
+        etag: Current ETag of the file
+        last_modified: Current modification timestamp of the file
+
+    Returns:
+        bool: Whether a Range header is present and applies
+    """
+    if not request.META.get('HTTP_RANGE'):
+        return False
+    if_range = request.META.get('HTTP_IF_RANGE')
+    return (
+        not if_range or if_range == etag or
+        parse_http_date_safe(if_range) == last_modified
+    )
+
+
+def offloaded_bytes(request, output, etag, last_modified):
+    """
+    Predict the bytes the front-end server sends for an offloaded file.
+
+    Args:
+        request: HTTP request
+        output: TaskOutput instance with a stored file
+        etag: Current ETag of the file
+        last_modified: Current modification timestamp of the file
+
+    Returns:
+        int: Length of the requested range, of the whole file without
+        one, or 0 if the range cannot be satisfied
+    """
+    size = output.file_size or 0
+    if not ranged_request(request, etag, last_modified):
+        return size
+    try:
+        byte_range = parse_range_header(request.META['HTTP_RANGE'], size)
+    except ValueError:
+        return 0
+    if byte_range is None:
+        return size
+    start, end = byte_range
+    return end - start + 1
+
+
+def stream_file_response(request, output, content_type, etag, last_modified):
+    """
+    Stream a stored file through Django, honouring byte ranges.
+
+    See ranged_request for when a Range header is applied.
+
+    Args:
+        request: HTTP request
+        output: TaskOutput instance with a stored file
+        content_type: MIME type to send
+        etag: Current ETag of the file
+        last_modified: Current modification timestamp of the file
+
+    Returns:
+        HttpResponse: 200 full file, 206 partial content or 416
+    """
+    if ranged_request(request, etag, last_modified):
+        size = output.value_file.size
+        try:
+            byte_range = parse_range_header(request.META['HTTP_RANGE'], size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            file_handle = output.value_file.open('rb')
+            response = FileResponse(
+                _FileRange(file_handle, start, length),
+                status=206,
+                content_type=content_type
+            )
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            return response
+
+    file_handle = output.value_file.open('rb')
+    return FileResponse(file_handle, content_type=content_type)
+
+
+def offload_file_response(output, content_type):
+    """
+    Build a response handing the file transfer to the front-end server.
+
+    Backends (PROTECTED_FILE_BACKEND):
+        stream: no offload, Django streams the file (default)
+        nginx: X-Accel-Redirect to PROTECTED_FILE_INTERNAL_URL, which
+            must be an internal nginx location aliased to MEDIA_ROOT
+        sendfile: X-Sendfile with the absolute file path (Apache
+            mod_xsendfile, lighttpd)
+
+    Args:
+        output: TaskOutput instance with a stored file
+        content_type: MIME type to send
+
+    Returns:
+        HttpResponse: Empty-bodied offload response, or None to stream
+
+    Raises:
+        ImproperlyConfigured: If PROTECTED_FILE_BACKEND is unknown
+    """
+    backend = settings.PROTECTED_FILE_BACKEND
+
+    if backend == 'stream':
+        return None
+
+    if backend == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = (
+            settings.PROTECTED_FILE_INTERNAL_URL
+            + quote(output.value_file.name)
+        )
+        return response
+
+    if backend == 'sendfile':
+        try:
+            path = output.value_file.path
+        except NotImplementedError:
+            # Storage without local paths, fall back to streaming
+            return None
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+        return response
+
+    raise ImproperlyConfigured(
+        f"Unknown PROTECTED_FILE_BACKEND '{backend}'; "
+        f"expected 'stream', 'nginx' or 'sendfile'"
+    )
+
+
+def file_access_grant(user, task=None):
+    """
+    Build an EXISTS expression for a user's access to a task's files.
+
+    The user must hold a TaskAccess grant on the task and a role in the
+    task's organization. Both conditions are checked in one indexed
+    subquery.
+
+    Args:
+        user: User instance
+        task: Task ID or expression; defaults to the outer TaskOutput's
+            task
+
+    Returns:
+        Exists: Boolean expression
+    """
+    if task is None:
+        task = OuterRef('output_field__task')
+    return Exists(
+        TaskAccess.objects.filter(
+            user=user,
+            task=task,
+            organization__user_org_roles__user=user,
+        )
+    )
+
+
+def annotate_file_access(queryset, user):
+    """
+    Annotate TaskOutput rows with the user's access decision.
+
+    Args:
+        queryset: TaskOutput QuerySet
+        user: User instance
+
+    Returns:
+        QuerySet: Outputs annotated with user_has_file_access
+    """
+    if user.is_superuser:
+        return queryset
+    return queryset.annotate(user_has_file_access=file_access_grant(user))
+
+
+def filter_file_access(queryset, user):
+    """
+    Restrict TaskOutput rows to those has_file_access would allow.
+
+    Args:
+        queryset: TaskOutput QuerySet
+        user: User instance
+
+    Returns:
+        QuerySet: Outputs the user owns or may access through a grant
+    """
+    if user.is_superuser:
+        return queryset
+    return queryset.filter(Q(user=user) | file_access_grant(user))
 
 
 def has_file_access(user, task_output):
     """
     Check if user has access to the task output file.
 
+    Uses the user_has_file_access annotation when the output was loaded
+    through annotate_file_access(); otherwise issues a single EXISTS
+    query without loading the task's assignees or viewers.
+
     Args:
         user: User instance
         task_output: TaskOutput instance
@@ -67,22 +500,134 @@ def has_file_access(user, task_output):
     if user.is_superuser:
         return True
 
-    task = task_output.output_field.task
-
-    if task_output.user == user:
+    if task_output.user_id == user.pk:
         return True
 
-    user_orgs = user.user_org_roles.values_list(
-        'organization', flat=True
-    ).distinct()
+    granted = getattr(task_output, 'user_has_file_access', None)
+    if granted is not None:
+        return granted
 
-    if task.organization.id not in user_orgs:
-        return False
+    return TaskAccess.objects.filter(
+        user=user,
+        task__output_fields=task_output.output_field_id,
+        organization__user_org_roles__user=user,
+    ).exists()
 
-    if user in task.assigned_users.all() or user in task.viewers.all():
-        return True
 
-    return False
+def zip_export_response(request, outputs, filename):
+    """
+    Stream an access-filtered ZIP export of task outputs.
+
+    The archive is produced while it is sent, so the response has no
+    Content-Length and memory use does not grow with the export size.
+
+    Args:
+        request: HTTP request
+        outputs: TaskOutput QuerySet to export
+        filename: Download name of the archive
+
+    Returns:
+        StreamingHttpResponse: ZIP archive
+    """
+    outputs = filter_file_access(outputs, request.user)
+    response = StreamingHttpResponse(
+        stream_outputs_zip(outputs), content_type='application/zip'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-Content-Type-Options'] = 'nosniff'
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+@login_required
+def export_task_outputs(request, task_id):
+    """
+    Download every accessible output of a task as a ZIP archive.
+
+    Args:
+        request: HTTP request
+        task_id: Task ID
+
+    Returns:
+        StreamingHttpResponse: ZIP with the files and a manifest.csv
+
+    Raises:
+        Http404: If the task is outside the user's organizations
+    """
+    tasks = Task.objects.all()
+    if not request.user.is_superuser:
+        tasks = org_scopes.scope(tasks, get_access_context(request).org_ids)
+    task = get_object_or_404(tasks, id=task_id)
+
+    outputs = TaskOutput.objects.filter(output_field__task=task)
+    return zip_export_response(
+        request, outputs, f'task_{task.pk}_outputs.zip'
+    )
+
+
+@login_required
+def export_department_outputs(request, department_id):
+    """
+    Download accessible outputs of all tasks of a department as a ZIP.
+
+    Args:
+        request: HTTP request
+        department_id: Department ID
+
+    Returns:
+        StreamingHttpResponse: ZIP with the files and a manifest.csv
+
+    Raises:
+        Http404: If the department is outside the user's organizations
+    """
+    departments = Department.objects.all()
+    if not request.user.is_superuser:
+        departments = org_scopes.scope(
+            departments, get_access_context(request).org_ids
+        )
+    department = get_object_or_404(departments, id=department_id)
+
+    outputs = TaskOutput.objects.filter(
+        Exists(Task.departments.through.objects.filter(
+            task=OuterRef('output_field__task'), department=department
+        ))
+    )
+    return zip_export_response(
+        request, outputs, f'department_{department.pk}_outputs.zip'
+    )
+
+
+def metrics_view(request):
+    """
+    Expose the process metrics in the Prometheus text format.
+
+    Open to staff users and to scrapers sending METRICS_TOKEN as a
+    bearer token. In multiprocess mode the snapshots of every worker
+    are merged.
+
+    Args:
+        request: HTTP request
+
+    Returns:
+        HttpResponse: Exposition text
+
+    Raises:
+        PermissionDenied: If neither a staff user nor the token is given
+    """
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    authorized = request.user.is_staff or (
+        token and hmac.compare_digest(
+            header.encode(), f'Bearer {token}'.encode()
+        )
+    )
+    if not authorized:
+        raise PermissionDenied
+
+    return HttpResponse(
+        render_metrics(REGISTRY.collect()), content_type=CONTENT_TYPE
+    )
+
 
 class Custom404View(View):
     template_name = '404.html'
@@ -20,3 +20,14 @@ class OrganizationsConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'organizations'
+
+    def ready(self):
+        """Connect signal handlers and register organization scopes."""
+        from core.scoping import org_scopes
+
+        from . import signals  # noqa: F401
+        from .models import Department, Organization, UserOrganizationRole
+
+        org_scopes.register(Organization, '')
+        org_scopes.register(Department, 'organization')
+        org_scopes.register(UserOrganizationRole, 'organization')
@@ -61,6 +61,9 @@ class Department(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
 
+    # Relations read by __str__
+    str_select_related = ['organization']
+
     class Meta:
         """Model metadata configuration."""
 
@@ -144,11 +147,33 @@ class UserOrganizationRole(models.Model):
         related_name='user_org_roles'
     )
 
+    # Relations read by __str__
+    str_select_related = ['user', 'organization', 'department', 'role']
+
     class Meta:
         """Model metadata configuration."""
 
         unique_together = ('user', 'organization', 'department', 'role')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the user and organization the assignment was loaded with.
+
+        Signal handlers compare them on save to expire the caches of the
+        previous user and organization too, without reading the row
+        again.
+
+        Returns:
+            UserOrganizationRole instance.
+        """
+        instance = super().from_db(db, field_names, values)
+        # Read from __dict__ so deferred fields are not loaded
+        instance._loaded_user_org = (
+            instance.__dict__.get('user_id'),
+            instance.__dict__.get('organization_id'),
+        )
+        return instance
+
     def __str__(self):
         """Return string representation of the user role assignment.
 
@@ -0,0 +1,128 @@
+"""Signal handlers for organization models.
+
+This module expires cached role permission sets when role permissions,
+user role assignments, or roles themselves change, and cached
+dashboards when organizations, departments or memberships change.
+Invalidation is deferred until the surrounding transaction commits so
+other processes never rebuild an entry from uncommitted data.
+"""
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+)
+from django.dispatch import receiver
+
+from core.dashboard_cache import (
+    invalidate_organization_dashboards,
+    invalidate_user_dashboards,
+)
+from core.permissions import (
+    invalidate_role_permissions,
+    invalidate_user_permissions,
+)
+
+from .models import Department, Organization, Role, UserOrganizationRole
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def role_permissions_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Expire permission sets of users holding roles whose grants changed.
+
+    Handles both directions of the relation: role.permissions.add()
+    reports the role as the instance, while permission.roles.add()
+    reports the affected roles in pk_set.
+
+    Args:
+        sender: Intermediate model of Role.permissions.
+        instance: Role or Permission being modified.
+        action: Type of update performed on the relation.
+        reverse: True when the change was made from the Permission side.
+        pk_set: Primary keys added or removed.
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            role_ids = [instance.pk]
+        else:
+            return
+    elif action == 'pre_clear':
+        instance._cleared_role_ids = list(
+            instance.roles.values_list('pk', flat=True)
+        )
+        return
+    elif action == 'post_clear':
+        role_ids = getattr(instance, '_cleared_role_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        role_ids = pk_set or []
+    else:
+        return
+
+    role_ids = list(role_ids)
+    transaction.on_commit(lambda: invalidate_role_permissions(role_ids))
+
+
+@receiver(post_delete, sender=Role)
+def role_deleted(sender, instance, **kwargs):
+    """Expire permission sets built from a deleted role.
+
+    Users holding the role are also expired individually as their
+    UserOrganizationRole rows cascade.
+
+    Args:
+        sender: Role model class.
+        instance: Role instance that was deleted.
+    """
+    role_id = instance.pk
+    transaction.on_commit(lambda: invalidate_role_permissions([role_id]))
+
+
+@receiver(post_save, sender=UserOrganizationRole)
+@receiver(post_delete, sender=UserOrganizationRole)
+def user_organization_role_changed(sender, instance, **kwargs):
+    """Expire permission sets and dashboards of reassigned users.
+
+    The organization's dashboards are expired as well since its user
+    count changes.
+
+    Args:
+        sender: UserOrganizationRole model class.
+        instance: UserOrganizationRole instance saved or deleted.
+    """
+    user_ids = [instance.user_id]
+    org_ids = [instance.organization_id]
+    # Set by UserOrganizationRole.from_db on instances read from the database
+    loaded_user_id, loaded_organization_id = getattr(
+        instance, '_loaded_user_org', (None, None)
+    )
+    if loaded_user_id is not None:
+        user_ids.append(loaded_user_id)
+    if loaded_organization_id is not None:
+        org_ids.append(loaded_organization_id)
+    instance._loaded_user_org = (instance.user_id, instance.organization_id)
+
+    def invalidate():
+        invalidate_user_permissions(user_ids)
+        invalidate_user_dashboards(user_ids)
+        invalidate_organization_dashboards(org_ids)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Organization)
+@receiver(post_delete, sender=Organization)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def organization_structure_changed(sender, instance, **kwargs):
+    """Expire dashboards listing a changed organization or department.
+
+    Args:
+        sender: Organization or Department model class.
+        instance: Instance saved or deleted.
+    """
+    org_id = instance.pk if sender is Organization else instance.organization_id
+    transaction.on_commit(
+        lambda: invalidate_organization_dashboards([org_id])
+    )
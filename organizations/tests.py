@@ -1,3 +1,49 @@
 from django.test import TestCase
 
-# Create your tests here.
+from core.testing import Budget, ViewBudgetMixin
+from organizations.models import Role, UserOrganizationRole
+
+
+class OrganizationViewBudgetTests(ViewBudgetMixin, TestCase):
+    """Query and latency budgets of every view in organizations.urls."""
+
+    urlconf = 'organizations.urls'
+
+    def get_budgets(self):
+        organization = [self.task.organization_id]
+        department = [self.task.departments.order_by('pk').first().pk]
+        role = [Role.objects.order_by('pk').first().pk]
+        assignment = [UserOrganizationRole.objects.filter(
+            organization=self.task.organization_id
+        ).order_by('pk').first().pk]
+        return [
+            Budget('organizations:list', queries=4),
+            Budget('organizations:list', queries=6, user='member'),
+            Budget('organizations:add', queries=3),
+            Budget('organizations:detail', organization, queries=4),
+            Budget('organizations:edit', organization, queries=4),
+            Budget('organizations:delete', organization, queries=4),
+            Budget('organizations:department_list', queries=4),
+            Budget(
+                'organizations:department_list', queries=6, user='member'
+            ),
+            Budget('organizations:department_add', queries=4),
+            Budget('organizations:department_detail', department, queries=4),
+            Budget('organizations:department_edit', department, queries=5),
+            Budget('organizations:department_delete', department, queries=5),
+            Budget('organizations:role_list', queries=4),
+            Budget('organizations:role_add', queries=4),
+            Budget('organizations:role_detail', role, queries=5),
+            Budget('organizations:role_edit', role, queries=6),
+            Budget('organizations:role_delete', role, queries=4),
+            Budget('organizations:user_org_role_list', queries=4),
+            Budget('organizations:user_org_role_add', queries=7),
+            Budget('organizations:user_org_role_assign', queries=7),
+            Budget(
+                'organizations:user_org_role_detail', assignment, queries=8
+            ),
+            Budget('organizations:user_org_role_edit', assignment, queries=8),
+            Budget(
+                'organizations:user_org_role_delete', assignment, queries=8
+            ),
+        ]
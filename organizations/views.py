@@ -17,8 +17,11 @@ from django.views.generic import (
 )
 
 from core.mixins import (
+    CursorPaginationMixin,
     OrganizationFilterMixin,
     OrganizationFormMixin,
+    RelatedChoicesMixin,
+    RelatedListMixin,
     RolePermissionMixin,
 )
 
@@ -59,6 +62,8 @@ class OrganizationListView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedListMixin,
+    CursorPaginationMixin,
     ListView
 ):
     """Display list of organizations filtered by user access.
@@ -70,6 +75,8 @@ class OrganizationListView(
     template_name = 'organizations/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['name', 'description']
+    cursor_ordering = ('-created_at', '-id')
     required_permission = 'organizations.view_organization'
 
     def get_context_data(self, **kwargs):
@@ -88,7 +95,6 @@ class OrganizationListView(
             'edit_url': 'organizations:edit',
             'delete_url': 'organizations:delete',
             'table_headers': ['Name', 'Description'],
-            'list_attrs': ['name', 'description'],
             'can_add': 'organizations.add_organization',
             'can_edit': 'organizations.change_organization',
             'can_delete': 'organizations.delete_organization',
@@ -207,6 +213,8 @@ class DepartmentListView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedListMixin,
+    CursorPaginationMixin,
     ListView
 ):
     """Display list of departments filtered by user's organizations.
@@ -218,6 +226,7 @@ class DepartmentListView(
     template_name = 'organizations/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['organization', 'name', 'description']
     required_permission = 'organizations.view_department'
 
     def get_context_data(self, **kwargs):
@@ -235,7 +244,6 @@ class DepartmentListView(
             'edit_url': 'organizations:department_edit',
             'delete_url': 'organizations:department_delete',
             'table_headers': ['Organization', 'Name', 'Description'],
-            'list_attrs': ['organization', 'name', 'description'],
             'can_add': 'organizations.add_department',
             'can_edit': 'organizations.change_department',
             'can_delete': 'organizations.delete_department',
@@ -295,6 +303,7 @@ class DepartmentDetailView(
 class DepartmentCreateView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     GenericFormMixin,
     CreateView,
@@ -317,6 +326,7 @@ class DepartmentUpdateView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     GenericFormMixin,
     UpdateView,
@@ -358,6 +368,8 @@ class DepartmentDeleteView(
 class RoleListView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    RelatedListMixin,
+    CursorPaginationMixin,
     ListView
 ):
     """Display list of all roles.
@@ -369,6 +381,7 @@ class RoleListView(
     template_name = 'organizations/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['name', 'description']
     required_permission = 'organizations.view_role'
 
     def get_context_data(self, **kwargs):
@@ -386,7 +399,6 @@ class RoleListView(
             'edit_url': 'organizations:role_edit',
             'delete_url': 'organizations:role_delete',
             'table_headers': ['Name', 'Description'],
-            'list_attrs': ['name', 'description'],
             'can_add': 'organizations.add_role',
             'can_edit': 'organizations.change_role',
             'can_delete': 'organizations.delete_role',
@@ -413,7 +425,7 @@ class RoleDetailView(
     """
 
     model = Role
-    template_name = 'organizations/role_detail.html'
+    template_name = 'organizations/generic_detail.html'
     context_object_name = 'object'
     required_permission = 'organizations.view_role'
 
@@ -424,7 +436,7 @@ class RoleDetailView(
             Dictionary with fields, role permissions, and navigation URLs.
         """
         context = super().get_context_data(**kwargs)
-        role = self.get_object()
+        role = self.object
 
         context.update({
             'page_title': 'Role Details',
@@ -502,6 +514,8 @@ class UserOrganizationRoleListView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedListMixin,
+    CursorPaginationMixin,
     ListView
 ):
     """Display list of user organization roles.
@@ -513,6 +527,7 @@ class UserOrganizationRoleListView(
     template_name = 'organizations/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['user', 'organization', 'role', 'department']
     required_permission = 'organizations.view_userorganizationrole'
 
     def get_context_data(self, **kwargs):
@@ -530,7 +545,6 @@ class UserOrganizationRoleListView(
             'edit_url': 'organizations:user_org_role_edit',
             'delete_url': 'organizations:user_org_role_delete',
             'table_headers': ['User', 'Organization', 'Role', 'Department'],
-            'list_attrs': ['user', 'organization', 'role', 'department'],
             'can_add': 'organizations.add_userorganizationrole',
             'can_edit': 'organizations.change_userorganizationrole',
             'can_delete': 'organizations.delete_userorganizationrole',
@@ -558,7 +572,7 @@ class UserOrganizationRoleDetailView(
     """
 
     model = UserOrganizationRole
-    template_name = 'organizations/user_org_role_detail.html'
+    template_name = 'organizations/generic_assign_detail.html'
     context_object_name = 'object'
     required_permission = 'organizations.view_userorganizationrole'
 
@@ -569,7 +583,7 @@ class UserOrganizationRoleDetailView(
             Dictionary with role details, permissions, and navigation URLs.
         """
         context = super().get_context_data(**kwargs)
-        obj = self.get_object()
+        obj = self.object
 
         context.update({
             'page_title': 'User Organization Role Details',
@@ -577,10 +591,10 @@ class UserOrganizationRoleDetailView(
             'list_url': 'organizations:user_org_role_list',
             'fields': [field for field in self.model._meta.fields],
             'permissions': obj.role.permissions.all(),
-            'role_name': obj.role.name,
-            'role_description': obj.role.description,
-            'organization_name': obj.organization.name,
-            'department_name': (
+            'name': obj.role.name,
+            'description': obj.role.description,
+            'organization': obj.organization.name,
+            'department': (
                 obj.department.name if obj.department else 'No Department'
             ),
             'can_edit': 'organizations.change_userorganizationrole',
@@ -599,6 +613,7 @@ class UserOrganizationRoleDetailView(
 class UserOrganizationRoleCreateView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     GenericFormMixin,
     CreateView,
@@ -621,6 +636,7 @@ class UserOrganizationRoleUpdateView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     GenericFormMixin,
     UpdateView,
@@ -662,6 +678,7 @@ class UserOrganizationRoleDeleteView(
 class UserOrganizationRoleAssignView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     CreateView,
 ):
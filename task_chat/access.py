@@ -0,0 +1,32 @@
+"""Access rule of task chat rooms.
+
+Shared by the chat pages, the history endpoint and the WebSocket
+consumer so reading and posting are allowed to the same users.
+"""
+
+from tasks.models import Task, TaskAccess
+
+
+def can_chat(user, task_id):
+    """Check whether a user may read and post in a task's chat.
+
+    The user must be assigned to or a viewer of the task and hold a
+    role in the task's organization; superusers may use the chat of
+    any existing task.
+
+    Args:
+        user: User instance, possibly anonymous.
+        task_id: Primary key of the task.
+
+    Returns:
+        True if access is granted.
+    """
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return Task.objects.filter(pk=task_id).exists()
+    return TaskAccess.objects.filter(
+        task_id=task_id,
+        user=user,
+        organization__user_org_roles__user=user,
+    ).exists()
@@ -5,47 +5,108 @@ task chat messaging using Django Channels.
 """
 
 import json
+import time
+from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils import timezone
+from django.db import DatabaseError, InterfaceError
 
-from tasks.models import Task
+from core.metrics import REGISTRY
+from core.tenancy import tenant_scope
 
+from .access import can_chat
 from .models import TaskChatMessage
+from .persistence import get_write_buffer
+from .replay import get_room_histories, missed_messages
 
 
 User = get_user_model()
 
+CHAT_CONNECTIONS = REGISTRY.gauge(
+    'chat_connections', 'Open chat WebSocket connections.'
+)
+CHAT_CONNECTIONS_TOTAL = REGISTRY.counter(
+    'chat_connections_total', 'Chat WebSocket connections accepted.'
+)
+CHAT_MESSAGES_RECEIVED = REGISTRY.counter(
+    'chat_messages_received_total', 'Chat messages received from clients.'
+)
+CHAT_MESSAGES_SENT = REGISTRY.counter(
+    'chat_messages_sent_total', 'Chat messages delivered to clients.'
+)
+CHAT_MESSAGES_REPLAYED = REGISTRY.counter(
+    'chat_messages_replayed_total',
+    'Missed chat messages sent to reconnecting clients.'
+)
+
 
 class ChatConsumer(AsyncWebsocketConsumer):
     """WebSocket consumer for real-time task chat.
 
     Handles WebSocket connections for task-specific chat rooms,
     manages message broadcasting to all connected clients, and
-    persists messages to the database.
+    persists messages to the database through the batched write
+    buffer in task_chat.persistence. Connections and messages are
+    counted in the chat_* metrics.
+
+    Access is decided once at connect time and kept for the lifetime
+    of the socket, so messages cost no authorization queries. It is
+    rechecked when it is older than CHAT_ACCESS_REVALIDATE_SECONDS and
+    the socket is closed once access has been revoked.
+
+    A reconnecting client passes the id of the last message it received
+    as ?last_seen_id= and is sent the messages it missed, from the
+    room's ring in task_chat.replay or else from the database; in fast
+    mode always from the database. If more than CHAT_REPLAY_LIMIT were
+    missed it is told to resync instead.
 
     Attributes:
         task_id: ID of the task associated with this chat room.
         room_group_name: Unique identifier for the chat room group.
+        accepted: Whether the connection was accepted.
+        access_checked_at: Monotonic time of the last access check.
+        history: Ring of the room's latest frames in this process.
+        replayed_ids: Ids of the messages sent by the replay.
     """
 
+    accepted = False
+    replayed_ids = frozenset()
+
     async def connect(self):
         """Handle WebSocket connection.
 
-        Extracts task ID from URL, creates room group name, adds
-        the channel to the room group, and accepts the connection.
+        Extracts task ID from URL and rejects the handshake unless the
+        user may chat about the task. Otherwise creates room group
+        name, adds the channel to the room group, accepts the
+        connection and replays missed messages if last_seen_id is
+        given.
         """
         self.task_id = self.scope['url_route']['kwargs']['task_id']
         self.room_group_name = f'chat_{self.task_id}'
 
+        if not await self.has_access():
+            await self.close()
+            return
+        self.access_checked_at = time.monotonic()
+
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
 
+        self.history = get_room_histories().join(self.task_id)
+
         await self.accept()
+        self.accepted = True
+        CHAT_CONNECTIONS.inc()
+        CHAT_CONNECTIONS_TOTAL.inc()
+
+        last_seen_id = self.last_seen_id()
+        if last_seen_id is not None:
+            await self.replay(last_seen_id)
 
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection.
@@ -55,82 +116,186 @@ class ChatConsumer(AsyncWebsocketConsumer):
         Args:
             close_code: WebSocket close code indicating reason for closure.
         """
+        if not self.accepted:
+            return
+        self.accepted = False
+        CHAT_CONNECTIONS.dec()
+        get_room_histories().leave(self.task_id)
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Receive and process message from WebSocket.
 
-        Parses incoming message, saves to database, and broadcasts
-        to all clients in the room group.
+        Parses the incoming message, queues it in the process-wide write
+        buffer and broadcasts it to all clients in the room group. In
+        durable mode (CHAT_PERSIST_MODE) the broadcast waits until the
+        message's batch is written and a message that cannot be saved
+        is answered with an error to the sender only; in fast mode it is
+        broadcast at once and persisted in the background. The frame is
+        serialized once for the whole room and carries the timestamp
+        stored with the message row. Invalid frames are answered with
+        an error to the sender only, see parse_message.
 
         Args:
             text_data: JSON string containing message data.
+            bytes_data: Binary frame, which is rejected.
         """
-        text_data_json = json.loads(text_data)
-        message = text_data_json['message']
-        user = self.scope['user']
+        if not await self.access_is_current():
+            return
+
+        message, error = self.parse_message(text_data)
+        if error:
+            await self.send(text_data=json.dumps({'error': error}))
+            return
 
-        await self.save_message(user, message)
+        user = self.scope['user']
+        CHAT_MESSAGES_RECEIVED.inc()
 
+        chat_message = TaskChatMessage(
+            task_id=self.task_id,
+            user=user,
+            message=message
+        )
+        persisted = get_write_buffer().add(chat_message)
+        if settings.CHAT_PERSIST_MODE == 'durable':
+            try:
+                chat_message = await persisted
+            except (DatabaseError, InterfaceError):
+                await self.send(text_data=json.dumps({
+                    'error': 'Message could not be saved.'
+                }))
+                return
+
+        # Serialized once here instead of once per recipient
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'chat_message',
-                'message': message,
-                'username': user.username,
-                'timestamp': str(await self.get_timestamp())
+                'id': chat_message.pk,
+                'text': json.dumps(chat_message.as_event()),
             }
         )
 
     async def chat_message(self, event):
         """Receive message from room group and send to WebSocket.
 
-        Handles messages broadcast from the room group and sends
-        them to the connected WebSocket client.
+        Forwards the frame serialized by the sender's receive() to the
+        connected WebSocket client as is, after recording it in the
+        room's ring. Messages already sent by the replay are skipped
+        until broadcasts pass the newest of them.
 
         Args:
-            event: Dictionary containing message, username, and timestamp.
+            event: Dictionary containing the message id and the JSON
+                frame as text.
         """
-        message = event['message']
-        username = event['username']
-        timestamp = event['timestamp']
+        message_id = event.get('id')
+        self.history.record(message_id, event['text'])
+        if self.replayed_ids and message_id is not None:
+            if message_id in self.replayed_ids:
+                return
+            # Batches of other processes may broadcast lower ids later,
+            # so only the replayed ids themselves are skipped
+            if message_id > max(self.replayed_ids):
+                self.replayed_ids = frozenset()
+        if not await self.access_is_current():
+            return
+
+        await self.send(text_data=event['text'])
+        CHAT_MESSAGES_SENT.inc()
+
+    def parse_message(self, text_data):
+        """Extract the message of a client frame.
+
+        Frames must be JSON objects whose 'message' is a non-blank
+        string of at most CHAT_MESSAGE_MAX_LENGTH characters.
 
-        await self.send(text_data=json.dumps({
-            'message': message,
-            'username': username,
-            'timestamp': timestamp
-        }))
+        Args:
+            text_data: Text of the frame, or None for binary frames.
 
-    @database_sync_to_async
-    def save_message(self, user, message):
-        """Save chat message to database.
+        Returns:
+            Tuple of (message, None), or (None, error text) if the frame
+            is invalid.
+        """
+        try:
+            payload = json.loads(text_data)
+        except (TypeError, ValueError):
+            return None, 'Messages must be JSON.'
+        message = payload.get('message') if isinstance(payload, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            return None, 'Message must be a non-empty string.'
+        if len(message) > settings.CHAT_MESSAGE_MAX_LENGTH:
+            return None, (
+                f'Messages are limited to '
+                f'{settings.CHAT_MESSAGE_MAX_LENGTH} characters.'
+            )
+        return message, None
+
+    def last_seen_id(self):
+        """Read the last_seen_id query parameter of the handshake.
 
-        Creates a new TaskChatMessage record in the database
-        with the provided user and message content.
+        Returns:
+            Message id, or None if absent or invalid.
+        """
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        try:
+            return int(query['last_seen_id'][0])
+        except (KeyError, ValueError):
+            return None
+
+    async def replay(self, last_seen_id):
+        """Send the messages missed since last_seen_id.
 
         Args:
-            user: User instance who sent the message.
-            message: Text content of the message.
+            last_seen_id: Id of the last message the client received.
+        """
+        limit = settings.CHAT_REPLAY_LIMIT
+        frames = None
+        # Fast mode broadcasts carry no id, so the ring misses them
+        if settings.CHAT_PERSIST_MODE == 'durable':
+            frames = await self.history.since(last_seen_id)
+        if frames is None:
+            frames = await database_sync_to_async(missed_messages)(
+                self.task_id, last_seen_id, limit + 1
+            )
+        if len(frames) > limit:
+            await self.send(text_data=json.dumps({'resync': True}))
+            return
+
+        self.replayed_ids = frozenset(message_id for message_id, _ in frames)
+        for _, frame in frames:
+            await self.send(text_data=frame)
+        CHAT_MESSAGES_REPLAYED.inc(len(frames))
+
+    async def access_is_current(self):
+        """Revalidate access once the last check has expired.
 
         Returns:
-            TaskChatMessage instance that was created.
+            True while the user keeps access; the socket is closed
+            otherwise.
         """
-        task = Task.objects.get(id=self.task_id)
-        chat_msg = TaskChatMessage.objects.create(
-            task=task,
-            user=user,
-            message=message
-        )
-        return chat_msg
+        age = time.monotonic() - self.access_checked_at
+        if age < settings.CHAT_ACCESS_REVALIDATE_SECONDS:
+            return True
+
+        if await self.has_access():
+            self.access_checked_at = time.monotonic()
+            return True
+
+        await self.close(code=4003)
+        return False
 
     @database_sync_to_async
-    def get_timestamp(self):
-        """Get current timestamp.
+    def has_access(self):
+        """Check whether the user may chat about the task.
+
+        See task_chat.access.can_chat. Runs unrestricted by row-level
+        security as it checks access itself.
 
         Returns:
-            DateTime object representing current time in configured timezone.
+            True if access is granted.
         """
-        return timezone.now()
+        with tenant_scope(unrestricted=True):
+            return can_chat(self.scope['user'], self.task_id)
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_chat', '0003_taskchatmessage_history_index'),
+        ('tasks', '0006_usertaskstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskchatmessage',
+            index=models.Index(fields=['task', 'id'], name='chatmessage_task_id_idx'),
+        ),
+    ]
@@ -6,9 +6,47 @@ associated with tasks, including user attribution and timestamps.
 
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
+from core.pagination import keyset_paginate
 from tasks.models import Task
 
+# Messages per history page, rendered with the chat and served by the
+# history endpoint
+HISTORY_PAGE_SIZE = 50
+
+
+class TaskChatMessageQuerySet(models.QuerySet):
+    """QuerySet with keyset-paginated chat history.
+
+    Attributes:
+        history_ordering: Newest first, matching the (task, timestamp,
+            id) index so every page is one range scan.
+    """
+
+    history_ordering = ('-timestamp', '-id')
+
+    def history(self, task_id, cursor=None, per_page=HISTORY_PAGE_SIZE):
+        """Fetch a page of a task's messages, newest first.
+
+        The first page holds the latest messages; its next_cursor
+        addresses the page of older messages before it.
+
+        Args:
+            task_id: Primary key of the task.
+            cursor: Cursor from a previous page, or None for the latest.
+            per_page: Messages per page.
+
+        Returns:
+            KeysetPage of messages with their users joined.
+        """
+        return keyset_paginate(
+            self.filter(task_id=task_id).select_related('user'),
+            self.history_ordering,
+            cursor,
+            per_page,
+        )
+
 
 class TaskChatMessage(models.Model):
     """Chat message associated with a task.
@@ -20,7 +58,9 @@ class TaskChatMessage(models.Model):
         task: Foreign key reference to the associated Task.
         user: Foreign key reference to the user who created the message.
         message: Text content of the chat message.
-        timestamp: DateTime when the message was created (auto-populated).
+        timestamp: DateTime when the message was received (auto-populated
+            when the instance is built, so it is known before the row is
+            written behind).
     """
 
     task = models.ForeignKey(
@@ -33,12 +73,28 @@ class TaskChatMessage(models.Model):
         on_delete=models.CASCADE
     )
     message = models.TextField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+
+    objects = TaskChatMessageQuerySet.as_manager()
+
+    # Relations read by __str__
+    str_select_related = ['user']
 
     class Meta:
         """Model metadata configuration."""
 
         ordering = ['timestamp']
+        indexes = [
+            models.Index(
+                fields=['task', 'timestamp', 'id'],
+                name='chatmessage_task_ts_id_idx'
+            ),
+            # Replay of messages newer than a client's last seen id
+            models.Index(
+                fields=['task', 'id'],
+                name='chatmessage_task_id_idx'
+            ),
+        ]
 
     def __str__(self):
         """Return string representation of the message.
@@ -47,3 +103,19 @@ class TaskChatMessage(models.Model):
             String containing username and first 50 characters of message.
         """
         return f"{self.user.username}: {self.message[:50]}"
+
+    def as_event(self):
+        """Build the JSON payload sent to chat clients.
+
+        Used for WebSocket frames and history pages alike. The id is
+        None for a message not yet written.
+
+        Returns:
+            Dictionary with id, message, username and timestamp.
+        """
+        return {
+            'id': self.pk,
+            'message': self.message,
+            'username': self.user.username,
+            'timestamp': str(self.timestamp),
+        }
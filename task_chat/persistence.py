@@ -0,0 +1,180 @@
+"""Write-behind persistence of chat messages.
+
+Messages received by every ChatConsumer of a process are queued in one
+buffer per event loop and written with a single bulk_create once
+CHAT_FLUSH_SIZE messages are waiting, or CHAT_FLUSH_INTERVAL seconds
+after the first of them arrived. A burst across many rooms thus costs
+one thread pool hop and one INSERT per batch instead of one per message.
+
+Should a batch fail, its rows are retried one at a time so a bad row
+only fails its own message.
+"""
+
+import asyncio
+import logging
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from core.metrics import REGISTRY
+from core.tenancy import tenant_scope
+
+from .models import TaskChatMessage
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = REGISTRY.histogram(
+    'chat_flush_batch_size', 'Chat messages written per batch.',
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+_buffers = weakref.WeakKeyDictionary()
+
+
+@tenant_scope(unrestricted=True)
+def write_messages(messages):
+    """
+    Insert chat messages in one statement, isolating failing rows.
+
+    Runs unrestricted by row-level security; consumers check access
+    when the socket connects.
+
+    Args:
+        messages: Unsaved TaskChatMessage instances
+
+    Returns:
+        list: The saved instance, or the raised DatabaseError, per message
+    """
+    try:
+        with transaction.atomic():
+            return TaskChatMessage.objects.bulk_create(messages)
+    except DatabaseError:
+        if len(messages) == 1:
+            raise
+
+    results = []
+    for message in messages:
+        try:
+            with transaction.atomic():
+                message.save(force_insert=True)
+        except DatabaseError as error:
+            results.append(error)
+        else:
+            results.append(message)
+    return results
+
+
+class WriteBehindBuffer:
+    """
+    Queue of chat messages awaiting a batched INSERT.
+
+    Attributes:
+        flush_size: Number of queued messages that triggers a write
+        flush_interval: Seconds a message waits at most before a write
+        pending: (message, future) tuples not yet handed to a write
+    """
+
+    def __init__(self, flush_size, flush_interval):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self._timer = None
+        self._writes = set()
+
+    def add(self, message):
+        """
+        Queue an unsaved message for the next batch.
+
+        Args:
+            message: Unsaved TaskChatMessage instance
+
+        Returns:
+            asyncio.Future: Resolves to the saved message, or raises the
+            exception that prevented saving it
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((message, future))
+        if len(self.pending) >= self.flush_size:
+            self._start_write()
+        elif self._timer is None:
+            self._timer = loop.call_later(
+                self.flush_interval, self._start_write
+            )
+        return future
+
+    async def flush(self):
+        """Write every queued message and wait for writes in progress."""
+        self._start_write()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def _start_write(self):
+        """Hand the queued messages to a background write."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
+        write = asyncio.ensure_future(self._write(batch))
+        self._writes.add(write)
+        write.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch):
+        """
+        Insert a batch and settle the futures of its messages.
+
+        Args:
+            batch: (message, future) tuples
+        """
+        FLUSH_BATCH_SIZE.observe(len(batch))
+        try:
+            results = await database_sync_to_async(write_messages)(
+                [message for message, _ in batch]
+            )
+        except Exception as error:
+            # Also InterfaceError from a dropped connection, which is no
+            # DatabaseError; consumers must never wait on a lost batch
+            logger.exception(
+                'Could not save %d chat message(s)', len(batch)
+            )
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+                    future.exception()
+            return
+
+        for (message, future), result in zip(batch, results):
+            if future.done():
+                # The waiting consumer went away
+                continue
+            if isinstance(result, Exception):
+                logger.error(
+                    'Could not save chat message for task %s: %s',
+                    message.task_id, result,
+                )
+                future.set_exception(result)
+                # Logged above; fast mode never awaits the future
+                future.exception()
+            else:
+                future.set_result(result)
+
+
+def get_write_buffer():
+    """
+    Get the write buffer of the running event loop.
+
+    Returns:
+        WriteBehindBuffer: Buffer shared by every consumer on the loop
+    """
+    loop = asyncio.get_running_loop()
+    buffer = _buffers.get(loop)
+    if buffer is None:
+        buffer = _buffers[loop] = WriteBehindBuffer(
+            settings.CHAT_FLUSH_SIZE, settings.CHAT_FLUSH_INTERVAL
+        )
+    return buffer
@@ -0,0 +1,218 @@
+"""Replay of chat messages missed while a socket was disconnected.
+
+Every process keeps a bounded ring of the latest frames of each room it
+has members in, filled from the broadcasts its consumers receive. A
+reconnecting client sends the id of the last message it saw and gets
+the newer frames from the ring; only when the ring does not reach back
+that far are they read from the database. Reads are unrestricted by
+row-level security; the consumer checks access when a socket connects.
+
+A ring is filled from the moment the room's first local member joins,
+and seeded from the database on its first replay, so it holds every
+message above its floor without gaps. A reconnect storm after a deploy
+thus costs one query per room and process instead of one per client.
+Rooms are dropped when their last local member leaves.
+
+Only messages with ids are recorded. In fast mode (CHAT_PERSIST_MODE)
+broadcasts are sent before the row exists and carry no id, so the ring
+would miss them; consumers then replay from the database only, once the
+write buffer has saved the messages. Clients resuming from ids of
+history pages may be replayed frames they already show; they drop them
+by username, timestamp and text.
+"""
+
+import asyncio
+import bisect
+import json
+import weakref
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+from core.tenancy import tenant_scope
+
+from .models import TaskChatMessage
+
+
+_histories = weakref.WeakKeyDictionary()
+
+
+@tenant_scope(unrestricted=True)
+def missed_messages(task_id, last_seen_id, limit):
+    """
+    Read the frames of messages newer than the last one seen.
+
+    Args:
+        task_id: Primary key of the task
+        last_seen_id: Id of the last message the client received
+        limit: Maximum number of messages to read
+
+    Returns:
+        list: (id, frame) tuples in id order
+    """
+    messages = TaskChatMessage.objects.filter(
+        task_id=task_id, id__gt=last_seen_id
+    ).select_related('user').order_by('id')[:limit]
+    return [
+        (message.pk, json.dumps(message.as_event())) for message in messages
+    ]
+
+
+@tenant_scope(unrestricted=True)
+def latest_messages(task_id, limit):
+    """
+    Read the frames of a task's latest messages.
+
+    Args:
+        task_id: Primary key of the task
+        limit: Maximum number of messages to read
+
+    Returns:
+        list: (id, frame) tuples in id order
+    """
+    messages = TaskChatMessage.objects.filter(
+        task_id=task_id
+    ).select_related('user').order_by('-id')[:limit]
+    return [
+        (message.pk, json.dumps(message.as_event()))
+        for message in reversed(messages)
+    ]
+
+
+class RoomHistory:
+    """
+    Bounded ring of the latest frames of one room.
+
+    Attributes:
+        task_id: Primary key of the room's task
+        size: Maximum number of frames kept
+        members: Number of local consumers in the room
+        floor: Every message with a greater id is held once seeded
+        seeded: Whether the ring was completed from the database
+    """
+
+    def __init__(self, task_id, size):
+        self.task_id = task_id
+        self.size = size
+        self.members = 0
+        self.floor = 0
+        self.seeded = False
+        self._ids = []
+        self._frames = {}
+        self._lock = asyncio.Lock()
+
+    def record(self, message_id, frame):
+        """
+        Add a broadcast frame, ignoring duplicates and unsaved messages.
+
+        Called by every local member receiving the broadcast; only the
+        first call stores it.
+
+        Args:
+            message_id: Id of the message, or None if not yet saved
+            frame: JSON text sent to clients
+        """
+        if (message_id is None or message_id <= self.floor or
+                message_id in self._frames):
+            return
+        # Batches of different processes may arrive out of id order
+        bisect.insort(self._ids, message_id)
+        self._frames[message_id] = frame
+        if len(self._ids) > self.size:
+            self.floor = self._ids.pop(0)
+            del self._frames[self.floor]
+
+    async def since(self, last_seen_id):
+        """
+        Get the held frames newer than a message.
+
+        Args:
+            last_seen_id: Id of the last message the client received
+
+        Returns:
+            list: (id, frame) tuples in id order, or None if the ring
+            does not reach back to last_seen_id
+        """
+        await self._seed()
+        if last_seen_id < self.floor:
+            return None
+        start = bisect.bisect_right(self._ids, last_seen_id)
+        return [
+            (message_id, self._frames[message_id])
+            for message_id in self._ids[start:]
+        ]
+
+    async def _seed(self):
+        """Merge the latest messages from the database, once."""
+        if self.seeded:
+            return
+        async with self._lock:
+            if self.seeded:
+                return
+            rows = await database_sync_to_async(latest_messages)(
+                self.task_id, self.size
+            )
+            if len(rows) == self.size:
+                # Older messages exist beyond the ring
+                self.floor = max(self.floor, rows[0][0] - 1)
+            for message_id, frame in rows:
+                self.record(message_id, frame)
+            self.seeded = True
+
+
+class RoomHistories:
+    """
+    Rings of the rooms with local members, per event loop.
+    """
+
+    def __init__(self):
+        self.rooms = {}
+
+    def join(self, task_id):
+        """
+        Register a local member of a room.
+
+        Args:
+            task_id: Primary key of the room's task
+
+        Returns:
+            RoomHistory: Ring of the room
+        """
+        room = self.rooms.get(task_id)
+        if room is None:
+            room = self.rooms[task_id] = RoomHistory(
+                task_id, settings.CHAT_REPLAY_BUFFER_SIZE
+            )
+        room.members += 1
+        return room
+
+    def leave(self, task_id):
+        """
+        Unregister a local member, dropping the ring with the last one.
+
+        Without members the ring would miss broadcasts and no longer
+        be complete.
+
+        Args:
+            task_id: Primary key of the room's task
+        """
+        room = self.rooms.get(task_id)
+        if room is None:
+            return
+        room.members -= 1
+        if room.members <= 0:
+            del self.rooms[task_id]
+
+
+def get_room_histories():
+    """
+    Get the room rings of the running event loop.
+
+    Returns:
+        RoomHistories: Rings shared by every consumer on the loop
+    """
+    loop = asyncio.get_running_loop()
+    histories = _histories.get(loop)
+    if histories is None:
+        histories = _histories[loop] = RoomHistories()
+    return histories
@@ -1,3 +1,287 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, InterfaceError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from core.testing import Budget, ViewBudgetMixin
+from organizations.models import Organization, Role, UserOrganizationRole
+from tasks.models import Task
+
+from .models import TaskChatMessage
+from .persistence import WriteBehindBuffer, get_write_buffer
+from .replay import RoomHistory
+from .routing import websocket_urlpatterns
+
+
+User = get_user_model()
+
+
+class TaskChatViewBudgetTests(ViewBudgetMixin, TestCase):
+    """Query and latency budgets of every view in task_chat.urls."""
+
+    urlconf = 'task_chat.urls'
+
+    def get_budgets(self):
+        task = [self.task.pk]
+        return [
+            Budget('task_chat:chat', task, queries=6),
+            Budget('task_chat:chat', task, queries=6, user='member'),
+            Budget('task_chat:history', task, queries=4),
+            Budget('task_chat:history', task, queries=4, user='member'),
+            Budget('task_chat:history', task, queries=4, user='viewer'),
+        ]
+
+
+@override_settings(CHANNEL_LAYERS={
+    'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}
+})
+class ChatPersistenceTests(TransactionTestCase):
+    """Chat socket authorization and batched message persistence.
+
+    database_sync_to_async closes old connections around every call,
+    which breaks the transaction a TestCase would wrap each test in.
+    """
+
+    def setUp(self):
+        organization = Organization.objects.create(name='Org')
+        self.task = Task.objects.create(
+            name='Task', organization=organization
+        )
+        self.user = User.objects.create_user('chatter', password='password')
+        self.task.assigned_users.add(self.user)
+        UserOrganizationRole.objects.create(
+            user=self.user,
+            organization=organization,
+            role=Role.objects.create(name='Member'),
+        )
+
+    def communicator(self, user, query=''):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns),
+            f'/ws/chat/{self.task.pk}/{query}',
+        )
+        communicator.scope['user'] = user
+        return communicator
+
+    async def test_buffer_writes_one_batch_and_isolates_bad_rows(self):
+        buffer = WriteBehindBuffer(flush_size=3, flush_interval=60)
+        futures = [
+            buffer.add(TaskChatMessage(
+                task=self.task, user=user, message=str(n)
+            ))
+            for n, user in enumerate([self.user, None, self.user])
+        ]
+        self.assertEqual(buffer.pending, [])
+
+        with self.assertLogs('task_chat.persistence', 'ERROR'):
+            first = await futures[0]
+        self.assertIsNotNone(first.pk)
+        with self.assertRaises(DatabaseError):
+            await futures[1]
+        await futures[2]
+        self.assertEqual(
+            await TaskChatMessage.objects.filter(task=self.task).acount(), 2
+        )
+
+    async def test_lost_connections_fail_the_whole_batch(self):
+        buffer = WriteBehindBuffer(flush_size=2, flush_interval=60)
+        with mock.patch(
+            'task_chat.persistence.write_messages',
+            side_effect=InterfaceError('connection already closed'),
+        ), self.assertLogs('task_chat.persistence', 'ERROR'):
+            futures = [
+                buffer.add(TaskChatMessage(
+                    task=self.task, user=self.user, message=str(n)
+                ))
+                for n in range(2)
+            ]
+            await buffer.flush()
+        for future in futures:
+            with self.assertRaises(InterfaceError):
+                await future
+
+    async def test_flush_writes_before_the_interval(self):
+        buffer = WriteBehindBuffer(flush_size=100, flush_interval=60)
+        future = buffer.add(TaskChatMessage(
+            task=self.task, user=self.user, message='hi'
+        ))
+        await buffer.flush()
+        self.assertTrue(future.done())
+
+    async def test_durable_mode_broadcasts_saved_messages(self):
+        communicator = self.communicator(self.user)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        with self.settings(CHAT_PERSIST_MODE='durable'):
+            await communicator.send_json_to({'message': 'hello'})
+            event = await communicator.receive_json_from()
+        saved = await TaskChatMessage.objects.aget(message='hello')
+        self.assertEqual(event['message'], 'hello')
+        self.assertEqual(event['username'], 'chatter')
+        self.assertEqual(event['timestamp'], str(saved.timestamp))
+        await communicator.disconnect()
+
+    async def test_invalid_frames_get_an_error_and_are_not_saved(self):
+        communicator = self.communicator(self.user)
+        await communicator.connect()
+
+        frames = [
+            'not json',
+            json.dumps(['message']),
+            json.dumps({'text': 'hello'}),
+            json.dumps({'message': 42}),
+            json.dumps({'message': '   '}),
+            json.dumps({'message': 'x' * 11}),
+        ]
+        with self.settings(CHAT_MESSAGE_MAX_LENGTH=10):
+            for frame in frames:
+                with self.subTest(frame=frame):
+                    await communicator.send_to(text_data=frame)
+                    event = await communicator.receive_json_from()
+                    self.assertIn('error', event)
+            await communicator.send_to(bytes_data=b'hello')
+            self.assertIn('error', await communicator.receive_json_from())
+
+            # The socket stays usable
+            await communicator.send_json_to({'message': 'x' * 10})
+            event = await communicator.receive_json_from()
+        self.assertEqual(event['message'], 'x' * 10)
+        self.assertEqual(
+            await TaskChatMessage.objects.filter(task=self.task).acount(), 1
+        )
+        await communicator.disconnect()
+
+    async def test_users_without_access_are_rejected(self):
+        outsider = await User.objects.acreate_user('outsider')
+        connected, _ = await self.communicator(outsider).connect()
+        self.assertFalse(connected)
+
+    async def test_revoked_access_closes_the_socket(self):
+        communicator = self.communicator(self.user)
+        await communicator.connect()
+        await self.task.assigned_users.aremove(self.user)
+
+        with self.settings(CHAT_ACCESS_REVALIDATE_SECONDS=0):
+            await communicator.send_json_to({'message': 'still here?'})
+            closed = await communicator.receive_output()
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4003})
+
+    async def test_reconnect_replays_only_missed_messages(self):
+        first, *missed = await TaskChatMessage.objects.abulk_create([
+            TaskChatMessage(task=self.task, user=self.user, message=str(n))
+            for n in range(3)
+        ])
+        communicator = self.communicator(
+            self.user, f'?last_seen_id={first.pk}'
+        )
+        await communicator.connect()
+
+        for message in missed:
+            event = await communicator.receive_json_from()
+            self.assertEqual(event['id'], message.pk)
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_late_broadcasts_below_the_replay_are_delivered(self):
+        first, late, replayed = await TaskChatMessage.objects.abulk_create([
+            TaskChatMessage(task=self.task, user=self.user, message=str(n))
+            for n in range(3)
+        ])
+        # Another process saves `late` only after this client's replay
+        late_id = late.pk
+        await late.adelete()
+        communicator = self.communicator(
+            self.user, f'?last_seen_id={first.pk}'
+        )
+        await communicator.connect()
+        event = await communicator.receive_json_from()
+        self.assertEqual(event['id'], replayed.pk)
+
+        for message_id in (replayed.pk, late_id):
+            await get_channel_layer().group_send(f'chat_{self.task.pk}', {
+                'type': 'chat_message',
+                'id': message_id,
+                'text': json.dumps({'id': message_id}),
+            })
+        self.assertEqual(await communicator.receive_json_from(), {'id': late_id})
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_fast_mode_messages_are_replayed(self):
+        first = await TaskChatMessage.objects.acreate(
+            task=self.task, user=self.user, message='first'
+        )
+        # Seeds the room's ring and keeps it alive
+        member = self.communicator(self.user, f'?last_seen_id={first.pk}')
+        await member.connect()
+        self.assertTrue(await member.receive_nothing())
+
+        with self.settings(CHAT_PERSIST_MODE='fast'):
+            await member.send_json_to({'message': 'fast'})
+            event = await member.receive_json_from()
+            self.assertIsNone(event['id'])
+            await get_write_buffer().flush()
+
+            communicator = self.communicator(
+                self.user, f'?last_seen_id={first.pk}'
+            )
+            await communicator.connect()
+            event = await communicator.receive_json_from()
+        saved = await TaskChatMessage.objects.aget(message='fast')
+        self.assertEqual(event['id'], saved.pk)
+        self.assertEqual(event['message'], 'fast')
+        await communicator.disconnect()
+        await member.disconnect()
+
+    async def test_large_gaps_ask_the_client_to_resync(self):
+        first, *_ = await TaskChatMessage.objects.abulk_create([
+            TaskChatMessage(task=self.task, user=self.user, message=str(n))
+            for n in range(3)
+        ])
+        communicator = self.communicator(
+            self.user, f'?last_seen_id={first.pk}'
+        )
+        with self.settings(CHAT_REPLAY_LIMIT=1):
+            await communicator.connect()
+            event = await communicator.receive_json_from()
+        self.assertEqual(event, {'resync': True})
+        await communicator.disconnect()
+
+    async def test_room_history_evicts_the_oldest_frames(self):
+        history = RoomHistory(self.task.pk, size=2)
+        history.seeded = True
+        for message_id in (3, 1, 2, 2, None):
+            history.record(message_id, str(message_id))
+
+        self.assertEqual(history.floor, 1)
+        self.assertIsNone(await history.since(0))
+        self.assertEqual(await history.since(1), [(2, '2'), (3, '3')])
+        self.assertEqual(await history.since(2), [(3, '3')])
+
+    def test_history_pages_walk_back_without_gaps(self):
+        TaskChatMessage.objects.bulk_create([
+            TaskChatMessage(task=self.task, user=self.user, message=str(n))
+            for n in range(5)
+        ])
+        self.client.force_login(self.user)
+        url = reverse('task_chat:history', args=[self.task.pk])
+
+        pages, data = [], {'limit': 2}
+        while True:
+            page = self.client.get(url, data).json()
+            pages.append([event['message'] for event in page['messages']])
+            if page['before'] is None:
+                break
+            data['before'] = page['before']
+        self.assertEqual(pages, [['3', '4'], ['1', '2'], ['0']])
+
+        outsider = User.objects.create_user('outsider')
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -14,4 +14,9 @@ app_name = 'task_chat'
 
 urlpatterns = [
     path('<int:task_id>/', views.task_chat_view, name='chat'),
+    path(
+        '<int:task_id>/history/',
+        views.chat_history_view,
+        name='history'
+    ),
 ]
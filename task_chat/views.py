@@ -5,20 +5,26 @@ task-related chat messages with user authentication.
 """
 
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, render
 
 from tasks.models import Task
 
-from .models import TaskChatMessage
+from .access import can_chat
+from .models import HISTORY_PAGE_SIZE, TaskChatMessage
+
+
+# Largest page a history request may ask for
+MAX_HISTORY_PAGE_SIZE = 200
 
 
 @login_required
 def task_chat_view(request, task_id):
     """Display chat messages for a specific task.
 
-    Retrieves and displays all chat messages associated with a task,
-    along with user information for each message. Requires user
-    authentication to access.
+    Renders the latest HISTORY_PAGE_SIZE messages of the task; older
+    ones are fetched from chat_history_view as the user scrolls up.
+    Requires user authentication and access to the task's chat.
 
     Args:
         request: HTTP request object containing user session data.
@@ -28,15 +34,63 @@ def task_chat_view(request, task_id):
         HttpResponse: Rendered chat template with task and messages context.
 
     Raises:
-        Http404: If task with given task_id does not exist.
+        Http404: If the task does not exist or the user has no access.
     """
-    task = get_object_or_404(Task, pk=task_id)
-    messages = TaskChatMessage.objects.filter(
-        task=task
-    ).select_related('user')
+    if not can_chat(request.user, task_id):
+        raise Http404('Task not found')
+    task = get_object_or_404(
+        Task.objects.select_related('organization'), pk=task_id
+    )
+    page = TaskChatMessage.objects.history(task.pk)
 
     context = {
         'task': task,
-        'messages': messages,
+        'messages': page.object_list[::-1],
+        'history_cursor': page.next_cursor,
+        # Reconnecting sockets replay messages newer than this one
+        'last_message_id': (
+            page.object_list[0].pk if page.object_list else None
+        ),
     }
     return render(request, 'chat.html', context)
+
+
+@login_required
+def chat_history_view(request, task_id):
+    """Return a page of older chat messages as JSON.
+
+    Pages are addressed by the cursor of the previous page in the
+    'before' query parameter; without one the latest messages are
+    returned. Each page is a range scan of the (task, timestamp, id)
+    index, however long the history.
+
+    Args:
+        request: HTTP request object with optional 'before' and 'limit'
+            query parameters.
+        task_id: Primary key integer of the task.
+
+    Returns:
+        JsonResponse: 'messages' oldest first and 'before', the cursor
+        of the next older page or null at the start of the history.
+
+    Raises:
+        Http404: If the task does not exist or the user has no access.
+    """
+    if not can_chat(request.user, task_id):
+        raise Http404('Task not found')
+
+    try:
+        limit = int(request.GET.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        limit = HISTORY_PAGE_SIZE
+    limit = min(max(limit, 1), MAX_HISTORY_PAGE_SIZE)
+
+    page = TaskChatMessage.objects.history(
+        task_id, request.GET.get('before'), limit
+    )
+    return JsonResponse({
+        'messages': [
+            message.as_event() for message in reversed(page.object_list)
+        ],
+        'before': page.next_cursor,
+    })
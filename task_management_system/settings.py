@@ -56,10 +56,14 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.QueryInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.AccessContextMiddleware',
+    'core.middleware.TenantRLSMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -75,6 +79,85 @@ CHANNEL_LAYERS = {
     },
 }
 
+# Cache
+# Shared across processes when CACHE_URL points at Redis
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Seconds a compiled role permission set stays in the cache
+ROLE_PERMISSION_CACHE_TIMEOUT = env.int(
+    'ROLE_PERMISSION_CACHE_TIMEOUT', default=300
+)
+
+# Seconds a per-user dashboard context stays in the cache. Entries are
+# also expired by versioned keys whenever their data changes.
+DASHBOARD_CACHE_TIMEOUT = env.int('DASHBOARD_CACHE_TIMEOUT', default=300)
+
+# Per-request query counts and timings, recorded by
+# core.middleware.QueryInstrumentationMiddleware. SERVER_TIMING_HEADER
+# also sends them to staff users as a Server-Timing header. A sample of
+# requests slower than SLOW_REQUEST_MS is logged as a warning with its
+# full query list; set REQUEST_LOG_LEVEL=INFO to log a record for every
+# request.
+REQUEST_INSTRUMENTATION = env.bool('REQUEST_INSTRUMENTATION', default=True)
+SERVER_TIMING_HEADER = env.bool('SERVER_TIMING_HEADER', default=False)
+SLOW_REQUEST_MS = env.float('SLOW_REQUEST_MS', default=500)
+SLOW_REQUEST_SAMPLE_RATE = env.float('SLOW_REQUEST_SAMPLE_RATE', default=0.1)
+
+# Prometheus metrics at /metrics, readable by staff users and by scrapers
+# sending "Authorization: Bearer <METRICS_TOKEN>". With several worker
+# processes (gunicorn workers, daphne) point METRICS_MULTIPROC_DIR at a
+# directory shared by all of them and emptied before they start; every
+# process writes its metrics there each METRICS_FLUSH_INTERVAL seconds.
+# The http_db_* metrics are only collected with REQUEST_INSTRUMENTATION.
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+METRICS_MULTIPROC_DIR = env('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', default=5)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': env('REQUEST_LOG_LEVEL', default='WARNING'),
+            'propagate': False,
+        },
+    },
+}
+
+# Enforce organization isolation with PostgreSQL row-level security.
+# Enable this, then install the policies with `manage.py tenant_rls install`.
+TENANT_RLS_ENABLED = env.bool('TENANT_RLS_ENABLED', default=False)
+
+# Chat messages of all rooms are written in batches of up to
+# CHAT_FLUSH_SIZE rows, at most CHAT_FLUSH_INTERVAL seconds after they
+# arrive. 'durable' broadcasts a message once it is stored; 'fast'
+# broadcasts immediately and loses the messages of the last interval if
+# the process dies.
+CHAT_PERSIST_MODE = env('CHAT_PERSIST_MODE', default='durable')
+CHAT_FLUSH_SIZE = env.int('CHAT_FLUSH_SIZE', default=100)
+CHAT_FLUSH_INTERVAL = env.float('CHAT_FLUSH_INTERVAL', default=0.05)
+
+# Longest chat message, in characters, a socket accepts.
+CHAT_MESSAGE_MAX_LENGTH = env.int('CHAT_MESSAGE_MAX_LENGTH', default=4000)
+
+# Seconds a chat socket's connect-time authorization is trusted before
+# it is checked again, bounding how long revoked users keep chatting.
+CHAT_ACCESS_REVALIDATE_SECONDS = env.int(
+    'CHAT_ACCESS_REVALIDATE_SECONDS', default=60
+)
+
+# Latest messages kept per room and process for replay to reconnecting
+# clients, and the most one reconnect replays before the client is told
+# to reload instead.
+CHAT_REPLAY_BUFFER_SIZE = env.int('CHAT_REPLAY_BUFFER_SIZE', default=200)
+CHAT_REPLAY_LIMIT = env.int('CHAT_REPLAY_LIMIT', default=500)
+
 
 ROOT_URLCONF = 'task_management_system.urls'
 
@@ -161,6 +244,13 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Protected file delivery: 'stream' (Django), 'nginx' (X-Accel-Redirect)
+# or 'sendfile' (X-Sendfile). The internal URL must map to MEDIA_ROOT.
+PROTECTED_FILE_BACKEND = env('PROTECTED_FILE_BACKEND', default='stream')
+PROTECTED_FILE_INTERNAL_URL = env(
+    'PROTECTED_FILE_INTERNAL_URL', default='/protected-media/'
+)
+
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10 MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760  # 10 MB
@@ -178,6 +268,18 @@ LOGOUT_REDIRECT_URL = 'accounts:login'
 
 AUTH_USER_MODEL = 'accounts.CustomUser'  
 
+# View budget tests: dataset scale (a core.factories.SCALE_PRESETS name),
+# generator seed, JSON report path (empty to disable), whether latency
+# budgets fail the tests or are only reported, and a multiplier applied
+# to latency budgets on slower machines.
+PERF_TEST_SCALE = env('PERF_TEST_SCALE', default='small')
+PERF_TEST_SEED = env.int('PERF_TEST_SEED', default=0)
+PERF_REPORT_PATH = env(
+    'PERF_REPORT_PATH', default=str(BASE_DIR / 'perf_report.json')
+)
+PERF_ENFORCE_LATENCY = env.bool('PERF_ENFORCE_LATENCY', default=False)
+PERF_LATENCY_FACTOR = env.float('PERF_LATENCY_FACTOR', default=1.0)
+
 TIME_ZONE = 'Asia/Kolkata' 
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
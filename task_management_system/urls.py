@@ -1,8 +1,8 @@
 """URL configuration for task_management_system project.
 
 This module defines the main URL routing for the task management system,
-including admin, authentication, organizations, tasks, and protected file
-serving endpoints.
+including admin, authentication, organizations, tasks, protected file
+serving and metrics endpoints.
 """
 
 from django.conf import settings
@@ -11,7 +11,13 @@ from django.contrib import admin
 from django.urls import include, path
 
 from accounts.views import DashboardView
-from core.views import serve_protected_file, Custom404View  # ✅ import CBV
+from core.views import (
+    Custom404View,
+    export_department_outputs,
+    export_task_outputs,
+    metrics_view,
+    serve_protected_file,
+)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -26,6 +32,17 @@ urlpatterns = [
         serve_protected_file,
         name='serve_protected_file'
     ),
+    path(
+        'protected/export/task/<int:task_id>/',
+        export_task_outputs,
+        name='export_task_outputs'
+    ),
+    path(
+        'protected/export/department/<int:department_id>/',
+        export_department_outputs,
+        name='export_department_outputs'
+    ),
+    path('metrics', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
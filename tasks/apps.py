@@ -20,3 +20,16 @@ class TasksConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        """Connect signal handlers and register organization scopes."""
+        from core.scoping import org_scopes
+
+        from . import signals  # noqa: F401
+        from .models import Task, TaskOutput, TaskOutputField
+
+        org_scopes.register(Task, 'organization')
+        org_scopes.register(TaskOutputField, 'task__organization')
+        org_scopes.register(
+            TaskOutput, 'output_field__task__organization'
+        )
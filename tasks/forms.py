@@ -9,6 +9,7 @@ with comprehensive validation.
 
 from django import forms
 from django.contrib.auth import get_user_model
+from django.utils.choices import BaseChoiceIterator
 
 from core.validators import validate_file_extension, validate_file_size
 from organizations.models import Department
@@ -17,6 +18,27 @@ from .models import Task, TaskOutputField, TaskOutput
 User = get_user_model()
 
 
+class SharedChoiceIterator(BaseChoiceIterator):
+    """
+    Lazy choices evaluated once and reused by several fields.
+
+    Model choice fields query their queryset every time they render, so
+    two fields over the same users would run the same query twice.
+    """
+
+    def __init__(self, choices):
+        """
+        Args:
+            choices: Choice iterator to evaluate on first use.
+        """
+        self.choices = choices
+        self.cache = None
+
+    def __iter__(self):
+        if self.cache is None:
+            self.cache = list(self.choices)
+        return iter(self.cache)
+
 
 class TaskForm(forms.ModelForm):
     """
@@ -70,12 +92,9 @@ class TaskForm(forms.ModelForm):
             self.fields['departments'].queryset = (
                 self.instance.organization.departments.all()
             )
-            self.fields['assigned_users'].queryset = User.objects.filter(
+            self.set_user_choices(User.objects.filter(
                 user_org_roles__organization=self.instance.organization
-            ).distinct()
-            self.fields['viewers'].queryset = User.objects.filter(
-                user_org_roles__organization=self.instance.organization
-            ).distinct()
+            ).distinct())
         elif 'organization' in self.data:
             # Form submission with validation errors - maintain selections
             try:
@@ -83,12 +102,9 @@ class TaskForm(forms.ModelForm):
                 self.fields['departments'].queryset = (
                     Department.objects.filter(organization_id=org_id)
                 )
-                self.fields['assigned_users'].queryset = User.objects.filter(
-                    user_org_roles__organization_id=org_id
-                ).distinct()
-                self.fields['viewers'].queryset = User.objects.filter(
+                self.set_user_choices(User.objects.filter(
                     user_org_roles__organization_id=org_id
-                ).distinct()
+                ).distinct())
             except (ValueError, TypeError):
                 # Invalid organization ID - set empty querysets
                 self.fields['departments'].queryset = (
@@ -103,6 +119,22 @@ class TaskForm(forms.ModelForm):
             self.fields['assigned_users'].queryset = User.objects.none()
             self.fields['viewers'].queryset = User.objects.none()
 
+    def set_user_choices(self, queryset):
+        """
+        Offer the same users for assignment and viewing.
+
+        Both fields validate against queryset but render from a single
+        evaluation of it.
+
+        Args:
+            queryset: Users of the task's organization.
+        """
+        self.fields['assigned_users'].queryset = queryset
+        self.fields['viewers'].queryset = queryset
+        choices = SharedChoiceIterator(self.fields['assigned_users'].choices)
+        self.fields['assigned_users'].choices = choices
+        self.fields['viewers'].choices = choices
+
 
 class TaskOutputForm(forms.ModelForm):
     """
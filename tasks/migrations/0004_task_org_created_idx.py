@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('tasks', '0003_taskoutput_file_size_taskoutput_original_filename_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', '-created_at'], name='task_org_created_idx'),
+        ),
+    ]
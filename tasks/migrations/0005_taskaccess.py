@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_task_access(apps, schema_editor):
+    """Create TaskAccess rows for existing assigned users and viewers."""
+    Task = apps.get_model('tasks', 'Task')
+    TaskAccess = apps.get_model('tasks', 'TaskAccess')
+    db_alias = schema_editor.connection.alias
+
+    sources = [
+        ('assigned', Task.assigned_users),
+        ('viewer', Task.viewers),
+    ]
+    for level, descriptor in sources:
+        user_column = f'{descriptor.field.m2m_reverse_field_name()}_id'
+        rows = descriptor.through.objects.using(db_alias).values_list(
+            'task_id', user_column, 'task__organization_id'
+        ).iterator(chunk_size=5000)
+        batch = []
+        for task_id, user_id, organization_id in rows:
+            batch.append(TaskAccess(
+                task_id=task_id,
+                user_id=user_id,
+                organization_id=organization_id,
+                level=level,
+            ))
+            if len(batch) >= 5000:
+                TaskAccess.objects.using(db_alias).bulk_create(batch)
+                batch = []
+        TaskAccess.objects.using(db_alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('tasks', '0004_task_org_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('level', models.CharField(choices=[('assigned', 'Assigned'), ('viewer', 'Viewer')], max_length=10)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_access', to='organizations.organization')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access_grants', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Task Access',
+                'verbose_name_plural': 'Task Access',
+                'indexes': [models.Index(fields=['user', 'organization', 'task'], name='taskaccess_user_org_task_idx')],
+                'unique_together': {('task', 'user', 'level')},
+            },
+        ),
+        migrations.RunPython(
+            backfill_task_access, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-16 20:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_task_stats(apps, schema_editor):
+    """Compute UserTaskStats rows from existing TaskAccess grants."""
+    TaskAccess = apps.get_model('tasks', 'TaskAccess')
+    TaskOutput = apps.get_model('tasks', 'TaskOutput')
+    UserTaskStats = apps.get_model('tasks', 'UserTaskStats')
+    db_alias = schema_editor.connection.alias
+
+    submitted = TaskOutput.objects.using(db_alias).filter(
+        user=models.OuterRef('user'),
+        output_field__task=models.OuterRef('task'),
+    )
+    assigned = models.Q(level='assigned')
+    rows = TaskAccess.objects.using(db_alias).annotate(
+        completed=models.Exists(submitted)
+    ).values('user_id', 'organization_id').annotate(
+        assigned_count=models.Count('pk', filter=assigned),
+        viewer_count=models.Count('pk', filter=models.Q(level='viewer')),
+        accessible_count=models.Count('task', distinct=True),
+        completed_count=models.Count(
+            'pk', filter=assigned & models.Q(completed=True)
+        ),
+    ).order_by()
+
+    UserTaskStats.objects.using(db_alias).bulk_create(
+        [UserTaskStats(**row) for row in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('tasks', '0005_taskaccess'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned_count', models.PositiveIntegerField(default=0)),
+                ('viewer_count', models.PositiveIntegerField(default=0)),
+                ('accessible_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_task_stats', to='organizations.organization')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'User Task Stats',
+                'verbose_name_plural': 'User Task Stats',
+                'unique_together': {('user', 'organization')},
+            },
+        ),
+        migrations.RunPython(
+            backfill_user_task_stats, migrations.RunPython.noop
+        ),
+    ]
@@ -6,10 +6,13 @@ Task models for managing tasks, output fields, and user submissions.
 This module defines tasks within organizations with secure file upload handling.
 """
 
+import operator
 import os
 import uuid
+from functools import reduce
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Greatest
 from organizations.models import Organization, Department
 
 
@@ -45,6 +48,31 @@ def task_output_upload_path(instance, filename):
     return f'task_outputs/org_{org_id}/task_{task_id}/user_{user_id}/{unique_filename}'
 
 
+class TaskQuerySet(models.QuerySet):
+    """
+    QuerySet with access filters backed by the TaskAccess table.
+    """
+
+    def visible_to(self, user, level=None):
+        """
+        Restrict to tasks the user is assigned to or can view.
+
+        Uses a correlated EXISTS on TaskAccess, so a task granted to the
+        user at both levels is still returned once without DISTINCT.
+
+        Args:
+            user: User instance
+            level: Optional TaskAccess level to require
+
+        Returns:
+            QuerySet: Filtered tasks
+        """
+        grants = TaskAccess.objects.filter(task=models.OuterRef('pk'), user=user)
+        if level is not None:
+            grants = grants.filter(level=level)
+        return self.filter(models.Exists(grants))
+
+
 class Task(models.Model):
     """
     Main Task model representing a task within an organization.
@@ -82,16 +110,256 @@ class Task(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     due_date = models.DateTimeField(null=True, blank=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    # Relations read by __str__
+    str_select_related = ['organization']
     
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
+        indexes = [
+            # Serves organization-scoped task lists in default ordering
+            models.Index(
+                fields=['organization', '-created_at'],
+                name='task_org_created_idx'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.name} - {self.organization.name}"
 
 
+class TaskAccess(models.Model):
+    """
+    Denormalized grant of a task to a user.
+
+    One row per (task, user, level), maintained from the
+    Task.assigned_users and Task.viewers M2M signals so visibility checks
+    are a single indexed lookup instead of an OR across two M2M joins.
+    """
+    LEVEL_ASSIGNED = 'assigned'
+    LEVEL_VIEWER = 'viewer'
+    LEVEL_CHOICES = [
+        (LEVEL_ASSIGNED, 'Assigned'),
+        (LEVEL_VIEWER, 'Viewer'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='task_access',
+        on_delete=models.CASCADE
+    )
+    task = models.ForeignKey(
+        Task,
+        related_name='access_grants',
+        on_delete=models.CASCADE
+    )
+    level = models.CharField(max_length=10, choices=LEVEL_CHOICES)
+    # Copied from task.organization to allow org-scoped index scans
+    organization = models.ForeignKey(
+        Organization,
+        related_name='task_access',
+        on_delete=models.CASCADE
+    )
+
+    class Meta:
+        verbose_name = 'Task Access'
+        verbose_name_plural = 'Task Access'
+        unique_together = ('task', 'user', 'level')
+        indexes = [
+            models.Index(
+                fields=['user', 'organization', 'task'],
+                name='taskaccess_user_org_task_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.task_id} ({self.level})"
+
+
+def _pairs_q(pairs):
+    """
+    Build a filter matching any of the given user and organization pairs.
+
+    Args:
+        pairs: Iterable of (user_id, organization_id) tuples
+
+    Returns:
+        Q: OR of one condition per pair
+    """
+    return reduce(operator.or_, (
+        models.Q(user_id=user_id, organization_id=organization_id)
+        for user_id, organization_id in pairs
+    ))
+
+
+class UserTaskStatsManager(models.Manager):
+    """
+    Manager computing and storing per-user task counters.
+    """
+
+    def compute(self, user_ids=None, organization_ids=None):
+        """
+        Aggregate task counters from TaskAccess grants.
+
+        One grouped query; a task counts as completed once the user has
+        submitted an output for any of its fields.
+
+        Args:
+            user_ids: Optional iterable restricting the users
+            organization_ids: Optional iterable restricting the
+                organizations
+
+        Returns:
+            QuerySet: Dicts with user_id, organization_id and counters
+        """
+        grants = TaskAccess.objects.all()
+        if user_ids is not None:
+            grants = grants.filter(user_id__in=user_ids)
+        if organization_ids is not None:
+            grants = grants.filter(organization_id__in=organization_ids)
+
+        submitted = TaskOutput.objects.filter(
+            user=models.OuterRef('user'),
+            output_field__task=models.OuterRef('task'),
+        )
+        assigned = models.Q(level=TaskAccess.LEVEL_ASSIGNED)
+
+        return grants.annotate(
+            completed=models.Exists(submitted)
+        ).values('user_id', 'organization_id').annotate(
+            assigned_count=models.Count('pk', filter=assigned),
+            viewer_count=models.Count(
+                'pk', filter=models.Q(level=TaskAccess.LEVEL_VIEWER)
+            ),
+            accessible_count=models.Count('task', distinct=True),
+            completed_count=models.Count(
+                'pk', filter=assigned & models.Q(completed=True)
+            ),
+        ).order_by()
+
+    def _store(self, rows):
+        """
+        Upsert computed rows.
+
+        Args:
+            rows: Iterable of dicts from compute()
+        """
+        self.bulk_create(
+            [UserTaskStats(**row) for row in rows],
+            update_conflicts=True,
+            unique_fields=['user', 'organization'],
+            update_fields=UserTaskStats.COUNTER_FIELDS,
+            batch_size=1000,
+        )
+
+    def apply_deltas(self, deltas):
+        """
+        Add counter deltas to the rows of the given users and organizations.
+
+        Missing rows are created first, pairs sharing the same deltas are
+        updated together with F() expressions, and rows left without any
+        accessible task are deleted, so the table matches compute().
+
+        Args:
+            deltas: Dict mapping (user_id, organization_id) tuples to
+                dicts of counter field deltas
+        """
+        deltas = {
+            pair: changes for pair, changes in deltas.items()
+            if any(changes.values())
+        }
+        if not deltas:
+            return
+
+        self.bulk_create(
+            [
+                UserTaskStats(user_id=user_id, organization_id=organization_id)
+                for user_id, organization_id in deltas
+            ],
+            ignore_conflicts=True,
+        )
+
+        groups = {}
+        for pair, changes in deltas.items():
+            key = tuple(sorted(
+                (field, delta) for field, delta in changes.items() if delta
+            ))
+            groups.setdefault(key, []).append(pair)
+        for changes, pairs in groups.items():
+            self.filter(_pairs_q(pairs)).update(**{
+                # Clamped so drift cannot break writes; rebuild repairs it
+                field: Greatest(
+                    models.F(field) + delta, 0
+                ) if delta < 0 else models.F(field) + delta
+                for field, delta in changes
+            })
+
+        self.filter(_pairs_q(deltas), accessible_count=0).delete()
+
+    def rebuild(self):
+        """
+        Recompute every row from scratch.
+
+        Returns:
+            int: Number of rows written
+        """
+        rows = list(self.compute())
+        self.all().delete()
+        self._store(rows)
+        return len(rows)
+
+
+class UserTaskStats(models.Model):
+    """
+    Rollup of a user's task counters within one organization.
+
+    Maintained incrementally by the signals in tasks.signals so the
+    dashboard reads a handful of rows instead of aggregating over every
+    task; the rebuild_task_stats command recomputes it from scratch.
+    """
+    COUNTER_FIELDS = [
+        'assigned_count',
+        'viewer_count',
+        'accessible_count',
+        'completed_count',
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        related_name='task_stats',
+        on_delete=models.CASCADE
+    )
+    organization = models.ForeignKey(
+        Organization,
+        related_name='user_task_stats',
+        on_delete=models.CASCADE
+    )
+    assigned_count = models.PositiveIntegerField(default=0)
+    viewer_count = models.PositiveIntegerField(default=0)
+    # Distinct tasks held at either level
+    accessible_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+
+    objects = UserTaskStatsManager()
+
+    class Meta:
+        verbose_name = 'User Task Stats'
+        verbose_name_plural = 'User Task Stats'
+        unique_together = ('user', 'organization')
+
+    def __str__(self):
+        return f"{self.user_id} - {self.organization_id}"
+
+    @property
+    def pending_count(self):
+        """Assigned tasks without a submission."""
+        return self.assigned_count - self.completed_count
+
+
 class TaskOutputField(models.Model):
     """
     Defines output fields for a task (forms/inputs users need to fill).
@@ -133,6 +401,9 @@ class TaskOutputField(models.Model):
         help_text="Maximum value for number fields"
     )
     
+    # Relations read by __str__
+    str_select_related = ['task']
+
     class Meta:
         ordering = ['id']
         verbose_name = 'Task Output Field'
@@ -178,6 +449,9 @@ class TaskOutput(models.Model):
     )
     submitted_at = models.DateTimeField(auto_now_add=True)
     
+    # Relations read by __str__
+    str_select_related = ['user', 'output_field']
+
     class Meta:
         ordering = ['-submitted_at']
         verbose_name = 'Task Output'
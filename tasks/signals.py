@@ -0,0 +1,460 @@
+"""Signal handlers keeping denormalized task tables in sync.
+
+This module mirrors Task.assigned_users and Task.viewers into the
+TaskAccess table. Both directions of each relation are handled, so
+task.viewers.add(user) and user.viewed_tasks.add(task) produce the
+same grants.
+
+It also keeps UserTaskStats current. Every change works out how the
+counters of each affected (user, organization) pair move and applies
+those deltas in the same transaction, without recomputing anyone's
+totals. The cached dashboards of the organizations involved are expired
+once per transaction, after it commits.
+"""
+
+import weakref
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, QuerySet
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from core.dashboard_cache import (
+    invalidate_organization_dashboards,
+    invalidate_user_dashboards,
+)
+
+from .models import (
+    Task,
+    TaskAccess,
+    TaskOutput,
+    TaskOutputField,
+    UserTaskStats,
+)
+
+
+_LEVEL_BY_THROUGH = {
+    Task.assigned_users.through: TaskAccess.LEVEL_ASSIGNED,
+    Task.viewers.through: TaskAccess.LEVEL_VIEWER,
+}
+
+_COUNTER_BY_LEVEL = {
+    TaskAccess.LEVEL_ASSIGNED: 'assigned_count',
+    TaskAccess.LEVEL_VIEWER: 'viewer_count',
+}
+
+# (user_id, task_id) pairs whose completion a queryset delete has
+# already withdrawn, keyed by the deletion's origin
+_withdrawn_completions = weakref.WeakKeyDictionary()
+
+
+class _DashboardExpiry:
+    """On-commit callback expiring the dashboards of collected organizations.
+
+    Attributes:
+        org_ids: Primary keys of the organizations to expire.
+        user_ids: Primary keys of the users whose dashboards to expire.
+        done: Whether the callback already ran. Test helpers such as
+            captureOnCommitCallbacks(execute=True) run callbacks without
+            removing them from the connection.
+    """
+
+    def __init__(self):
+        self.org_ids = set()
+        self.user_ids = set()
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        invalidate_organization_dashboards(self.org_ids)
+        invalidate_user_dashboards(self.user_ids)
+
+
+def _expire_dashboards(org_ids, user_ids=()):
+    """Expire cached dashboards after the transaction commits.
+
+    All changes made in one atomic block share a single on-commit
+    callback. It is registered with the block's savepoints, so it is
+    discarded along with them when the block rolls back.
+
+    A user's dashboard is only keyed by the organizations they belong
+    to, so users whose own counters changed are expired as well; they
+    may hold grants in organizations they are not a member of.
+
+    Args:
+        org_ids: Iterable of organization primary keys.
+        user_ids: Iterable of primary keys of users whose counters
+            changed.
+    """
+    org_ids = set(org_ids)
+    user_ids = set(user_ids)
+    if not org_ids and not user_ids:
+        return
+
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        invalidate_organization_dashboards(org_ids)
+        invalidate_user_dashboards(user_ids)
+        return
+
+    # atomic(savepoint=False) blocks record None rather than an id
+    savepoint_ids = set(connection.savepoint_ids) - {None}
+    # Newest first, as the block's own callback is usually the last one
+    for callback_savepoint_ids, expiry, _ in reversed(
+        connection.run_on_commit
+    ):
+        if (
+            isinstance(expiry, _DashboardExpiry)
+            and not expiry.done
+            and callback_savepoint_ids - {None} == savepoint_ids
+        ):
+            break
+    else:
+        expiry = _DashboardExpiry()
+        transaction.on_commit(expiry)
+    expiry.org_ids |= org_ids
+    expiry.user_ids |= user_ids
+
+
+def _submitted(user_ids, task_ids):
+    """Find the users who submitted an output for each task.
+
+    Args:
+        user_ids: Iterable of user primary keys.
+        task_ids: Iterable of task primary keys.
+
+    Returns:
+        Set of (user_id, task_id) tuples.
+    """
+    return set(TaskOutput.objects.filter(
+        user_id__in=set(user_ids), output_field__task_id__in=set(task_ids)
+    ).values_list('user_id', 'output_field__task_id').distinct())
+
+
+def _apply_grant_changes(grants, sign):
+    """Move the counters of grants that were just created or deleted.
+
+    Runs after the TaskAccess rows were written, so the grants left on
+    a task tell whether it is accessible at the other level as well.
+
+    Args:
+        grants: List of (task_id, organization_id, user_id, level)
+            tuples.
+        sign: 1 for created grants, -1 for deleted ones.
+    """
+    if not grants:
+        return
+
+    user_ids = {user_id for _, _, user_id, _ in grants}
+    task_ids = {task_id for task_id, _, _, _ in grants}
+    held = {
+        (row['user_id'], row['task_id']): row['levels']
+        for row in TaskAccess.objects.filter(
+            user_id__in=user_ids, task_id__in=task_ids
+        ).values('user_id', 'task_id').annotate(
+            levels=Count('pk')
+        ).order_by()
+    }
+    submitted = _submitted(user_ids, task_ids)
+    # A created grant is the only one left on a newly accessible task;
+    # a deleted one leaves none on a task that is no longer accessible
+    sole = 1 if sign > 0 else 0
+
+    deltas = defaultdict(Counter)
+    for task_id, organization_id, user_id, level in grants:
+        changes = deltas[(user_id, organization_id)]
+        changes[_COUNTER_BY_LEVEL[level]] += sign
+        if held.get((user_id, task_id), 0) == sole:
+            changes['accessible_count'] += sign
+        if (level == TaskAccess.LEVEL_ASSIGNED
+                and (user_id, task_id) in submitted):
+            changes['completed_count'] += sign
+
+    UserTaskStats.objects.apply_deltas(deltas)
+    _expire_dashboards(
+        (organization_id for _, organization_id, _, _ in grants), user_ids
+    )
+
+
+def _task_grant_deltas(task_id, grants, sign, deltas):
+    """Add or withdraw every grant of one task.
+
+    Args:
+        task_id: Primary key of the task.
+        grants: List of (user_id, organization_id, level) tuples holding
+            all of the task's grants.
+        sign: 1 to add the grants, -1 to withdraw them.
+        deltas: Dict of Counters keyed by (user_id, organization_id),
+            updated in place.
+    """
+    submitted = _submitted((user_id for user_id, _, _ in grants), [task_id])
+    accessible = set()
+    for user_id, organization_id, level in grants:
+        changes = deltas[(user_id, organization_id)]
+        changes[_COUNTER_BY_LEVEL[level]] += sign
+        if (user_id, organization_id) not in accessible:
+            accessible.add((user_id, organization_id))
+            changes['accessible_count'] += sign
+        if (level == TaskAccess.LEVEL_ASSIGNED
+                and (user_id, task_id) in submitted):
+            changes['completed_count'] += sign
+
+
+def _grant(level, pairs):
+    """Create TaskAccess rows, ignoring grants that already exist.
+
+    Args:
+        level: TaskAccess level to grant.
+        pairs: Iterable of (task_id, organization_id, user_id) tuples.
+    """
+    TaskAccess.objects.bulk_create(
+        [
+            TaskAccess(
+                task_id=task_id,
+                organization_id=organization_id,
+                user_id=user_id,
+                level=level,
+            )
+            for task_id, organization_id, user_id in pairs
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def _revoke(grants):
+    """Delete TaskAccess rows, returning what they granted.
+
+    Args:
+        grants: TaskAccess queryset to delete.
+
+    Returns:
+        List of (task_id, organization_id, user_id, level) tuples.
+    """
+    revoked = list(grants.values_list(
+        'task_id', 'organization_id', 'user_id', 'level'
+    ))
+    grants.delete()
+    return revoked
+
+
+@receiver(m2m_changed, sender=Task.assigned_users.through)
+@receiver(m2m_changed, sender=Task.viewers.through)
+def task_members_changed(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    """Mirror assigned user and viewer changes into TaskAccess.
+
+    The counters of every affected user move with the grants.
+
+    Args:
+        sender: Intermediate model of the changed relation.
+        instance: Task (forward) or user (reverse) being modified.
+        action: Type of update performed on the relation.
+        reverse: True when the change was made from the user side.
+        pk_set: Primary keys added or removed.
+    """
+    level = _LEVEL_BY_THROUGH[sender]
+    grants = TaskAccess.objects.filter(level=level)
+
+    if action == 'post_add':
+        if not reverse:
+            added = [
+                (instance.pk, instance.organization_id, user_id)
+                for user_id in pk_set
+            ]
+        else:
+            added = [
+                (task_id, organization_id, instance.pk)
+                for task_id, organization_id in Task.objects.filter(
+                    pk__in=pk_set
+                ).values_list('pk', 'organization_id')
+            ]
+        _grant(level, added)
+        _apply_grant_changes([
+            (task_id, organization_id, user_id, level)
+            for task_id, organization_id, user_id in added
+        ], 1)
+        return
+
+    if not reverse:
+        grants = grants.filter(task=instance)
+        if action == 'post_remove':
+            grants = grants.filter(user_id__in=pk_set)
+    else:
+        grants = grants.filter(user=instance)
+        if action == 'post_remove':
+            grants = grants.filter(task_id__in=pk_set)
+
+    if action in ('post_remove', 'post_clear'):
+        _apply_grant_changes(_revoke(grants), -1)
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """Carry a task's organization change over to its grants.
+
+    Args:
+        sender: Task model class.
+        instance: Task instance that was saved.
+        created: Whether the task was just created.
+    """
+    _expire_dashboards([instance.organization_id])
+    if created:
+        return
+
+    moved = TaskAccess.objects.filter(task=instance).exclude(
+        organization_id=instance.organization_id
+    )
+    previous = list(moved.values_list('user_id', 'organization_id', 'level'))
+    if not previous:
+        return
+
+    moved.update(organization_id=instance.organization_id)
+    deltas = defaultdict(Counter)
+    _task_grant_deltas(instance.pk, previous, -1, deltas)
+    _task_grant_deltas(instance.pk, [
+        (user_id, instance.organization_id, level)
+        for user_id, _, level in previous
+    ], 1, deltas)
+    UserTaskStats.objects.apply_deltas(deltas)
+    _expire_dashboards(
+        (organization_id for _, organization_id in deltas),
+        (user_id for user_id, _ in deltas),
+    )
+
+
+@receiver(pre_delete, sender=Task)
+def task_deleting(sender, instance, **kwargs):
+    """Withdraw the grants of a task from its holders' counters.
+
+    The task's outputs are deleted with it and leave the counters alone,
+    see task_output_deleted.
+
+    Args:
+        sender: Task model class.
+        instance: Task instance about to be deleted.
+    """
+    deltas = defaultdict(Counter)
+    _task_grant_deltas(
+        instance.pk,
+        list(TaskAccess.objects.filter(task=instance).values_list(
+            'user_id', 'organization_id', 'level'
+        )),
+        -1,
+        deltas,
+    )
+    UserTaskStats.objects.apply_deltas(deltas)
+    _expire_dashboards(
+        [instance.organization_id], (user_id for user_id, _ in deltas)
+    )
+
+
+@receiver(m2m_changed, sender=Task.departments.through)
+def task_departments_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """Expire dashboards filtering on a changed task department link.
+
+    Args:
+        sender: Intermediate model of Task.departments.
+        instance: Task (forward) or Department (reverse) being modified.
+        action: Type of update performed on the relation.
+        reverse: True when the change was made from the Department side.
+        pk_set: Primary keys added or removed.
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _expire_dashboards([instance.organization_id])
+
+
+def _output_completion(output):
+    """Read what an output's submitter holds on its task.
+
+    Args:
+        output: TaskOutput instance.
+
+    Returns:
+        Tuple of (task_id, organization_id, assigned, other_outputs), or
+        None when the output field no longer exists. assigned tells
+        whether the submitter is assigned to the task and other_outputs
+        whether they have other outputs for it.
+    """
+    return TaskOutputField.objects.filter(
+        pk=output.output_field_id
+    ).annotate(
+        assigned=Exists(TaskAccess.objects.filter(
+            task=OuterRef('task'),
+            user_id=output.user_id,
+            level=TaskAccess.LEVEL_ASSIGNED,
+        )),
+        other_outputs=Exists(TaskOutput.objects.filter(
+            output_field__task=OuterRef('task'), user_id=output.user_id
+        ).exclude(pk=output.pk)),
+    ).values_list(
+        'task_id', 'task__organization_id', 'assigned', 'other_outputs'
+    ).first()
+
+
+@receiver(post_save, sender=TaskOutput)
+def task_output_saved(sender, instance, created, **kwargs):
+    """Count a task as completed on its submitter's first output.
+
+    Args:
+        sender: TaskOutput model class.
+        instance: TaskOutput that was saved.
+        created: Whether the output was just created.
+    """
+    if not created:
+        return
+
+    completion = _output_completion(instance)
+    if completion is None:
+        return
+    _, organization_id, assigned, other_outputs = completion
+    if assigned and not other_outputs:
+        UserTaskStats.objects.apply_deltas({
+            (instance.user_id, organization_id): {'completed_count': 1},
+        })
+    _expire_dashboards([organization_id], [instance.user_id])
+
+
+@receiver(post_delete, sender=TaskOutput)
+def task_output_deleted(sender, instance, origin=None, **kwargs):
+    """Count a task as pending again once its last output is deleted.
+
+    Only deletions of outputs and output fields are handled. Deleting a
+    task withdraws its grants entirely in task_deleting, and deleting a
+    user or organization deletes their counters as well.
+
+    Args:
+        sender: TaskOutput model class.
+        instance: TaskOutput that was deleted.
+        origin: Model instance or queryset the deletion started from.
+    """
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(
+        origin
+    )
+    if origin_model not in (TaskOutput, TaskOutputField):
+        return
+
+    completion = _output_completion(instance)
+    if completion is None:
+        return
+    task_id, organization_id, assigned, other_outputs = completion
+    _expire_dashboards([organization_id], [instance.user_id])
+    if not assigned or other_outputs:
+        return
+
+    if isinstance(origin, QuerySet):
+        # A queryset may delete several outputs of one task, and each
+        # finds the others gone already
+        withdrawn = _withdrawn_completions.setdefault(origin, set())
+        if (instance.user_id, task_id) in withdrawn:
+            return
+        withdrawn.add((instance.user_id, task_id))
+    UserTaskStats.objects.apply_deltas({
+        (instance.user_id, organization_id): {'completed_count': -1},
+    })
@@ -1,3 +1,380 @@
+from importlib import import_module
+from io import StringIO
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
 from django.test import TestCase
 
-# Create your tests here.
+from core.testing import Budget, ViewBudgetMixin
+from organizations.models import Organization
+from tasks.models import (
+    Task,
+    TaskAccess,
+    TaskOutput,
+    TaskOutputField,
+    UserTaskStats,
+)
+
+
+User = get_user_model()
+
+
+class TaskAccessTests(TestCase):
+    """TaskAccess mirrors Task.assigned_users and Task.viewers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='org')
+        cls.other_organization = Organization.objects.create(name='other')
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+        cls.task = Task.objects.create(
+            name='task', organization=cls.organization
+        )
+        cls.other_task = Task.objects.create(
+            name='other', organization=cls.organization
+        )
+
+    def grants(self):
+        return set(TaskAccess.objects.values_list(
+            'task_id', 'user_id', 'level', 'organization_id'
+        ))
+
+    def expected_grants(self):
+        """Grants derived from the M2M tables themselves."""
+        return {
+            (task.pk, user.pk, level, task.organization_id)
+            for task in Task.objects.all()
+            for level, users in (
+                (TaskAccess.LEVEL_ASSIGNED, task.assigned_users.all()),
+                (TaskAccess.LEVEL_VIEWER, task.viewers.all()),
+            )
+            for user in users
+        }
+
+    def assertInSync(self):
+        self.assertEqual(self.grants(), self.expected_grants())
+
+    def old_visible_to(self, user):
+        return Task.objects.filter(
+            Q(assigned_users=user) | Q(viewers=user)
+        ).distinct()
+
+    def test_forward_add_remove_and_clear(self):
+        for relation in (self.task.assigned_users, self.task.viewers):
+            relation.add(self.alice, self.bob)
+            self.assertInSync()
+            relation.remove(self.alice)
+            self.assertInSync()
+            relation.clear()
+            self.assertInSync()
+        self.assertFalse(TaskAccess.objects.exists())
+
+    def test_reverse_add_remove_and_clear(self):
+        for relation in (self.alice.assigned_tasks, self.alice.viewed_tasks):
+            relation.add(self.task, self.other_task)
+            self.assertInSync()
+            relation.remove(self.task)
+            self.assertInSync()
+            relation.clear()
+            self.assertInSync()
+        self.assertFalse(TaskAccess.objects.exists())
+
+    def test_losing_one_level_keeps_the_other(self):
+        self.task.assigned_users.add(self.alice)
+        self.alice.viewed_tasks.add(self.task)
+
+        self.task.assigned_users.remove(self.alice)
+        self.assertEqual(self.grants(), {(
+            self.task.pk, self.alice.pk, TaskAccess.LEVEL_VIEWER,
+            self.organization.pk,
+        )})
+        self.assertTrue(Task.objects.visible_to(self.alice).exists())
+
+    def test_moving_a_task_moves_its_grants(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.add(self.bob)
+
+        self.task.organization = self.other_organization
+        self.task.save()
+        self.assertInSync()
+        self.assertEqual(
+            set(TaskAccess.objects.values_list('organization_id', flat=True)),
+            {self.other_organization.pk},
+        )
+
+    def test_visible_to_matches_the_m2m_filter(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.add(self.alice, self.bob)
+        self.other_task.viewers.add(self.bob)
+
+        for user in (self.alice, self.bob):
+            visible = Task.objects.visible_to(user)
+            self.assertQuerySetEqual(
+                visible.order_by('pk'),
+                self.old_visible_to(user).order_by('pk'),
+            )
+            self.assertEqual(visible.count(), len(visible))
+        self.assertQuerySetEqual(
+            Task.objects.visible_to(self.bob, TaskAccess.LEVEL_ASSIGNED), []
+        )
+
+    def test_backfill_matches_the_m2m_filter(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.add(self.alice, self.bob)
+        self.other_task.assigned_users.add(self.bob)
+        TaskAccess.objects.all().delete()
+
+        migration = import_module('tasks.migrations.0005_taskaccess')
+        with connection.schema_editor() as schema_editor:
+            migration.backfill_task_access(apps, schema_editor)
+        self.assertInSync()
+        for user in (self.alice, self.bob):
+            self.assertQuerySetEqual(
+                Task.objects.visible_to(user).order_by('pk'),
+                self.old_visible_to(user).order_by('pk'),
+            )
+
+
+class UserTaskStatsTests(TestCase):
+    """Incremental maintenance of the UserTaskStats rollup."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.organization = Organization.objects.create(name='org')
+        cls.other_organization = Organization.objects.create(name='other')
+        cls.alice = User.objects.create_user('alice', password='pw')
+        cls.bob = User.objects.create_user('bob', password='pw')
+        cls.task = Task.objects.create(
+            name='task', organization=cls.organization
+        )
+        cls.fields = [
+            TaskOutputField.objects.create(
+                task=cls.task, name=name, field_type='text'
+            )
+            for name in ('first', 'second')
+        ]
+
+    def stats(self, user, organization=None):
+        row = UserTaskStats.objects.filter(
+            user=user, organization=organization or self.organization
+        ).first()
+        if row is None:
+            return None
+        return {
+            field: getattr(row, field)
+            for field in UserTaskStats.COUNTER_FIELDS
+        }
+
+    def counters(self, assigned=0, viewer=0, accessible=0, completed=0):
+        return {
+            'assigned_count': assigned,
+            'viewer_count': viewer,
+            'accessible_count': accessible,
+            'completed_count': completed,
+        }
+
+    def submit(self, user, field):
+        return TaskOutput.objects.create(
+            output_field=field, user=user, value_text='done'
+        )
+
+    def assertMatchesRebuild(self):
+        stored = {
+            (row.user_id, row.organization_id): self.stats(
+                row.user, row.organization
+            )
+            for row in UserTaskStats.objects.select_related(
+                'user', 'organization'
+            )
+        }
+        computed = {
+            (row.pop('user_id'), row.pop('organization_id')): row
+            for row in UserTaskStats.objects.compute()
+        }
+        self.assertEqual(stored, computed)
+
+    def test_add_counts_grants_and_distinct_tasks(self):
+        self.task.assigned_users.add(self.alice, self.bob)
+        self.alice.viewed_tasks.add(self.task)
+        self.assertEqual(
+            self.stats(self.alice),
+            self.counters(assigned=1, viewer=1, accessible=1),
+        )
+        self.assertEqual(self.stats(self.bob), self.counters(1, 0, 1, 0))
+        self.assertMatchesRebuild()
+
+    def test_add_counts_submitted_tasks_as_completed(self):
+        self.submit(self.alice, self.fields[0])
+        self.alice.assigned_tasks.add(self.task)
+        self.assertEqual(self.stats(self.alice), self.counters(1, 0, 1, 1))
+        self.assertMatchesRebuild()
+
+    def test_remove_keeps_tasks_held_at_the_other_level(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.add(self.alice)
+        self.submit(self.alice, self.fields[0])
+
+        self.task.assigned_users.remove(self.alice)
+        self.assertEqual(self.stats(self.alice), self.counters(0, 1, 1, 0))
+        self.alice.viewed_tasks.remove(self.task)
+        self.assertIsNone(self.stats(self.alice))
+        self.assertMatchesRebuild()
+
+    def test_removing_users_without_grants_changes_nothing(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.remove(self.alice, self.bob)
+        self.assertEqual(self.stats(self.alice), self.counters(1, 0, 1, 0))
+        self.assertIsNone(self.stats(self.bob))
+
+    def test_clear_from_both_sides(self):
+        self.task.assigned_users.add(self.alice, self.bob)
+        self.task.viewers.add(self.bob)
+        self.submit(self.alice, self.fields[0])
+
+        self.task.assigned_users.clear()
+        self.assertIsNone(self.stats(self.alice))
+        self.assertEqual(self.stats(self.bob), self.counters(0, 1, 1, 0))
+        self.bob.viewed_tasks.clear()
+        self.assertIsNone(self.stats(self.bob))
+        self.assertMatchesRebuild()
+
+    def test_only_the_first_output_completes_a_task(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.add(self.bob)
+        first = self.submit(self.alice, self.fields[0])
+        self.submit(self.alice, self.fields[1])
+        first.value_text = 'changed'
+        first.save()
+        # Viewers have nothing to complete
+        self.submit(self.bob, self.fields[0])
+
+        self.assertEqual(self.stats(self.alice), self.counters(1, 0, 1, 1))
+        self.assertEqual(self.stats(self.bob), self.counters(0, 1, 1, 0))
+        self.assertMatchesRebuild()
+
+    def test_only_the_last_output_deleted_reopens_a_task(self):
+        self.task.assigned_users.add(self.alice)
+        first = self.submit(self.alice, self.fields[0])
+        second = self.submit(self.alice, self.fields[1])
+
+        first.delete()
+        self.assertEqual(self.stats(self.alice), self.counters(1, 0, 1, 1))
+        second.delete()
+        self.assertEqual(self.stats(self.alice), self.counters(1, 0, 1, 0))
+        self.assertMatchesRebuild()
+
+    def test_queryset_and_field_deletes_reopen_a_task_once(self):
+        other = Task.objects.create(name='other', organization=self.organization)
+        other_field = TaskOutputField.objects.create(
+            task=other, name='field', field_type='text'
+        )
+        self.alice.assigned_tasks.add(self.task, other)
+        for field in (*self.fields, other_field):
+            self.submit(self.alice, field)
+
+        TaskOutput.objects.filter(output_field__task=self.task).delete()
+        self.assertEqual(self.stats(self.alice), self.counters(2, 0, 2, 1))
+        other.output_fields.all().delete()
+        self.assertEqual(self.stats(self.alice), self.counters(2, 0, 2, 0))
+        self.assertMatchesRebuild()
+
+    def test_task_delete_withdraws_every_grant(self):
+        kept = Task.objects.create(name='kept', organization=self.organization)
+        self.alice.assigned_tasks.add(self.task, kept)
+        self.task.viewers.add(self.alice, self.bob)
+        self.submit(self.alice, self.fields[0])
+
+        self.task.delete()
+        self.assertEqual(self.stats(self.alice), self.counters(1, 0, 1, 0))
+        self.assertIsNone(self.stats(self.bob))
+        self.assertMatchesRebuild()
+
+    def test_moving_a_task_moves_its_counters(self):
+        self.task.assigned_users.add(self.alice)
+        self.task.viewers.add(self.alice)
+        self.submit(self.alice, self.fields[0])
+
+        self.task.organization = self.other_organization
+        self.task.save()
+        self.assertIsNone(self.stats(self.alice))
+        self.assertEqual(
+            self.stats(self.alice, self.other_organization),
+            self.counters(1, 1, 1, 1),
+        )
+        self.assertMatchesRebuild()
+
+    def test_dashboards_expire_once_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.task.assigned_users.add(self.alice)
+            for field in self.fields:
+                self.submit(self.alice, field)
+            self.task.organization = self.other_organization
+            self.task.save()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            callbacks[0].org_ids,
+            {self.organization.pk, self.other_organization.pk},
+        )
+
+    def test_rebuild_command_repairs_the_table(self):
+        self.task.assigned_users.add(self.alice)
+        self.submit(self.alice, self.fields[0])
+        expected = self.stats(self.alice)
+        UserTaskStats.objects.update(assigned_count=7, completed_count=0)
+        UserTaskStats.objects.create(
+            user=self.bob, organization=self.organization, assigned_count=3
+        )
+
+        call_command('rebuild_task_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.alice), expected)
+        self.assertIsNone(self.stats(self.bob))
+
+
+class TaskViewBudgetTests(ViewBudgetMixin, TestCase):
+    """Query and latency budgets of every view in tasks.urls."""
+
+    urlconf = 'tasks.urls'
+
+    def get_budgets(self):
+        task = [self.task.pk]
+        field = [self.task.output_fields.order_by('pk').first().pk]
+        output = [TaskOutput.objects.filter(
+            output_field__task=self.task, user=self.member
+        ).order_by('pk').first().pk]
+        return [
+            Budget('tasks:task_list', queries=5),
+            Budget('tasks:task_add', queries=4),
+            Budget('tasks:task_detail', task, queries=11),
+            Budget('tasks:task_detail', task, queries=14, user='member'),
+            Budget('tasks:task_edit', task, queries=12),
+            Budget('tasks:task_delete', task, queries=5),
+            Budget('tasks:task_complete', task, queries=9, user='member'),
+            Budget('tasks:task_output_field_list', queries=4),
+            Budget('tasks:task_output_field_add', queries=4),
+            Budget('tasks:task_output_field_detail', field, queries=6),
+            Budget('tasks:task_output_field_edit', field, queries=5),
+            Budget('tasks:task_output_field_delete', field, queries=5),
+            Budget('tasks:task_output_list', queries=4),
+            Budget('tasks:task_output_list', queries=4, user='member'),
+            Budget('tasks:task_output_add', queries=4),
+            Budget(
+                'tasks:task_output_detail', output, queries=4, user='member'
+            ),
+            Budget(
+                'tasks:task_output_edit', output, queries=5, user='member'
+            ),
+            Budget(
+                'tasks:task_output_delete', output, queries=4, user='member'
+            ),
+            Budget('tasks:my_assigned_tasks', queries=4, user='member'),
+            Budget('tasks:my_viewer_tasks', queries=4, user='viewer'),
+            Budget(
+                'tasks:get_organization_data', [self.task.organization_id],
+                queries=4
+            ),
+        ]
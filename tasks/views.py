@@ -10,7 +10,6 @@ from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import transaction
-from django.db.models import Q
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
@@ -24,10 +23,15 @@ from django.views.generic import (
     UpdateView,
 )
 
+from core.access import get_access_context
 from core.mixins import (
+    CursorPaginationMixin,
     OrganizationFilterMixin,
     OrganizationFormMixin,
+    RelatedChoicesMixin,
+    RelatedListMixin,
     RolePermissionMixin,
+    list_select_related,
 )
 from organizations.models import Department
 from task_chat.models import TaskChatMessage
@@ -38,7 +42,7 @@ from .forms import (
     TaskOutputFieldForm,
     TaskOutputForm,
 )
-from .models import Task, TaskOutput, TaskOutputField
+from .models import Task, TaskAccess, TaskOutput, TaskOutputField
 
 
 User = get_user_model()
@@ -117,6 +121,8 @@ class TaskListView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedListMixin,
+    CursorPaginationMixin,
     ListView
 ):
     """Display list of tasks filtered by user's organizations and access.
@@ -129,6 +135,9 @@ class TaskListView(
     template_name = 'tasks/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['name', 'organization', 'due_date', 'created_at']
+    estimate_count = True
+    cursor_ordering = ('-created_at', '-id')
     required_permission = 'tasks.view_task'
 
     def get_queryset(self):
@@ -143,14 +152,7 @@ class TaskListView(
         if user.is_superuser:
             return queryset
 
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-        queryset = queryset.filter(organization__in=user_orgs)
-
-        queryset = queryset.filter(
-            Q(assigned_users=user) | Q(viewers=user)
-        ).distinct()
+        queryset = queryset.visible_to(user)
 
         return queryset
 
@@ -172,7 +174,6 @@ class TaskListView(
             'table_headers': [
                 'Name', 'Organization', 'Due Date', 'Created At'
             ],
-            'list_attrs': ['name', 'organization', 'due_date', 'created_at'],
             'can_add': 'tasks.add_task',
             'can_edit': 'tasks.change_task',
             'can_delete': 'tasks.delete_task',
@@ -205,14 +206,15 @@ class TaskDetailView(
     required_permission = 'tasks.view_task'
 
     def get_context_data(self, **kwargs):
-        """Add task details, outputs, and chat messages to context.
+        """Add task details, outputs, and latest chat messages to context.
 
         Returns:
             Dictionary with task details, user outputs, completion status,
-            chat messages, and navigation URLs.
+            the latest page of chat messages with the cursor of older
+            ones, and navigation URLs.
         """
         context = super().get_context_data(**kwargs)
-        task = self.get_object()
+        task = self.object
 
         user_outputs = TaskOutput.objects.filter(
             output_field__task=task,
@@ -221,9 +223,8 @@ class TaskDetailView(
 
         has_completed = user_outputs.exists()
 
-        chat_messages = TaskChatMessage.objects.filter(
-            task=task
-        ).select_related('user').order_by('timestamp')
+        # Older messages are fetched from task_chat:history on scroll
+        chat_page = TaskChatMessage.objects.history(task.pk)
 
         context.update({
             'page_title': 'Task Details',
@@ -236,7 +237,11 @@ class TaskDetailView(
             'output_fields': task.output_fields.all(),
             'has_completed': has_completed,
             'user_outputs': user_outputs,
-            'chat_messages': chat_messages,
+            'chat_messages': chat_page.object_list[::-1],
+            'chat_history_cursor': chat_page.next_cursor,
+            'chat_last_message_id': (
+                chat_page.object_list[0].pk if chat_page.object_list else None
+            ),
             'can_edit': 'tasks.change_task',
         })
         return context
@@ -253,6 +258,7 @@ class TaskDetailView(
 class TaskCreateView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     GenericFormMixin,
     CreateView,
@@ -275,6 +281,7 @@ class TaskUpdateView(
     LoginRequiredMixin,
     RolePermissionMixin,
     OrganizationFilterMixin,
+    RelatedChoicesMixin,
     OrganizationFormMixin,
     GenericFormMixin,
     UpdateView,
@@ -314,7 +321,8 @@ class TaskDeleteView(
 
 
 class TaskOutputFieldListView(
-    LoginRequiredMixin, OrganizationFilterMixin, ListView
+    LoginRequiredMixin, OrganizationFilterMixin, RelatedListMixin,
+    CursorPaginationMixin, ListView
 ):
     """Display list of task output fields filtered by user's organizations."""
 
@@ -322,23 +330,7 @@ class TaskOutputFieldListView(
     template_name = 'tasks/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
-
-    def get_queryset(self):
-        """Filter output fields by tasks in user's organizations.
-
-        Returns:
-            QuerySet of TaskOutputField objects.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-        return queryset.filter(task__organization__id__in=user_orgs)
+    list_attrs = ['task', 'name', 'field_type', 'required']
 
     def get_context_data(self, **kwargs):
         """Add table configuration and permissions to context.
@@ -355,7 +347,6 @@ class TaskOutputFieldListView(
             'edit_url': 'tasks:task_output_field_edit',
             'delete_url': 'tasks:task_output_field_delete',
             'table_headers': ['Task', 'Name', 'Field Type', 'Required'],
-            'list_attrs': ['task', 'name', 'field_type', 'required'],
             'can_add': 'task_outputs.add_taskoutputfield',
             'can_edit': 'task_outputs.change_taskoutputfield',
             'can_delete': 'task_outputs.delete_taskoutputfield',
@@ -372,23 +363,6 @@ class TaskOutputFieldDetailView(
     template_name = 'tasks/generic_detail.html'
     context_object_name = 'object'
 
-    def get_queryset(self):
-        """Filter output fields by tasks in user's organizations.
-
-        Returns:
-            QuerySet of TaskOutputField objects.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-        return queryset.filter(task__organization__id__in=user_orgs)
-
     def get_context_data(self, **kwargs):
         """Add field list, permissions, and navigation URLs to context.
 
@@ -409,6 +383,7 @@ class TaskOutputFieldDetailView(
 class TaskOutputFieldCreateView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    RelatedChoicesMixin,
     GenericFormMixin,
     CreateView,
 ):
@@ -437,6 +412,8 @@ class TaskOutputFieldCreateView(
 class TaskOutputFieldUpdateView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    OrganizationFilterMixin,
+    RelatedChoicesMixin,
     GenericFormMixin,
     UpdateView,
 ):
@@ -453,23 +430,6 @@ class TaskOutputFieldUpdateView(
     action = "Edit"
     required_permission = 'tasks.change_taskoutputfield'
 
-    def get_queryset(self):
-        """Filter output fields by tasks in user's organizations.
-
-        Returns:
-            QuerySet of TaskOutputField objects.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-        return queryset.filter(task__organization__id__in=user_orgs)
-
     def get_permission_denied_url(self):
         """Redirect to output field list on permission denied.
 
@@ -482,6 +442,7 @@ class TaskOutputFieldUpdateView(
 class TaskOutputFieldDeleteView(
     LoginRequiredMixin,
     RolePermissionMixin,
+    OrganizationFilterMixin,
     GenericFormMixin,
     DeleteView,
 ):
@@ -497,23 +458,6 @@ class TaskOutputFieldDeleteView(
     action = "Delete"
     required_permission = 'tasks.delete_taskoutputfield'
 
-    def get_queryset(self):
-        """Filter output fields by tasks in user's organizations.
-
-        Returns:
-            QuerySet of TaskOutputField objects.
-        """
-        queryset = super().get_queryset()
-        user = self.request.user
-
-        if user.is_superuser:
-            return queryset
-
-        user_orgs = user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
-        return queryset.filter(task__organization__id__in=user_orgs)
-
     def get_permission_denied_url(self):
         """Redirect to output field list on permission denied.
 
@@ -523,13 +467,17 @@ class TaskOutputFieldDeleteView(
         return 'tasks:task_output_field_list'
 
 
-class TaskOutputListView(LoginRequiredMixin, ListView):
+class TaskOutputListView(
+    LoginRequiredMixin, RelatedListMixin, CursorPaginationMixin, ListView
+):
     """Display list of current user's task outputs."""
 
     model = TaskOutput
     template_name = 'tasks/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['output_field', 'value_text', 'submitted_at']
+    cursor_ordering = ('-submitted_at', '-id')
 
     def get_queryset(self):
         """Show only current user's outputs.
@@ -554,7 +502,6 @@ class TaskOutputListView(LoginRequiredMixin, ListView):
             'edit_url': 'tasks:task_output_edit',
             'delete_url': 'tasks:task_output_delete',
             'table_headers': ['Output Field', 'Value', 'Submitted At'],
-            'list_attrs': ['output_field', 'value_text', 'submitted_at'],
         })
         return context
 
@@ -570,9 +517,14 @@ class TaskOutputDetailView(LoginRequiredMixin, DetailView):
         """Filter to current user's outputs only.
 
         Returns:
-            QuerySet of TaskOutput objects for current user.
+            QuerySet of TaskOutput objects for current user, with the
+            relations the detail fields display joined in.
         """
-        return TaskOutput.objects.filter(user=self.request.user)
+        return TaskOutput.objects.filter(
+            user=self.request.user
+        ).select_related(*list_select_related(
+            TaskOutput, [field.name for field in TaskOutput._meta.fields]
+        ))
 
     def get_context_data(self, **kwargs):
         """Add field list and navigation URLs to context.
@@ -590,7 +542,12 @@ class TaskOutputDetailView(LoginRequiredMixin, DetailView):
         return context
 
 
-class TaskOutputCreateView(LoginRequiredMixin, GenericFormMixin, CreateView):
+class TaskOutputCreateView(
+    LoginRequiredMixin,
+    RelatedChoicesMixin,
+    GenericFormMixin,
+    CreateView,
+):
     """Create task output assigned to current user."""
 
     model = TaskOutput
@@ -613,7 +570,12 @@ class TaskOutputCreateView(LoginRequiredMixin, GenericFormMixin, CreateView):
         return super().form_valid(form)
 
 
-class TaskOutputUpdateView(LoginRequiredMixin, GenericFormMixin, UpdateView):
+class TaskOutputUpdateView(
+    LoginRequiredMixin,
+    RelatedChoicesMixin,
+    GenericFormMixin,
+    UpdateView,
+):
     """Update task output for current user's own outputs."""
 
     model = TaskOutput
@@ -645,18 +607,27 @@ class TaskOutputDeleteView(LoginRequiredMixin, GenericFormMixin, DeleteView):
         """Users can only delete their own outputs.
 
         Returns:
-            QuerySet of TaskOutput objects for current user.
+            QuerySet of TaskOutput objects for current user, with the
+            relations its confirmation message displays joined in.
         """
-        return TaskOutput.objects.filter(user=self.request.user)
+        return TaskOutput.objects.filter(
+            user=self.request.user
+        ).select_related(*list_select_related(
+            TaskOutput, TaskOutput.str_select_related
+        ))
 
 
-class MyAssignedTasksListView(LoginRequiredMixin, ListView):
+class MyAssignedTasksListView(
+    LoginRequiredMixin, RelatedListMixin, CursorPaginationMixin, ListView
+):
     """Display list of tasks assigned to current user."""
 
     model = Task
     template_name = 'tasks/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['name', 'organization', 'due_date']
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """Show only tasks assigned to current user.
@@ -664,9 +635,9 @@ class MyAssignedTasksListView(LoginRequiredMixin, ListView):
         Returns:
             QuerySet of Task objects assigned to user.
         """
-        return Task.objects.filter(
-            assigned_users=self.request.user
-        ).distinct()
+        return Task.objects.visible_to(
+            self.request.user, TaskAccess.LEVEL_ASSIGNED
+        )
 
     def get_context_data(self, **kwargs):
         """Add table configuration to context.
@@ -680,18 +651,21 @@ class MyAssignedTasksListView(LoginRequiredMixin, ListView):
             'item_name': 'Task',
             'detail_url': 'tasks:task_detail',
             'table_headers': ['Name', 'Organization', 'Due Date'],
-            'list_attrs': ['name', 'organization', 'due_date'],
         })
         return context
 
 
-class MyViewerTasksListView(LoginRequiredMixin, ListView):
+class MyViewerTasksListView(
+    LoginRequiredMixin, RelatedListMixin, CursorPaginationMixin, ListView
+):
     """Display list of tasks where user is a viewer."""
 
     model = Task
     template_name = 'tasks/generic_list.html'
     context_object_name = 'object_list'
     paginate_by = 10
+    list_attrs = ['name', 'organization', 'due_date']
+    cursor_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         """Show only tasks where user is a viewer.
@@ -699,7 +673,9 @@ class MyViewerTasksListView(LoginRequiredMixin, ListView):
         Returns:
             QuerySet of Task objects where user is viewer.
         """
-        return Task.objects.filter(viewers=self.request.user).distinct()
+        return Task.objects.visible_to(
+            self.request.user, TaskAccess.LEVEL_VIEWER
+        )
 
     def get_context_data(self, **kwargs):
         """Add table configuration to context.
@@ -713,7 +689,6 @@ class MyViewerTasksListView(LoginRequiredMixin, ListView):
             'item_name': 'Task',
             'detail_url': 'tasks:task_detail',
             'table_headers': ['Name', 'Organization', 'Due Date'],
-            'list_attrs': ['name', 'organization', 'due_date'],
         })
         return context
 
@@ -743,11 +718,9 @@ class TaskCompletionView(LoginRequiredMixin, View):
             messages.error(request, "You are not assigned to this task.")
             return redirect('tasks:task_list')
 
-        user_orgs = request.user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
+        access = get_access_context(request)
         if (not request.user.is_superuser and
-                task.organization.id not in user_orgs):
+                not access.has_org(task.organization_id)):
             messages.error(request, "Access denied.")
             return redirect('tasks:task_list')
 
@@ -801,11 +774,9 @@ class TaskCompletionView(LoginRequiredMixin, View):
             messages.error(request, "You are not assigned to this task.")
             return redirect('tasks:task_list')
 
-        user_orgs = request.user.user_org_roles.values_list(
-            'organization', flat=True
-        ).distinct()
+        access = get_access_context(request)
         if (not request.user.is_superuser and
-                task.organization.id not in user_orgs):
+                not access.has_org(task.organization_id)):
             messages.error(request, "Access denied.")
             return redirect('tasks:task_list')
 